@@ -1,10 +1,17 @@
+from array import array
+from collections import deque
+from csr import CSRDirectedGraph
+import numpy as np
 
-def lowestLengthPath(ddg, s, t):
+
+def lowestLengthPath(ddg, s, t, bidirectional=False):
     """
     Finds the lowest length path between two given vertices of a directed graph
     :param ddg: A directed graph
     :param s: The source vertex
     :param t: The destination vertex
+    :param bidirectional: If True, the search alternates between a forward search from s
+    and a backward search from t, which explores far fewer vertices on large graphs
     :return:  A list containing all the vertices that form the minimum length path, in order
     """
     # There is no need to continue with the algorithm if the vertices provided are not valid
@@ -15,69 +22,326 @@ def lowestLengthPath(ddg, s, t):
     if s == t:
         return [s]
 
-    # A list will be used to mimic the behaviour of the queue used in the BFS algorithm
-    Queue = []
+    if bidirectional:
+        path, _ = _bidirectionalSearch(ddg, s, t)
+    else:
+        path, _ = _forwardSearch(ddg, s, t)
+    return path
 
-    # Prev will contain pairs, each of which correspond to a child(key)-parent(value) relationship between two vertices
-    prev = {}
 
-    # Dist maps vertices that are accessible from the starting vertex
-    # to their minimum distance (number of edges) from the starting vertex
-    dist = {}
+def _forwardSearch(ddg, s, t):
+    # Breadth first search from s that stops as soon as t is discovered
+    # Returns the path and the number of vertices that were discovered
 
-    # Visited is a set containing all the vertices that were already verified in our search
-    visited = set()
+    # Prev will contain pairs, each of which correspond to a child(key)-parent(value) relationship between two vertices
+    # Its keys are also the visited vertices, i.e. the ones that were already verified in our search
+    prev = {s: None}
 
     # Enqueue the starting vertex
-    Queue.append(s)
-    # Mark it as visited
-    visited.add(s)
-    # Set distance to 0
-    dist[s] = 0
+    queue = deque([s])
 
-    # Set a flag so we know when to stop
-    found = False
-
-    while len(Queue) != 0 and not found:
+    while len(queue) != 0:
         # Dequeue vertex
-        x = Queue.pop()
+        x = queue.popleft()
         # Parse the outbound neighbours (children) of the current vertex
         for y in ddg.parseDout(x):
-            if y not in visited:
-                # Enqueue the child
-                Queue.insert(0, y)
-                # Mark it as visited
-                visited.add(y)
-                # Compute the distance up to child vertex
-                dist[y] = dist[x] + 1
-                # Record the parent vertex
+            if y not in prev:
+                # Record the parent vertex, which also marks the child as visited
                 prev[y] = x
                 if y == t:
-                    found = True
-                    break
+                    return _walkBack(prev, t)[::-1], len(prev)
+                # Enqueue the child
+                queue.append(y)
 
-    # Reconstruct the path to the target vertex using the prev dictionary
-    path = []
-    target = t
+    return [], len(prev)
 
-    # Check if the target vertex was actually found
-    if target in prev.keys():
-        path.insert(0, target)
-        while target in prev.keys():
-            path.insert(0, prev[target])
-            target = prev[target]
 
+def _walkBack(prev, x):
+    # Follows the parents recorded in prev from x back to the root of the search
+    path = []
+    while x is not None:
+        path.append(x)
+        x = prev[x]
     return path
 
 
+def _expandLevel(frontier, parents, otherParents, neighbours):
+    # Expands a whole level of one side of the bidirectional search
+    # Returns the next frontier and the best meeting vertex found on the way, if any
+    nextFrontier = []
+    meeting = None
+    bestLength = None
+    for x in frontier:
+        for y in neighbours(x):
+            if y not in parents:
+                parents[y] = x
+                nextFrontier.append(y)
+                if y in otherParents:
+                    # Every meeting found on this level is a candidate, the shortest one is kept
+                    length = len(_walkBack(parents, y)) + len(_walkBack(otherParents, y))
+                    if bestLength is None or length < bestLength:
+                        meeting = y
+                        bestLength = length
+    return nextFrontier, meeting
 
 
+def _bidirectionalSearch(ddg, s, t):
+    # Alternates level by level between a search from s over the outbound neighbours
+    # and a search from t over the inbound neighbours, always expanding the smaller frontier,
+    # until the two searches meet
+    # Returns the path and the number of vertices that were discovered
+    forwardParents = {s: None}
+    backwardParents = {t: None}
+    forwardFrontier = [s]
+    backwardFrontier = [t]
 
+    while len(forwardFrontier) != 0 and len(backwardFrontier) != 0:
+        if len(forwardFrontier) <= len(backwardFrontier):
+            forwardFrontier, meeting = _expandLevel(forwardFrontier, forwardParents, backwardParents,
+                                                    ddg.parseDout)
+        else:
+            backwardFrontier, meeting = _expandLevel(backwardFrontier, backwardParents, forwardParents,
+                                                     ddg.parseDin)
+        if meeting is not None:
+            path = _walkBack(forwardParents, meeting)[::-1] + _walkBack(backwardParents, meeting)[1:]
+            return path, len(forwardParents) + len(backwardParents)
 
+    return [], len(forwardParents) + len(backwardParents)
 
 
+def _indexedSearch(csr, sources, targets=None):
+    # Breadth first search over the integer indices of a CSR graph
+    # Stops early once every vertex of the optional set of target indices was discovered
+    n = csr.vertexCount
+    dist = array('q', [-1]) * n
+    prev = array('q', [-1]) * n
+    offsets, neighbours = csr.outboundArrays()
+    queue = deque()
+    for s in sources:
+        i = csr.indexOf(s)
+        if dist[i] == -1:
+            dist[i] = 0
+            queue.append(i)
+    remaining = None
+    if targets is not None:
+        remaining = set(i for i in targets if dist[i] == -1)
+
+    while len(queue) != 0 and remaining != set():
+        x = queue.popleft()
+        for e in range(offsets[x], offsets[x + 1]):
+            y = neighbours[e]
+            if dist[y] == -1:
+                dist[y] = dist[x] + 1
+                prev[y] = x
+                queue.append(y)
+                if remaining is not None:
+                    remaining.discard(y)
+    return dist, prev
+
+
+def _labelSearch(ddg, sources, targets=None):
+    # Breadth first search over the labels of any graph exposing parseDout
+    # Stops early once every vertex of the optional set of targets was discovered
+    dist = {}
+    prev = {}
+    queue = deque()
+    for s in sources:
+        if not ddg.isVertex(s):
+            raise ValueError("The vertex specified is not valid")
+        if s not in dist:
+            dist[s] = 0
+            prev[s] = None
+            queue.append(s)
+    remaining = None
+    if targets is not None:
+        remaining = set(t for t in targets if t not in dist)
+
+    while len(queue) != 0 and remaining != set():
+        x = queue.popleft()
+        for y in ddg.parseDout(x):
+            if y not in dist:
+                dist[y] = dist[x] + 1
+                prev[y] = x
+                queue.append(y)
+                if remaining is not None:
+                    remaining.discard(y)
+    return dist, prev
+
+
+def bfsDistances(ddg, sources):
+    """
+    Computes the length of the shortest path from a set of source vertices to every reachable vertex
+    :param ddg: A directed graph
+    :param sources: An iterable of source vertices, all of which are at distance 0
+    :return: The distances and the parents on the shortest paths.
+    For a CSRDirectedGraph they are integer arrays indexed by the vertex indices,
+    -1 marking unreachable vertices and missing parents.
+    For any other graph they are dictionaries with a key for every reachable vertex,
+    the parent of a source being None
+    """
+    if isinstance(ddg, CSRDirectedGraph):
+        return _indexedSearch(ddg, sources)
+    return _labelSearch(ddg, sources)
+
+
+def bfsBatch(ddg, queries):
+    """
+    Finds the lowest length paths for a batch of (source, target) pairs,
+    running a single search for all the pairs sharing the same source
+    :param ddg: A directed graph
+    :param queries: An iterable of (source, target) pairs
+    :return: A dictionary mapping every pair to the list of vertices of its path,
+    an empty list if there is no path or if one of the vertices is not valid
+    """
+    targets = {}
+    for s, t in queries:
+        targets.setdefault(s, set()).add(t)
+
+    paths = {}
+    indexed = isinstance(ddg, CSRDirectedGraph)
+    for s in targets:
+        valid = set(t for t in targets[s] if ddg.isVertex(t))
+        for t in targets[s] - valid:
+            paths[(s, t)] = []
+        if not ddg.isVertex(s):
+            for t in valid:
+                paths[(s, t)] = []
+            continue
+
+        if indexed:
+            dist, prev = _indexedSearch(ddg, [s], set(ddg.indexOf(t) for t in valid))
+            for t in valid:
+                x = ddg.indexOf(t)
+                path = []
+                if dist[x] != -1:
+                    while x != -1:
+                        path.append(ddg.labelOf(x))
+                        x = prev[x]
+                paths[(s, t)] = path[::-1]
+        else:
+            dist, prev = _labelSearch(ddg, [s], valid)
+            for t in valid:
+                path = []
+                if t in dist:
+                    path = _walkBack(prev, t)[::-1]
+                paths[(s, t)] = path
+    return paths
+
+
+def _gatherRows(values, starts, counts):
+    # Concatenates the slices values[starts[k]:starts[k] + counts[k]]
+    # Returns, for every gathered entry, the position k of its slice and its value
+    total = int(counts.sum())
+    owners = np.repeat(np.arange(len(starts)), counts)
+    # Position of every entry inside the values array: the start of its slice plus its rank inside the slice
+    sliceStarts = np.cumsum(counts) - counts
+    positions = starts[owners] + np.arange(total) - sliceStarts[owners]
+    return owners, values[positions]
+
+
+def _topDownStep(frontier, visited, parent, outOffsets, outTargets):
+    # Every vertex of the frontier claims its unvisited outbound neighbours
+    rows = np.flatnonzero(frontier)
+    degrees = outOffsets[rows + 1] - outOffsets[rows]
+    owners, targets = _gatherRows(outTargets, outOffsets[rows], degrees)
+    fresh = ~visited[targets]
+    targets = targets[fresh]
+    # A vertex discovered by several vertices of the frontier keeps the first one as parent
+    discovered, first = np.unique(targets, return_index=True)
+    parent[discovered] = rows[owners[fresh][first]]
+    nextFrontier = np.zeros_like(frontier)
+    nextFrontier[discovered] = True
+    return nextFrontier, int(degrees.sum())
+
+
+def _bottomUpStep(frontier, visited, parent, inOffsets, inSources):
+    # Every unvisited vertex scans its inbound neighbours in order until one of them is in the frontier
+    # The rows are scanned in rounds over blocks of ranks that double in size: a vertex that finds its parent
+    # leaves after the round, so it is not tested past the block of its first hit
+    rows = np.flatnonzero(~visited)
+    starts = inOffsets[rows]
+    stops = inOffsets[rows + 1]
+    nextFrontier = np.zeros_like(frontier)
+    examined = 0
+    width = 1
+    while len(rows) > 0:
+        counts = np.minimum(stops - starts, width)
+        owners, sources = _gatherRows(inSources, starts, counts)
+        examined += len(sources)
+        hits = np.flatnonzero(frontier[sources])
+        # The entries of a row are in order, so the first hit of every vertex is its first inbound neighbour
+        # in the frontier, the same parent as the one of a full scan
+        claimed, first = np.unique(owners[hits], return_index=True)
+        parent[rows[claimed]] = sources[hits[first]]
+        nextFrontier[rows[claimed]] = True
+        # The vertices that found their parent or ran out of inbound edges leave
+        starts = starts + counts
+        left = starts < stops
+        left[claimed] = False
+        rows = rows[left]
+        starts = starts[left]
+        stops = stops[left]
+        width *= 2
+    return nextFrontier, examined
+
+
+def directionOptimizingBFS(ddg, s, alpha=14, beta=24):
+    """
+    Breadth first search that switches between top-down steps (the frontier scans its outbound edges)
+    and bottom-up steps (the unvisited vertices scan their inbound edges until one of them reaches the frontier).
+    Bottom-up steps avoid probing already visited vertices in the middle levels of low diameter graphs.
+    The frontiers are NumPy boolean arrays over the integer indices of the vertices
+    :param ddg: A directed graph; other graphs than CSRDirectedGraph are converted first,
+    so that the indices follow the order of parseX
+    :param s: The source vertex
+    :param alpha: Switch to bottom-up once the edges leaving the frontier exceed 1/alpha of the edges
+    still to be checked by the unvisited vertices
+    :param beta: Switch back to top-down once the frontier holds fewer than 1/beta of the vertices
+    :return: The distance and the parent arrays (-1 for unreachable vertices and missing parents)
+    and a list with the statistics of every level: a dictionary with the keys
+    'level', 'direction', 'frontier' (number of vertices) and 'edges' (number of edges examined)
+    """
+    csr = ddg if isinstance(ddg, CSRDirectedGraph) else CSRDirectedGraph(ddg)
+    n = csr.vertexCount
+    source = csr.indexOf(s)
+    outOffsets, outTargets = (np.frombuffer(a, dtype=np.int64) for a in csr.outboundArrays())
+    inOffsets, inSources = (np.frombuffer(a, dtype=np.int64) for a in csr.inboundArrays())
+    outDegrees = np.diff(outOffsets)
+    inDegrees = np.diff(inOffsets)
+
+    dist = np.full(n, -1, dtype=np.int64)
+    parent = np.full(n, -1, dtype=np.int64)
+    visited = np.zeros(n, dtype=bool)
+    frontier = np.zeros(n, dtype=bool)
+    frontier[source] = True
+    visited[source] = True
+    dist[source] = 0
 
+    statistics = []
+    bottomUp = False
+    # Inbound edges of the unvisited vertices, an upper bound of the work of a bottom-up step
+    unexplored = int(inDegrees.sum() - inDegrees[source])
+    level = 0
+    frontierSize = 1
 
+    while frontierSize > 0:
+        frontierEdges = int(outDegrees[frontier].sum())
+        if not bottomUp and frontierEdges > unexplored / alpha:
+            bottomUp = True
+        elif bottomUp and frontierSize < n / beta:
+            bottomUp = False
 
+        if bottomUp:
+            frontier, examined = _bottomUpStep(frontier, visited, parent, inOffsets, inSources)
+        else:
+            frontier, examined = _topDownStep(frontier, visited, parent, outOffsets, outTargets)
+        statistics.append({"level": level, "direction": "bottom-up" if bottomUp else "top-down",
+                           "frontier": frontierSize, "edges": examined})
 
+        level += 1
+        visited |= frontier
+        dist[frontier] = level
+        unexplored -= int(inDegrees[frontier].sum())
+        frontierSize = int(frontier.sum())
 
+    return dist, parent, statistics
@@ -1,7 +1,13 @@
 import math
+import numpy as np
+from multiprocessing import Pool, shared_memory
 from tabulate import tabulate
 
 
+# Views over the shared cost and prev matrices, set up once in every worker process of the blocked variant
+_shared = {}
+
+
 def printResult(costMatrix, prevMatrix, source, destination):
     # If the cost from any vertex to itself becomes negative then for sure we have a negative cost cycle
     for i in range(len(costMatrix)):
@@ -14,64 +20,78 @@ def printResult(costMatrix, prevMatrix, source, destination):
         return
     else:
         print("The minimum cost walk between " + str(source) + " and " + str(destination) + " has the cost " + str(
-            costMatrix[source][destination]))
+            formatCost(costMatrix[source][destination])))
 
     path = []
     interm_vertex = destination
     path.insert(0,interm_vertex)
-    while interm_vertex is not source:
-        interm_vertex = prevMatrix[source][interm_vertex]
+    while interm_vertex != source:
+        interm_vertex = int(prevMatrix[source][interm_vertex])
         path.insert(0,interm_vertex)
 
     print ("And it has the path " + str(path))
 
 
+def formatCost(cost):
+    # Costs are kept as floats in the matrices (so that infinity can be represented)
+    # but integer costs are displayed without a fractional part
+    if isinstance(cost, float) or isinstance(cost, np.floating):
+        if math.isfinite(cost) and float(cost).is_integer():
+            return int(cost)
+    return cost
+
+
 def printMatrix(matrix):
     print(tabulate(matrix, tablefmt="plain"))
     print('\n')
 
 
-def lowestCostWalk(ddg, source, destination):
+def initialMatrices(ddg):
     """
-    Determines the minimum cost walk from a source vertex to a target vertex
+    Builds the initial cost and previous matrices directly from the edge list of a graph
+    whose vertices are labelled 0, 1, ..., n-1
     :param ddg: A directed graph
-    :param source: A given source vertex
-    :param destination: A given destination vertex
-    :return:
+    :return: The cost matrix (a float matrix, infinity marking missing edges)
+    and the prev matrix (an integer matrix, -1 marking missing predecessors)
     """
-    # Retrieve the number of vertices
     n = ddg.vertexCount
-    # Initialize the cost and destination
-
-    # The cost matrix is a matrix whose elements will represent, after the final step of the algorithm,
-    # the minimum cost walk from the all vertices to all vertices of the graph
-    # The line number represents the source vertex while the column number represents the target vertex
-    costMatrix = [[math.inf for j in range(n)] for i in range(n)]
-    # In the case of the cost matrix, an "infinity" element suggests that there is no walk
-    # between the vertices represented by the line number and column number respectively
-
-    # The prev matrix is a matrix that will help in reconstructing the path having the minimum cost
-    # The line number represents the source vertex while the column number represents the target vertex
-    # Its elements represent the predecessors of the aforementioned target vertices in the path
-    prevMatrix = [[-1 for j in range(n)] for i in range(n)]
-    # In the case of the prev matrix, an "-1" element suggests that there is no path
-    # between the vertices represented by the line number and column number respectively
-    # or that the target and destination vertices are equal, hence there is no "previous" vertex
-
-    for i in range(n):
-        for j in range(n):
-            if i == j:
-                # We will set the cost to 0 for trivial walks
-                costMatrix[i][j] = 0
-            elif ddg.isEdge(i, j):
-                # Update the matrices if there is an edge between the vertices in the current iteration
-                costMatrix[i][j] = ddg.costEdge(i, j)
-                prevMatrix[i][j] = i
-
-    print("Initial Cost Matrix\n")
-    printMatrix(costMatrix)
-    print("Initial Previous matrix\n")
-    printMatrix(prevMatrix)
+    costMatrix = np.full((n, n), math.inf)
+    prevMatrix = np.full((n, n), -1, dtype=np.int64)
+
+    edges = list(ddg.parseXYTuples())
+    if len(edges) > 0:
+        origins = np.array([edge[0] for edge in edges])
+        destinations = np.array([edge[1] for edge in edges])
+        costs = np.array([edge[2] for edge in edges], dtype=float)
+        if origins.dtype.kind not in 'iu' or destinations.dtype.kind not in 'iu':
+            raise ValueError("The vertices of the graph must be labelled 0, 1, ..., n-1")
+        if min(origins.min(), destinations.min()) < 0 or max(origins.max(), destinations.max()) >= n:
+            raise ValueError("The vertices of the graph must be labelled 0, 1, ..., n-1")
+        # Loops are ignored, trivial walks always cost 0
+        proper = origins != destinations
+        costMatrix[origins[proper], destinations[proper]] = costs[proper]
+        prevMatrix[origins[proper], destinations[proper]] = origins[proper]
+
+    np.fill_diagonal(costMatrix, 0)
+    return costMatrix, prevMatrix
+
+
+def floydWarshall(ddg, trace=False):
+    """
+    Computes the minimum cost walks between all pairs of vertices of a graph
+    whose vertices are labelled 0, 1, ..., n-1
+    :param ddg: A directed graph
+    :param trace: If True, the matrices are printed after every step of the algorithm
+    :return: The cost matrix and the prev matrix, as NumPy arrays
+    """
+    costMatrix, prevMatrix = initialMatrices(ddg)
+    n = len(costMatrix)
+
+    if trace:
+        print("Initial Cost Matrix\n")
+        printMatrix(costMatrix)
+        print("Initial Previous matrix\n")
+        printMatrix(prevMatrix)
 
     # We will add all vertices one by one to the set of intermediate vertices
     # After each iteration, the vertex nr. k will be added
@@ -80,23 +100,121 @@ def lowestCostWalk(ddg, source, destination):
     # these lowest cost paths only take into consideration vertices from the set
     # {0, 1, ..., k}
     for k in range(n):
-        print("Using vertex " + str(k) + " as an intermediate vertex\n")
-        # Choose source vertex
-        for i in range(n):
-            # Pick destination vertex
-            for j in range(n):
-                if costMatrix[i][j] > costMatrix[i][k] + costMatrix[k][j]:
-                    # If vertex k is contained in the shortest path from i to j
-                    # Then update the cost matrix
-                    costMatrix[i][j] = costMatrix[i][k] + costMatrix[k][j]
-                    prevMatrix[i][j] = prevMatrix[k][j]
-
-        print("Cost Matrix\n")
-        printMatrix(costMatrix)
-        print("Previous matrix\n")
-        printMatrix(prevMatrix)
+        # The cost of going from every i to every j through k, computed at once
+        # by broadcasting the column k against the row k
+        throughK = costMatrix[:, k, np.newaxis] + costMatrix[np.newaxis, k, :]
+        improved = throughK < costMatrix
+        # If vertex k is contained in the shortest path from i to j
+        # then j is reached from the same predecessor as in the walk from k to j
+        prevMatrix = np.where(improved, prevMatrix[np.newaxis, k, :], prevMatrix)
+        np.minimum(costMatrix, throughK, out=costMatrix)
+
+        if trace:
+            print("Using vertex " + str(k) + " as an intermediate vertex\n")
+            print("Cost Matrix\n")
+            printMatrix(costMatrix)
+            print("Previous matrix\n")
+            printMatrix(prevMatrix)
+
+    return costMatrix, prevMatrix
+
+
+def lowestCostWalk(ddg, source, destination, trace=False):
+    """
+    Determines the minimum cost walk from a source vertex to a target vertex
+    and prints it
+    :param ddg: A directed graph
+    :param source: A given source vertex
+    :param destination: A given destination vertex
+    :param trace: If True, the intermediate matrices are printed as well
+    :return:
+    """
+    costMatrix, prevMatrix = floydWarshall(ddg, trace)
+    printResult(costMatrix, prevMatrix, source, destination)
 
 
-    printResult(costMatrix, prevMatrix, source, destination)
+def _relaxTile(costMatrix, prevMatrix, kBlock, iBlock, jBlock, tileSize):
+    # Relaxes the tile (iBlock, jBlock) of the matrices using the intermediate vertices of the tile kBlock
+    n = len(costMatrix)
+    rows = slice(iBlock * tileSize, min(n, (iBlock + 1) * tileSize))
+    columns = slice(jBlock * tileSize, min(n, (jBlock + 1) * tileSize))
+    costTile = costMatrix[rows, columns]
+    prevTile = prevMatrix[rows, columns]
+    for k in range(kBlock * tileSize, min(n, (kBlock + 1) * tileSize)):
+        throughK = costMatrix[rows, k, np.newaxis] + costMatrix[np.newaxis, k, columns]
+        improved = throughK < costTile
+        prevTile[...] = np.where(improved, prevMatrix[np.newaxis, k, columns], prevTile)
+        np.minimum(costTile, throughK, out=costTile)
+
 
+def _attachShared(costName, prevName, n):
+    # Pool initializer: maps the shared matrices into the address space of the worker
+    costMemory = shared_memory.SharedMemory(name=costName)
+    prevMemory = shared_memory.SharedMemory(name=prevName)
+    _shared["memory"] = (costMemory, prevMemory)
+    _shared["cost"] = np.ndarray((n, n), dtype=np.float64, buffer=costMemory.buf)
+    _shared["prev"] = np.ndarray((n, n), dtype=np.int64, buffer=prevMemory.buf)
 
+
+def _relaxSharedTile(kBlock, iBlock, jBlock, tileSize):
+    _relaxTile(_shared["cost"], _shared["prev"], kBlock, iBlock, jBlock, tileSize)
+
+
+def _blockedPhases(blocks, run):
+    # Runs the three phases of every round of the blocked algorithm
+    # run receives the list of (kBlock, iBlock, jBlock) tiles that may be relaxed concurrently
+    for kBlock in range(blocks):
+        # Phase 1: the tile on the diagonal only depends on itself
+        run([(kBlock, kBlock, kBlock)])
+        # Phase 2: the tiles on row kBlock and column kBlock only depend on themselves and the diagonal tile
+        run([(kBlock, kBlock, j) for j in range(blocks) if j != kBlock] +
+            [(kBlock, i, kBlock) for i in range(blocks) if i != kBlock])
+        # Phase 3: the remaining tiles only depend on row kBlock and column kBlock
+        run([(kBlock, i, j) for i in range(blocks) if i != kBlock for j in range(blocks) if j != kBlock])
+
+
+def blockedFloydWarshall(ddg, tileSize=256, workers=None):
+    """
+    Computes the minimum cost walks between all pairs of vertices of a graph
+    whose vertices are labelled 0, 1, ..., n-1, processing the matrices tile by tile
+    so that every step works on data that fits in the cache.
+    The tiles of a phase are independent and are distributed over a pool of processes
+    that share the matrices through shared memory.
+    The costs are identical to the ones computed by floydWarshall, the predecessors may describe
+    a different walk when several walks have the same minimum cost
+    :param ddg: A directed graph
+    :param tileSize: The number of rows and columns of a tile
+    :param workers: The number of worker processes, None for one per core, 1 to run in the current process
+    :return: The cost matrix and the prev matrix, as NumPy arrays
+    """
+    if tileSize < 1:
+        raise ValueError("The tile size must be positive")
+    costMatrix, prevMatrix = initialMatrices(ddg)
+    n = len(costMatrix)
+    blocks = (n + tileSize - 1) // tileSize
+
+    if workers == 1 or blocks <= 1:
+        _blockedPhases(blocks, lambda tiles: [_relaxTile(costMatrix, prevMatrix, k, i, j, tileSize)
+                                              for k, i, j in tiles])
+        return costMatrix, prevMatrix
+
+    costMemory = shared_memory.SharedMemory(create=True, size=max(1, costMatrix.nbytes))
+    prevMemory = shared_memory.SharedMemory(create=True, size=max(1, prevMatrix.nbytes))
+    try:
+        sharedCost = np.ndarray((n, n), dtype=np.float64, buffer=costMemory.buf)
+        sharedPrev = np.ndarray((n, n), dtype=np.int64, buffer=prevMemory.buf)
+        sharedCost[...] = costMatrix
+        sharedPrev[...] = prevMatrix
+        with Pool(workers, initializer=_attachShared, initargs=(costMemory.name, prevMemory.name, n)) as pool:
+            _blockedPhases(blocks, lambda tiles: pool.starmap(_relaxSharedTile,
+                                                              [(k, i, j, tileSize) for k, i, j in tiles]))
+        costMatrix[...] = sharedCost
+        prevMatrix[...] = sharedPrev
+        # The views have to be released before the shared memory is closed
+        del sharedCost, sharedPrev
+    finally:
+        costMemory.close()
+        costMemory.unlink()
+        prevMemory.close()
+        prevMemory.unlink()
+    return costMatrix, prevMatrix
@@ -0,0 +1,254 @@
+from contextlib import contextmanager
+from itertools import chain
+from operator import itemgetter
+
+
+def labelList(values):
+    # Returns the given labels as a list, NumPy arrays being converted to Python scalars
+    if hasattr(values, 'tolist'):
+        return values.tolist()
+    return list(values)
+
+
+def edgeColumns(edges, costs=None, default=0):
+    """
+    Splits edges into the lists of their origins, destinations and costs
+    :param edges: An iterable of (origin, destination) pairs or (origin, destination, cost) triples,
+    or a NumPy array of two or three columns, whose endpoints are integer labels
+    :param costs: An optional iterable or NumPy array of costs, which takes precedence over a third column
+    :param default: The cost of the edges given as pairs when no costs are given
+    :return: The lists of origins, destinations and costs
+    """
+    if hasattr(edges, 'ndim') and edges.ndim == 2:
+        # A single dtype covers every column of an array: the endpoints of an array holding float costs
+        # are converted back to integer labels, only the third column is kept as it is
+        endpoints = edges[:, :2]
+        if endpoints.dtype.kind == 'f':
+            endpoints = endpoints.astype('int64')
+        columns = endpoints.T.tolist()
+        if edges.shape[1] > 2:
+            columns.append(edges[:, 2].tolist())
+    else:
+        rows = edges if isinstance(edges, list) else list(edges)
+        width = len(rows[0]) if len(rows) > 0 else 2
+        columns = [list(map(itemgetter(k), rows)) for k in range(min(width, 3))]
+    origins = columns[0]
+    destinations = columns[1]
+    if costs is not None:
+        costs = labelList(costs)
+        if len(costs) != len(origins):
+            raise ValueError("The number of costs does not match the number of edges")
+    elif len(columns) > 2:
+        costs = columns[2]
+    else:
+        costs = [default] * len(origins)
+    return origins, destinations, costs
+
+
+# Below this number of edges the indexes are updated edge by edge, above it the edges are grouped with NumPy
+BULK_THRESHOLD = 4096
+
+
+def distinctLabels(vertices, origins, destinations):
+    """
+    Lists the distinct labels among the given vertices followed by the endpoints of the edges
+    :param vertices: The list of the vertices
+    :param origins: The list of the origins
+    :param destinations: The list of the destinations
+    :return: The list of the distinct labels, in the order they first appear
+    """
+    if len(vertices) + len(origins) < BULK_THRESHOLD:
+        return list(dict.fromkeys(chain(vertices, chain.from_iterable(zip(origins, destinations)))))
+    import numpy as np
+    # Integer labels, as produced by the loaders and generators, are deduplicated with NumPy
+    columns = [np.array(column) if len(column) > 0 else np.empty(0, dtype=np.int64)
+               for column in (vertices, origins, destinations)]
+    if all(column.dtype == np.int64 for column in columns):
+        values = np.concatenate((columns[0], np.column_stack(columns[1:]).ravel()))
+        low = int(values.min())
+        span = int(values.max()) - low + 1
+        if span <= 4 * len(values) + 1024:
+            # The first position of every label, through a lookup table when they are dense enough
+            table = np.full(span, len(values), dtype=np.int64)
+            np.minimum.at(table, values - low, np.arange(len(values)))
+            occurrences = table[table < len(values)]
+        else:
+            _, occurrences = np.unique(values, return_index=True)
+        occurrences.sort()
+        return values[occurrences].tolist()
+    return list(dict.fromkeys(chain(vertices, chain.from_iterable(zip(origins, destinations)))))
+
+
+def endpointIndices(labels, origins, destinations):
+    """
+    Maps the endpoints of edges to the positions of their labels
+    :param labels: The list of the distinct labels
+    :param origins: The list of the origins
+    :param destinations: The list of the destinations
+    :return: Two NumPy arrays of positions in labels
+    """
+    import numpy as np
+    if all(type(x) is int for x in labels):
+        # Integer labels, as produced by the loaders and generators, are located with NumPy:
+        # through a lookup table when they are dense enough, by a binary search otherwise
+        try:
+            values = np.array(labels, dtype=np.int64)
+            originValues = np.array(origins, dtype=np.int64)
+            destinationValues = np.array(destinations, dtype=np.int64)
+        except OverflowError:
+            values = None
+        if values is not None and len(values) > 0:
+            low = int(values.min())
+            span = int(values.max()) - low + 1
+            if span <= 4 * len(values) + 1024:
+                table = np.empty(span, dtype=np.int64)
+                table[values - low] = np.arange(len(values))
+                return table[originValues - low], table[destinationValues - low]
+            sorter = np.argsort(values)
+            return (sorter[np.searchsorted(values, originValues, sorter=sorter)],
+                    sorter[np.searchsorted(values, destinationValues, sorter=sorter)])
+    index = {x: i for i, x in enumerate(labels)}
+    first = np.fromiter(map(index.__getitem__, origins), dtype=np.int64, count=len(origins))
+    second = np.fromiter(map(index.__getitem__, destinations), dtype=np.int64, count=len(destinations))
+    return first, second
+
+
+def firstOccurrences(first, second, n, symmetric=False):
+    """
+    Finds the first occurrence of every pair of positions
+    :param first: A NumPy array of positions between 0 and n-1
+    :param second: A NumPy array of positions between 0 and n-1
+    :param n: The number of positions
+    :param symmetric: Whether (i, j) and (j, i) are the same pair
+    :return: The sorted NumPy array of the indices of the first occurrences
+    """
+    import numpy as np
+    if symmetric:
+        first, second = np.minimum(first, second), np.maximum(first, second)
+    keys = first * n + second
+    if len(keys) == 0:
+        return np.empty(0, dtype=np.int64)
+    # An unstable sort groups the equal keys, the first occurrence being the lowest index of its group
+    order = np.argsort(keys)
+    keys = keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    occurrences = np.minimum.reduceat(order, starts)
+    occurrences.sort()
+    return occurrences
+
+
+def groupInto(rows, vertices, heads, tails, values=None, positions=None):
+    """
+    Adds tails[k] (mapped to its value if values are given, else None) to the row of vertices[heads[k]] for every k,
+    one row at a time and keeping the order of the pairs within a row
+    :param rows: A dictionary mapping vertices to their row, a dictionary
+    :param vertices: The list of the vertices by position
+    :param heads: A NumPy array of positions
+    :param tails: A NumPy array of positions
+    :param values: An optional list of values
+    :param positions: An optional NumPy array, the value of the pair k being values[positions[k]] instead of values[k]
+    :return:
+    """
+    import numpy as np
+    if len(heads) == 0:
+        return
+    order = np.argsort(heads, kind='stable')
+    heads = heads[order]
+    cuts = [0] + (np.flatnonzero(np.diff(heads)) + 1).tolist() + [len(heads)]
+    targets = list(map(vertices.__getitem__, tails[order].tolist()))
+    if values is not None:
+        if positions is not None:
+            order = positions[order]
+        values = list(map(values.__getitem__, order.tolist()))
+    for k, head in enumerate(heads[cuts[:-1]].tolist()):
+        row = rows[vertices[head]]
+        if values is None:
+            row.update(dict.fromkeys(targets[cuts[k]:cuts[k + 1]]))
+        else:
+            row.update(zip(targets[cuts[k]:cuts[k + 1]], values[cuts[k]:cuts[k + 1]]))
+
+
+class BatchMutations:
+    """
+    Bulk mutations shared by the graph classes. Outside of a batch every bulk operation is checked as a whole
+    before anything is changed; inside a batch() block the operations are only recorded, without any check,
+    and applied in order when the block ends, each run of additions being inserted at once.
+    A graph using it provides _insertColumns(vertices, origins, destinations, costs), which adds the vertices
+    and the edges that are not in the graph yet (repeated edges keep their first cost), and _removeMany(pairs),
+    which removes the edges given by their endpoints that are in the graph
+    """
+    # The operations recorded by the batch in progress, None outside of a batch
+    _batch = None
+
+    def _insertColumns(self, vertices, origins, destinations, costs):
+        # Default insertion, through the per graph _insertMany; the endpoints are added in the order of the edges
+        endpoints = chain.from_iterable(zip(origins, destinations))
+        self._insertMany(dict.fromkeys(chain(vertices, endpoints)), zip(origins, destinations, costs))
+
+    def add_vertices_from(self, vertices):
+        # Adds the given vertices, the ones already in the graph are skipped
+        # Complexity: Theta(number of vertices)
+        vertices = labelList(vertices)
+        if self._batch is not None:
+            self._batch.append((vertices, [], [], []))
+            return
+        self._insertColumns(vertices, [], [], [])
+
+    def add_edges_from(self, edges, costs=None):
+        # Adds the given edges, as pairs (of cost 0 unless costs are given), triples or a NumPy array of 2 or 3 columns
+        # The edges already in the graph are skipped and repeated edges keep their first cost
+        # Precondition: outside of a batch the endpoints are vertices of the graph,
+        # inside a batch the endpoints that are not vertices yet are added
+        # Complexity: Theta(number of edges)
+        origins, destinations, costs = edgeColumns(edges, costs)
+        if self._batch is not None:
+            self._batch.append(([], origins, destinations, costs))
+            return
+        for x in dict.fromkeys(chain(origins, destinations)):
+            if not self.isVertex(x):
+                raise ValueError("The vertex specified is not valid")
+        self._insertColumns([], origins, destinations, costs)
+
+    def remove_edges_from(self, edges):
+        # Removes the given edges, given as (origin, destination) pairs or a NumPy array, extra columns are ignored
+        # Precondition: outside of a batch every edge exists, inside a batch the missing edges are skipped
+        origins, destinations, _ = edgeColumns(edges)
+        pairs = list(dict.fromkeys(zip(origins, destinations)))
+        if self._batch is not None:
+            self._batch.append(pairs)
+            return
+        for x, y in pairs:
+            if not self.isEdge(x, y):
+                raise ValueError("Edge does not exist!")
+        self._removeMany(pairs)
+
+    @contextmanager
+    def batch(self):
+        # Defers the bulk operations until the end of the with block, where they are applied in order;
+        # if the block raises an exception they are discarded. Other methods keep applying their changes at once
+        # A batch started inside another one is part of it
+        if self._batch is not None:
+            yield self
+            return
+        self._batch = []
+        try:
+            yield self
+        except BaseException:
+            self._batch = None
+            raise
+        operations = self._batch
+        self._batch = None
+        # Consecutive additions are merged so that the indexes are updated once for all of them
+        vertices, origins, destinations, costs = [], [], [], []
+        for operation in operations + [None]:
+            if isinstance(operation, tuple):
+                vertices.extend(operation[0])
+                origins.extend(operation[1])
+                destinations.extend(operation[2])
+                costs.extend(operation[3])
+                continue
+            if len(vertices) > 0 or len(origins) > 0:
+                self._insertColumns(vertices, origins, destinations, costs)
+                vertices, origins, destinations, costs = [], [], [], []
+            if operation is not None:
+                self._removeMany(operation)
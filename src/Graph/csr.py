@@ -0,0 +1,1025 @@
+from array import array
+from bisect import bisect_left
+from batch import BULK_THRESHOLD, BatchMutations, distinctLabels, endpointIndices, firstOccurrences
+import heapq
+from edge import Edge
+from overlay import DirectedGraphOverlay, UndirectedGraphOverlay
+
+
+def _typecode(buffer):
+    # Returns the item type of an array or of a memoryview over a mapped file
+    if isinstance(buffer, array):
+        return buffer.typecode
+    return buffer.format
+
+
+def _copyBuffer(buffer):
+    # Copies an array or a memoryview into a new array of the same type
+    return array(_typecode(buffer), bytes(buffer))
+
+
+# The arrays are rebuilt once the buffered edges (or the removed ones) outnumber this many edges and
+# one edge out of _PENDING_FRACTION of the stored ones; until then reads merge the buffered edges in
+# and skip the removed ones
+_PENDING_MINIMUM = 1024
+_PENDING_FRACTION = 4
+
+
+def _weightTypecode(weights):
+    # Integer costs are stored as signed 64 bit values, anything else falls back to doubles
+    for weight in weights:
+        if not isinstance(weight, int):
+            return 'd'
+    return 'q'
+
+
+def _columnArrays(weights, costs):
+    # Returns the NumPy array of the stored weights followed by the given costs, and the typecode holding them all
+    import numpy as np
+    values = np.array(costs)
+    if values.dtype != np.int64 and values.dtype != np.float64:
+        values = np.array(costs, dtype=np.float64 if _weightTypecode(costs) == 'd' else np.int64)
+    typecode = 'd' if _typecode(weights) == 'd' or values.dtype == np.float64 else 'q'
+    dtype = np.float64 if typecode == 'd' else np.int64
+    stored = np.frombuffer(weights, dtype=np.float64 if _typecode(weights) == 'd' else np.int64)
+    return np.concatenate((stored.astype(dtype), values.astype(dtype))), typecode
+
+
+def _toArray(values, typecode):
+    # Copies a NumPy array into a new array of the given type
+    import numpy as np
+    buffer = array(typecode)
+    buffer.frombytes(values.astype(np.float64 if typecode == 'd' else np.int64).tobytes())
+    return buffer
+
+
+def _rowOffsets(heads, n):
+    # Returns the offsets array of the rows of n vertices holding the entries with the given sorted heads
+    import numpy as np
+    return _toArray(np.concatenate(([0], np.cumsum(np.bincount(heads, minlength=n)))), 'q')
+
+
+def _rowHeads(offsets):
+    # Returns the NumPy array of the row of every entry of an offsets array
+    import numpy as np
+    offsets = np.frombuffer(offsets, dtype=np.int64)
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+class CSRDirectedGraph(BatchMutations):
+    """
+    Compact directed graph: every label is interned to an integer index and the adjacency is kept
+    in compressed sparse row arrays (offsets, targets and weights) for both directions.
+    The row of vertex i spans positions offsets[i] .. offsets[i+1] - 1 and its targets are sorted,
+    so neighbour lookups are binary searches over a contiguous slice.
+    The inbound arrays do not duplicate the weights, they store the position of each edge in the outbound arrays.
+    Edges added after construction are buffered, and the reads of a single vertex merge them with its rows;
+    removed edges are marked by the position of their slot and skipped by the reads. The arrays are only
+    rebuilt once the buffered or the removed edges grow past a fraction of the stored edges, on the removal
+    of a vertex, or on the reads that need the whole arrays.
+    Integer costs are stored as 64 bit integers; once a non integer cost is stored, all costs are kept as doubles.
+    """
+    def __init__(self, graph=None):
+        # Label table: index -> label and label -> index
+        self._labels = []
+        self._index = {}
+        self._outOffsets = array('q', [0])
+        self._outTargets = array('q')
+        self._outWeights = array('q')
+        self._inOffsets = array('q', [0])
+        self._inSources = array('q')
+        self._inEdges = array('q')
+        # Edges added since the last rebuild, mapping (origin index, destination index) to the cost,
+        # and the same edges by origin and by destination, in the order they were added
+        self._pending = {}
+        self._pendingOut = {}
+        self._pendingIn = {}
+        # Positions in the outbound arrays of the edges removed since the last rebuild,
+        # and the number of them by origin and by destination
+        self._removed = set()
+        self._removedOut = {}
+        self._removedIn = {}
+        # The number of edges having a negative cost
+        self._negativeCosts = 0
+        if graph is not None:
+            self._load(graph)
+
+    def _load(self, graph):
+        # Copies the vertices and the edges of any graph exposing parseX and parseXYTuples
+        for x in graph.parseX():
+            self._index[x] = len(self._labels)
+            self._labels.append(x)
+        index = self._index
+        triples = [(index[x], index[y], c) for x, y, c in graph.parseXYTuples()]
+        self._build(triples)
+
+    def _build(self, triples):
+        # Rebuilds the CSR arrays from a list of (origin index, destination index, cost) triples
+        # Complexity: O(n + m log m)
+        n = len(self._labels)
+        triples.sort(key=lambda triple: (triple[0], triple[1]))
+        m = len(triples)
+
+        outOffsets = array('q', bytes(8 * (n + 1)))
+        for triple in triples:
+            outOffsets[triple[0] + 1] += 1
+        for i in range(n):
+            outOffsets[i + 1] += outOffsets[i]
+        outTargets = array('q', [triple[1] for triple in triples])
+        weights = [triple[2] for triple in triples]
+        outWeights = array(_weightTypecode(weights), weights)
+        negativeCosts = sum(1 for weight in weights if weight < 0)
+
+        # The inbound direction is the same edge set sorted by (destination, origin)
+        order = sorted(range(m), key=lambda e: (triples[e][1], triples[e][0]))
+        inOffsets = array('q', bytes(8 * (n + 1)))
+        for triple in triples:
+            inOffsets[triple[1] + 1] += 1
+        for i in range(n):
+            inOffsets[i + 1] += inOffsets[i]
+        inSources = array('q', [triples[e][0] for e in order])
+        inEdges = array('q', order)
+
+        self._outOffsets = outOffsets
+        self._outTargets = outTargets
+        self._outWeights = outWeights
+        self._inOffsets = inOffsets
+        self._inSources = inSources
+        self._inEdges = inEdges
+        self._negativeCosts = negativeCosts
+        self._pending = {}
+        self._pendingOut = {}
+        self._pendingIn = {}
+        self._removed = set()
+        self._removedOut = {}
+        self._removedIn = {}
+
+    def _triples(self):
+        # Returns an iterator over the (origin index, destination index, cost) triples stored in the arrays,
+        # the removed edges being skipped
+        offsets = self._outOffsets
+        targets = self._outTargets
+        weights = self._outWeights
+        removed = self._removed
+        for u in range(len(offsets) - 1):
+            for e in range(offsets[u], offsets[u + 1]):
+                if e not in removed:
+                    yield u, targets[e], weights[e]
+
+    def _compact(self):
+        # Merges the buffered edges and the newly added vertices into the arrays and drops the removed edges
+        if not self._pending and not self._removed and len(self._outOffsets) == len(self._labels) + 1:
+            return
+        triples = list(self._triples())
+        triples.extend((u, v, c) for (u, v), c in self._pending.items())
+        self._build(triples)
+
+    def _buffer(self, i, j, c):
+        # Buffers a new edge i -> j
+        self._pending[(i, j)] = c
+        self._pendingOut.setdefault(i, []).append(j)
+        self._pendingIn.setdefault(j, []).append(i)
+
+    def _unbuffer(self, i, j):
+        # Removes the edge i -> j, buffered or stored, and returns its cost
+        if (i, j) in self._pending:
+            self._pendingOut[i].remove(j)
+            if not self._pendingOut[i]:
+                del self._pendingOut[i]
+            self._pendingIn[j].remove(i)
+            if not self._pendingIn[j]:
+                del self._pendingIn[j]
+            return self._pending.pop((i, j))
+        # A stored edge only leaves a tombstone in its slot
+        pos = self._find(i, j)
+        self._removed.add(pos)
+        self._removedOut[i] = self._removedOut.get(i, 0) + 1
+        self._removedIn[j] = self._removedIn.get(j, 0) + 1
+        return self._outWeights[pos]
+
+    def _settle(self):
+        # Rebuilds the arrays once the buffered or the removed edges are too many for the reads
+        # to merge or skip them cheaply
+        # Amortized complexity: O(log m) per buffered or removed edge
+        limit = max(_PENDING_MINIMUM, len(self._outTargets) // _PENDING_FRACTION)
+        if len(self._pending) > limit or len(self._removed) > limit:
+            self._compact()
+
+    def _outNeighbours(self, i):
+        # Returns an iterable over the outbound neighbours of the vertex with index i, by increasing index
+        if i < len(self._outOffsets) - 1:
+            stored = self._outTargets[self._outOffsets[i]:self._outOffsets[i + 1]]
+            if i in self._removedOut:
+                removed = self._removed
+                targets = self._outTargets
+                stored = [targets[e] for e in range(self._outOffsets[i], self._outOffsets[i + 1]) if e not in removed]
+        else:
+            stored = ()
+        buffered = self._pendingOut.get(i)
+        if buffered is None:
+            return stored
+        return heapq.merge(stored, sorted(buffered))
+
+    def _inNeighbours(self, j):
+        # Returns an iterable over the inbound neighbours of the vertex with index j, by increasing index
+        if j < len(self._inOffsets) - 1:
+            stored = self._inSources[self._inOffsets[j]:self._inOffsets[j + 1]]
+            if j in self._removedIn:
+                removed = self._removed
+                sources = self._inSources
+                edges = self._inEdges
+                stored = [sources[e] for e in range(self._inOffsets[j], self._inOffsets[j + 1])
+                          if edges[e] not in removed]
+        else:
+            stored = ()
+        buffered = self._pendingIn.get(j)
+        if buffered is None:
+            return stored
+        return heapq.merge(stored, sorted(buffered))
+
+    def _outbound(self, i):
+        # Returns an iterator over the (destination index, cost) pairs of the outbound edges of the vertex
+        # with index i, by increasing destination index
+        if i < len(self._outOffsets) - 1:
+            weights = self._outWeights
+            targets = self._outTargets
+            removed = self._removed
+            stored = ((targets[e], weights[e]) for e in range(self._outOffsets[i], self._outOffsets[i + 1])
+                      if e not in removed)
+        else:
+            stored = ()
+        buffered = self._pendingOut.get(i)
+        if buffered is None:
+            return iter(stored)
+        return heapq.merge(stored, sorted((j, self._pending[(i, j)]) for j in buffered))
+
+    def _inbound(self, j):
+        # Returns an iterator over the (origin index, cost) pairs of the inbound edges of the vertex
+        # with index j, by increasing origin index
+        if j < len(self._inOffsets) - 1:
+            weights = self._outWeights
+            sources = self._inSources
+            edges = self._inEdges
+            removed = self._removed
+            stored = ((sources[e], weights[edges[e]]) for e in range(self._inOffsets[j], self._inOffsets[j + 1])
+                      if edges[e] not in removed)
+        else:
+            stored = ()
+        buffered = self._pendingIn.get(j)
+        if buffered is None:
+            return iter(stored)
+        return heapq.merge(stored, sorted((i, self._pending[(i, j)]) for i in buffered))
+
+    def _find(self, i, j):
+        # Returns the position of the edge i -> j in the outbound arrays, -1 if it is not stored there
+        # or if it was removed
+        if i >= len(self._outOffsets) - 1:
+            return -1
+        start = self._outOffsets[i]
+        stop = self._outOffsets[i + 1]
+        pos = bisect_left(self._outTargets, j, start, stop)
+        if pos < stop and self._outTargets[pos] == j and pos not in self._removed:
+            return pos
+        return -1
+
+    def _vertexIndex(self, x):
+        # Returns the index of an existing vertex
+        # Precondition: the given vertex exists
+        if x not in self._index:
+            raise ValueError("The vertex specified is not valid")
+        return self._index[x]
+
+    @classmethod
+    def fromBuffers(cls, labels, buffers, negativeCosts=None):
+        # Builds a graph directly on top of existing CSR buffers (arrays or memoryviews) without copying them
+        # buffers holds, in order, the outbound offsets, targets and costs,
+        # the inbound offsets, sources and the positions of the inbound edges in the outbound arrays
+        # The buffers are only replaced by new arrays when the structure of the graph changes
+        csr = cls()
+        csr._labels = labels
+        csr._index = {label: i for i, label in enumerate(labels)}
+        (csr._outOffsets, csr._outTargets, csr._outWeights,
+         csr._inOffsets, csr._inSources, csr._inEdges) = buffers
+        if negativeCosts is None:
+            negativeCosts = sum(1 for weight in csr._outWeights if weight < 0)
+        csr._negativeCosts = negativeCosts
+        return csr
+
+    def buffers(self):
+        # Returns the CSR buffers in the order expected by fromBuffers
+        self._compact()
+        return (self._outOffsets, self._outTargets, self._outWeights,
+                self._inOffsets, self._inSources, self._inEdges)
+
+    def indexOf(self, x):
+        # Returns the integer index of a vertex
+        # Precondition: the given vertex exists
+        return self._vertexIndex(x)
+
+    def labelOf(self, i):
+        # Returns the label of the vertex having a given integer index
+        return self._labels[i]
+
+    def outboundArrays(self):
+        # Returns the offsets and the targets arrays of the outbound direction
+        # The outbound neighbours of the vertex with index i are targets[offsets[i]:offsets[i+1]]
+        self._compact()
+        return self._outOffsets, self._outTargets
+
+    def inboundArrays(self):
+        # Returns the offsets and the sources arrays of the inbound direction
+        # The inbound neighbours of the vertex with index i are sources[offsets[i]:offsets[i+1]]
+        self._compact()
+        return self._inOffsets, self._inSources
+
+    @property
+    def vertexCount(self):
+        # Returns the number of vertices of the graph
+        return len(self._labels)
+
+    @property
+    def edgeCount(self):
+        # Returns the number of edges of the graph
+        return len(self._outTargets) - len(self._removed) + len(self._pending)
+
+    @property
+    def hasNegativeCost(self):
+        # Returns True if at least one edge has a negative cost
+        # Complexity: Theta(1)
+        return self._negativeCosts > 0
+
+    def isVertex(self, x):
+        # Checks for the existence of a vertex with a given label
+        return x in self._index
+
+    def isEdge(self, x, y):
+        # Returns True if there is an edge from x to y, False otherwise
+        # Complexity: O(log deg(x))
+        if x not in self._index or y not in self._index:
+            return False
+        i = self._index[x]
+        j = self._index[y]
+        return (i, j) in self._pending or self._find(i, j) >= 0
+
+    def addVertex(self, x):
+        # Adds a new vertex with a given label
+        # Precondition: The vertex does not exist (the label is unique)
+        if x in self._index:
+            raise ValueError("Vertex already in the graph!")
+        self._index[x] = len(self._labels)
+        self._labels.append(x)
+
+    def addEdge(self, x, y, c):
+        # Adds an edge from x to y, which is buffered until the next rebuild of the arrays
+        # Precondition: there is no edge from x to y
+        # Amortized complexity: O(log m)
+        if self.isEdge(x, y):
+            raise ValueError("Edge already exists!")
+        self._buffer(self._vertexIndex(x), self._vertexIndex(y), c)
+        if c < 0:
+            self._negativeCosts += 1
+        self._settle()
+
+    def removeEdge(self, x, y):
+        # Removes an edge given a source and a destination vertex
+        # Precondition: The edge exists
+        # Amortized complexity: O(log m + deg(x) + deg(y))
+        if not self.isEdge(x, y):
+            raise ValueError("Edge does not exist!")
+        if self._unbuffer(self._index[x], self._index[y]) < 0:
+            self._negativeCosts -= 1
+        self._settle()
+
+    def removeVertex(self, x):
+        # Removes a vertex having a given label, the indices of the following vertices are shifted down
+        # so the arrays are rebuilt at once
+        # Precondition: the vertex exists
+        # Complexity: O(n + m log m)
+        if x not in self._index:
+            raise ValueError("Vertex does not exist!")
+        self._compact()
+        i = self._index[x]
+        triples = [(u - (u > i), v - (v > i), c) for u, v, c in self._triples() if u != i and v != i]
+        self._labels.pop(i)
+        self._index = {label: k for k, label in enumerate(self._labels)}
+        self._build(triples)
+
+    def parseX(self):
+        # Returns an iterator for parsing all the vertices
+        for x in self._labels:
+            yield x
+
+    def parseXY(self):
+        # Returns an iterator for parsing all the edges, ordered by origin and destination index
+        self._compact()
+        labels = self._labels
+        for u, v, c in self._triples():
+            yield Edge(labels[u], labels[v], c)
+
+    def parseXYTuples(self):
+        # Returns an iterator for parsing all the edges as (origin, destination, cost) tuples
+        self._compact()
+        labels = self._labels
+        for u, v, c in self._triples():
+            yield labels[u], labels[v], c
+
+    def parseDout(self, x):
+        # Returns an iterator for parsing the outbound neighbours of x
+        # Precondition: the given vertex exists
+        i = self._vertexIndex(x)
+        labels = self._labels
+        offsets = self._outOffsets
+        if i not in self._pendingOut and i not in self._removedOut and i < len(offsets) - 1:
+            # Only the arrays hold edges of x
+            for j in self._outTargets[offsets[i]:offsets[i + 1]]:
+                yield labels[j]
+            return
+        for j in self._outNeighbours(i):
+            yield labels[j]
+
+    def parseDin(self, x):
+        # Returns an iterator for parsing the inbound neighbours of x
+        # Precondition: the given vertex exists
+        j = self._vertexIndex(x)
+        labels = self._labels
+        offsets = self._inOffsets
+        if j not in self._pendingIn and j not in self._removedIn and j < len(offsets) - 1:
+            # Only the arrays hold edges of x
+            for i in self._inSources[offsets[j]:offsets[j + 1]]:
+                yield labels[i]
+            return
+        for i in self._inNeighbours(j):
+            yield labels[i]
+
+    def getIndegree(self, x):
+        # Calculates the indegree for a given vertex
+        # Precondition: The given vertex exists
+        i = self._vertexIndex(x)
+        stored = self._inOffsets[i + 1] - self._inOffsets[i] if i < len(self._inOffsets) - 1 else 0
+        return stored - self._removedIn.get(i, 0) + len(self._pendingIn.get(i, ()))
+
+    def getOutdegree(self, x):
+        # Calculates the outdegree for a given vertex
+        # Precondition: The given vertex exists
+        i = self._vertexIndex(x)
+        stored = self._outOffsets[i + 1] - self._outOffsets[i] if i < len(self._outOffsets) - 1 else 0
+        return stored - self._removedOut.get(i, 0) + len(self._pendingOut.get(i, ()))
+
+    def costEdge(self, x, y):
+        # Returns the cost of an edge specified by the two endpoints
+        # Precondition: The edge exists
+        if not self.isEdge(x, y):
+            raise ValueError("The edge does not exist!")
+        key = (self._index[x], self._index[y])
+        if key in self._pending:
+            return self._pending[key]
+        return self._outWeights[self._find(key[0], key[1])]
+
+    def setCostEdge(self, x, y, c):
+        # Modifies the cost of an edge in place
+        # Precondition : The edge exists
+        if not self.isEdge(x, y):
+            raise ValueError("The edge does not exist!")
+        key = (self._index[x], self._index[y])
+        if key in self._pending:
+            self._negativeCosts += (c < 0) - (self._pending[key] < 0)
+            self._pending[key] = c
+            return
+        if _typecode(self._outWeights) == 'q' and not isinstance(c, int):
+            self._outWeights = array('d', self._outWeights)
+        pos = self._find(key[0], key[1])
+        self._negativeCosts += (c < 0) - (self._outWeights[pos] < 0)
+        self._outWeights[pos] = c
+
+    def inboundEdges(self, x):
+        # Returns an iterator for parsing all the inbound edges for a specified vertex
+        # Precondition: The vertex exists
+        labels = self._labels
+        for i, c in self._inbound(self._vertexIndex(x)):
+            yield Edge(labels[i], x, c)
+
+    def outboundEdges(self, x):
+        # Returns an iterator for parsing all the outbound edges for a specified vertex
+        # Precondition: The vertex exists
+        labels = self._labels
+        for j, c in self._outbound(self._vertexIndex(x)):
+            yield Edge(x, labels[j], c)
+
+    def inboundEdgeTuples(self, x):
+        # Returns an iterator for parsing the inbound edges of a vertex as (origin, destination, cost) tuples
+        # Precondition: The vertex exists
+        labels = self._labels
+        for i, c in self._inbound(self._vertexIndex(x)):
+            yield labels[i], x, c
+
+    def outboundEdgeTuples(self, x):
+        # Returns an iterator for parsing the outbound edges of a vertex as (origin, destination, cost) tuples
+        # Precondition: The vertex exists
+        labels = self._labels
+        for j, c in self._outbound(self._vertexIndex(x)):
+            yield x, labels[j], c
+
+    def deepcopy(self):
+        # Generates a copy of the graph, the arrays are copied as flat buffers
+        self._compact()
+        copy_csr = CSRDirectedGraph()
+        copy_csr._labels = list(self._labels)
+        copy_csr._index = dict(self._index)
+        copy_csr._outOffsets = _copyBuffer(self._outOffsets)
+        copy_csr._outTargets = _copyBuffer(self._outTargets)
+        copy_csr._outWeights = _copyBuffer(self._outWeights)
+        copy_csr._inOffsets = _copyBuffer(self._inOffsets)
+        copy_csr._inSources = _copyBuffer(self._inSources)
+        copy_csr._inEdges = _copyBuffer(self._inEdges)
+        copy_csr._negativeCosts = self._negativeCosts
+        return copy_csr
+
+    def snapshot(self):
+        # Returns a copy-on-write view of the graph, which must not be modified while the view is in use
+        return DirectedGraphOverlay(self)
+
+    def clear(self):
+        self._labels = []
+        self._index = {}
+        self._build([])
+
+    def _insertMany(self, vertices, edges):
+        # Adds the vertices that are not in the graph yet, in order, then the edges that do not exist yet
+        # Duplicate edges keep their first cost. The endpoints of the edges must be vertices of the graph
+        index = self._index
+        labels = self._labels
+        for x in vertices:
+            if x not in index:
+                index[x] = len(labels)
+                labels.append(x)
+        pending = self._pending
+        for x, y, c in edges:
+            key = (index[x], index[y])
+            if key in pending or self._find(key[0], key[1]) >= 0:
+                continue
+            self._buffer(key[0], key[1], c)
+            if c < 0:
+                self._negativeCosts += 1
+        self._settle()
+
+    def _insertColumns(self, vertices, origins, destinations, costs):
+        # Adds the given vertices and the endpoints of the edges that are not in the graph yet, in order,
+        # then the edges that do not exist yet, the first cost of a repeated edge being kept
+        # Large batches skip the buffer: the new edges are appended to the stored ones, deduplicated
+        # and sorted with NumPy, and the arrays are assembled from the resulting columns
+        # Complexity: O(n + m log m) for a large batch
+        if len(origins) < BULK_THRESHOLD:
+            BatchMutations._insertColumns(self, vertices, origins, destinations, costs)
+            return
+        import numpy as np
+        self._compact()
+        heads = _rowHeads(self._outOffsets)
+        tails = np.frombuffer(self._outTargets, dtype=np.int64)
+        weights, typecode = _columnArrays(self._outWeights, costs)
+        index = self._index
+        labels = self._labels
+        for x in distinctLabels(vertices, origins, destinations):
+            if x not in index:
+                index[x] = len(labels)
+                labels.append(x)
+        first, second = endpointIndices(labels, origins, destinations)
+        heads = np.concatenate((heads, first))
+        tails = np.concatenate((tails, second))
+        # The stored edges come first, so an edge that exists already keeps its cost
+        kept = firstOccurrences(heads, tails, len(labels))
+        # The pairs are distinct from now on, so sorting them by a single key needs no stable sort
+        order = kept[np.argsort(heads[kept] * len(labels) + tails[kept])]
+        heads = heads[order]
+        tails = tails[order]
+        weights = weights[order]
+        # The inbound direction is the same edge set sorted by (destination, origin)
+        inOrder = np.argsort(tails * len(labels) + heads)
+        self._outOffsets = _rowOffsets(heads, len(labels))
+        self._outTargets = _toArray(tails, 'q')
+        self._outWeights = _toArray(weights, typecode)
+        self._inOffsets = _rowOffsets(tails[inOrder], len(labels))
+        self._inSources = _toArray(heads[inOrder], 'q')
+        self._inEdges = _toArray(inOrder, 'q')
+        self._negativeCosts = int(np.count_nonzero(weights < 0))
+
+    def _removeMany(self, pairs):
+        # Removes the edges given by their endpoints that are in the graph
+        for x, y in pairs:
+            if self.isEdge(x, y):
+                if self._unbuffer(self._index[x], self._index[y]) < 0:
+                    self._negativeCosts -= 1
+        self._settle()
+
+    def isolated_vertices(self):
+        self._compact()
+        for i in range(len(self._labels)):
+            if self._outOffsets[i + 1] == self._outOffsets[i] and self._inOffsets[i + 1] == self._inOffsets[i]:
+                yield self._labels[i]
+
+
+class CSRUndirectedGraph(BatchMutations):
+    """
+    Compact undirected graph: every label is interned to an integer index, every edge is stored in its
+    canonical orientation (lower index first) and the adjacency is a symmetric compressed sparse row structure.
+    The row of vertex i spans positions offsets[i] .. offsets[i+1] - 1 of the sorted neighbours array
+    and lists every neighbour once (a loop appears once, in the row of its vertex).
+    Each edge has a single weight slot: the entries of row u that are not lower than u are the canonical
+    edges of u, in order, so the edge u - v (u <= v) is weight number upper[u] plus the rank of v among them.
+    Both endpoints reach the same slot, so no lookup is ever repeated with the endpoints swapped.
+    Edges added after construction are buffered, and the reads of a single vertex merge them with its row;
+    removed edges are marked by their canonical pair and skipped by the reads. The arrays are only rebuilt
+    once the buffered or the removed edges grow past a fraction of the stored edges, on the removal
+    of a vertex, or on the reads that need the whole arrays.
+    Integer costs are stored as 64 bit integers; once a non integer cost is stored, all costs are kept as doubles.
+    """
+    def __init__(self, graph=None):
+        # Label table: index -> label and label -> index
+        self._labels = []
+        self._index = {}
+        self._offsets = array('q', [0])
+        self._neighbours = array('q')
+        # upper[u] is the number of canonical edges of the vertices before u
+        self._upper = array('q', [0])
+        self._weights = array('q')
+        # Edges added since the last rebuild, mapping the canonical (lower index, higher index) pair to the cost,
+        # and the same edges by endpoint, in the order they were added (a loop once)
+        self._pending = {}
+        self._pendingAdjacent = {}
+        # Canonical pairs of the stored edges removed since the last rebuild, and the number of them by endpoint
+        self._removed = set()
+        self._removedAdjacent = {}
+        if graph is not None:
+            self._load(graph)
+
+    def _load(self, graph):
+        # Copies the vertices and the edges of any undirected graph exposing parseX and parseXYTuples
+        for x in graph.parseX():
+            self._index[x] = len(self._labels)
+            self._labels.append(x)
+        index = self._index
+        edges = {}
+        for x, y, c in graph.parseXYTuples():
+            edges.setdefault(_canonical(index[x], index[y]), c)
+        self._build([(u, v, c) for (u, v), c in edges.items()])
+
+    def _build(self, triples):
+        # Rebuilds the arrays from a list of canonical (lower index, higher index, cost) triples
+        # Complexity: O(n + m log m)
+        n = len(self._labels)
+        triples.sort(key=lambda triple: (triple[0], triple[1]))
+
+        upper = array('q', bytes(8 * (n + 1)))
+        for triple in triples:
+            upper[triple[0] + 1] += 1
+        for i in range(n):
+            upper[i + 1] += upper[i]
+        weights = [triple[2] for triple in triples]
+
+        # Every edge appears in the rows of both endpoints, a loop only once
+        entries = [(u, v) for u, v, _ in triples]
+        entries.extend((v, u) for u, v, _ in triples if u != v)
+        entries.sort()
+        offsets = array('q', bytes(8 * (n + 1)))
+        for entry in entries:
+            offsets[entry[0] + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+
+        self._offsets = offsets
+        self._neighbours = array('q', [entry[1] for entry in entries])
+        self._upper = upper
+        self._weights = array(_weightTypecode(weights), weights)
+        self._pending = {}
+        self._pendingAdjacent = {}
+        self._removed = set()
+        self._removedAdjacent = {}
+
+    def _triples(self):
+        # Returns an iterator over the canonical (lower index, higher index, cost) triples stored in the arrays,
+        # the removed edges being skipped
+        offsets = self._offsets
+        neighbours = self._neighbours
+        weights = self._weights
+        removed = self._removed
+        for u in range(len(offsets) - 1):
+            start = bisect_left(neighbours, u, offsets[u], offsets[u + 1])
+            for k in range(offsets[u + 1] - start):
+                if not removed or (u, neighbours[start + k]) not in removed:
+                    yield u, neighbours[start + k], weights[self._upper[u] + k]
+
+    def _compact(self):
+        # Merges the buffered edges and the newly added vertices into the arrays and drops the removed edges
+        if not self._pending and not self._removed and len(self._offsets) == len(self._labels) + 1:
+            return
+        triples = list(self._triples())
+        triples.extend((u, v, c) for (u, v), c in self._pending.items())
+        self._build(triples)
+
+    def _buffer(self, key, c):
+        # Buffers a new edge given by its canonical pair of indices
+        self._pending[key] = c
+        self._pendingAdjacent.setdefault(key[0], []).append(key[1])
+        if key[0] != key[1]:
+            self._pendingAdjacent.setdefault(key[1], []).append(key[0])
+
+    def _unbuffer(self, key):
+        # Removes the edge given by its canonical pair of indices, buffered or stored
+        if key in self._pending:
+            del self._pending[key]
+            for i, j in {key, key[::-1]}:
+                self._pendingAdjacent[i].remove(j)
+                if not self._pendingAdjacent[i]:
+                    del self._pendingAdjacent[i]
+            return
+        # A stored edge is only marked as removed
+        self._removed.add(key)
+        for i in set(key):
+            self._removedAdjacent[i] = self._removedAdjacent.get(i, 0) + 1
+
+    def _settle(self):
+        # Rebuilds the arrays once the buffered or the removed edges are too many for the reads
+        # to merge or skip them cheaply
+        # Amortized complexity: O(log m) per buffered or removed edge
+        limit = max(_PENDING_MINIMUM, len(self._weights) // _PENDING_FRACTION)
+        if len(self._pending) > limit or len(self._removed) > limit:
+            self._compact()
+
+    def _adjacent(self, i):
+        # Returns an iterable over the neighbours of the vertex with index i, by increasing index
+        if i < len(self._offsets) - 1:
+            stored = self._neighbours[self._offsets[i]:self._offsets[i + 1]]
+            if i in self._removedAdjacent:
+                removed = self._removed
+                stored = [j for j in stored if _canonical(i, j) not in removed]
+        else:
+            stored = ()
+        buffered = self._pendingAdjacent.get(i)
+        if buffered is None:
+            return stored
+        return heapq.merge(stored, sorted(buffered))
+
+    def _slot(self, i, j):
+        # Returns the weight slot of the edge between i and j, -1 if it is not stored in the arrays
+        # or if it was removed
+        u, v = _canonical(i, j)
+        if u >= len(self._offsets) - 1:
+            return -1
+        start = self._offsets[u]
+        stop = self._offsets[u + 1]
+        pos = bisect_left(self._neighbours, v, start, stop)
+        if pos == stop or self._neighbours[pos] != v or (u, v) in self._removed:
+            return -1
+        return self._upper[u] + pos - bisect_left(self._neighbours, u, start, pos)
+
+    def _vertexIndex(self, x):
+        # Returns the index of an existing vertex
+        # Precondition: the given vertex exists
+        if x not in self._index:
+            raise ValueError("The vertex specified is not valid")
+        return self._index[x]
+
+    def indexOf(self, x):
+        # Returns the integer index of a vertex
+        # Precondition: the given vertex exists
+        return self._vertexIndex(x)
+
+    def labelOf(self, i):
+        # Returns the label of the vertex having a given integer index
+        return self._labels[i]
+
+    def adjacencyArrays(self):
+        # Returns the offsets and the neighbours arrays
+        # The neighbours of the vertex with index i are neighbours[offsets[i]:offsets[i+1]]
+        self._compact()
+        return self._offsets, self._neighbours
+
+    @property
+    def vertexCount(self):
+        # Returns the number of vertices of the graph
+        return len(self._labels)
+
+    @property
+    def edgeCount(self):
+        # Returns the number of edges of the graph
+        return len(self._weights) - len(self._removed) + len(self._pending)
+
+    def degree(self, x):
+        # Returns the number of vertices adjacent to X
+        # Complexity: Theta(1)
+        i = self._vertexIndex(x)
+        stored = self._offsets[i + 1] - self._offsets[i] if i < len(self._offsets) - 1 else 0
+        return stored - self._removedAdjacent.get(i, 0) + len(self._pendingAdjacent.get(i, ()))
+
+    def isVertex(self, x):
+        # Checks for the existence of a vertex with a given label
+        return x in self._index
+
+    def isEdge(self, x, y):
+        # Returns True if there is an edge between x and y, False otherwise
+        # Complexity: O(log deg(min(x, y)))
+        if x not in self._index or y not in self._index:
+            return False
+        i = self._index[x]
+        j = self._index[y]
+        return _canonical(i, j) in self._pending or self._slot(i, j) >= 0
+
+    def parseX(self):
+        # Returns an iterator for parsing all the vertices
+        for x in self._labels:
+            yield x
+
+    def parseXY(self):
+        # Returns an iterator for parsing all the edges, each one given once, from its lower index endpoint
+        self._compact()
+        labels = self._labels
+        for u, v, c in self._triples():
+            yield Edge(labels[u], labels[v], c)
+
+    def parseXYTuples(self):
+        # Returns an iterator for parsing all the edges as (endpoint, endpoint, cost) tuples
+        self._compact()
+        labels = self._labels
+        for u, v, c in self._triples():
+            yield labels[u], labels[v], c
+
+    def parseAdjacent(self, x):
+        # Returns an iterator for parsing all vertices adjacent to X, by increasing index
+        # Precondition: the given vertex exists
+        i = self._vertexIndex(x)
+        labels = self._labels
+        offsets = self._offsets
+        if i not in self._pendingAdjacent and i not in self._removedAdjacent and i < len(offsets) - 1:
+            # Only the arrays hold edges of x
+            for j in self._neighbours[offsets[i]:offsets[i + 1]]:
+                yield labels[j]
+            return
+        for j in self._adjacent(i):
+            yield labels[j]
+
+    def addVertex(self, x):
+        # Adds a new vertex with a given label
+        # Precondition: The vertex does not exist (the label is unique)
+        if x in self._index:
+            raise ValueError("Vertex already in the graph!")
+        self._index[x] = len(self._labels)
+        self._labels.append(x)
+
+    def addEdge(self, x, y, c):
+        # Adds an edge between x and y, which is buffered until the next rebuild of the arrays
+        # Precondition: there is no edge between x and y
+        # Amortized complexity: O(log m)
+        if self.isEdge(x, y):
+            raise ValueError("Edge already exists!")
+        self._buffer(_canonical(self._vertexIndex(x), self._vertexIndex(y)), c)
+        self._settle()
+
+    def removeEdge(self, x, y):
+        # Removes an edge given two endpoints
+        # Precondition: The edge exists
+        # Amortized complexity: O(log m + deg(x) + deg(y))
+        if not self.isEdge(x, y):
+            raise ValueError("Edge does not exist!")
+        self._unbuffer(_canonical(self._index[x], self._index[y]))
+        self._settle()
+
+    def removeVertex(self, x):
+        # Removes a vertex having a given label, the indices of the following vertices are shifted down
+        # so the arrays are rebuilt at once
+        # Precondition: the vertex exists
+        # Complexity: O(n + m log m)
+        if x not in self._index:
+            raise ValueError("Vertex does not exist!")
+        self._compact()
+        i = self._index[x]
+        triples = [(u - (u > i), v - (v > i), c) for u, v, c in self._triples() if u != i and v != i]
+        self._labels.pop(i)
+        self._index = {label: k for k, label in enumerate(self._labels)}
+        self._build(triples)
+
+    def costEdge(self, x, y):
+        # Returns the cost of an edge specified by the two endpoints, in either order
+        # Precondition: The edge exists
+        if not self.isEdge(x, y):
+            raise ValueError("The edge does not exist!")
+        i = self._index[x]
+        j = self._index[y]
+        key = _canonical(i, j)
+        if key in self._pending:
+            return self._pending[key]
+        return self._weights[self._slot(i, j)]
+
+    def setCostEdge(self, x, y, c):
+        # Modifies the cost of an edge in place
+        # Precondition : The edge exists
+        if not self.isEdge(x, y):
+            raise ValueError("The edge does not exist!")
+        i = self._index[x]
+        j = self._index[y]
+        key = _canonical(i, j)
+        if key in self._pending:
+            self._pending[key] = c
+            return
+        if _typecode(self._weights) == 'q' and not isinstance(c, int):
+            self._weights = array('d', self._weights)
+        self._weights[self._slot(i, j)] = c
+
+    def deepcopy(self):
+        # Generates a copy of the graph, the arrays are copied as flat buffers
+        self._compact()
+        copy_csr = CSRUndirectedGraph()
+        copy_csr._labels = list(self._labels)
+        copy_csr._index = dict(self._index)
+        copy_csr._offsets = _copyBuffer(self._offsets)
+        copy_csr._neighbours = _copyBuffer(self._neighbours)
+        copy_csr._upper = _copyBuffer(self._upper)
+        copy_csr._weights = _copyBuffer(self._weights)
+        return copy_csr
+
+    def snapshot(self):
+        # Returns a copy-on-write view of the graph, which must not be modified while the view is in use
+        return UndirectedGraphOverlay(self)
+
+    def clear(self):
+        self._labels = []
+        self._index = {}
+        self._build([])
+
+    def _insertMany(self, vertices, edges):
+        # Adds the vertices that are not in the graph yet, in order, then the edges that do not exist yet
+        # (in either orientation). The endpoints of the edges must be vertices of the graph
+        index = self._index
+        labels = self._labels
+        for x in vertices:
+            if x not in index:
+                index[x] = len(labels)
+                labels.append(x)
+        pending = self._pending
+        for x, y, c in edges:
+            i = index[x]
+            j = index[y]
+            key = _canonical(i, j)
+            if key in pending or self._slot(i, j) >= 0:
+                continue
+            self._buffer(key, c)
+        self._settle()
+
+    def _insertColumns(self, vertices, origins, destinations, costs):
+        # Adds the given vertices and the endpoints of the edges that are not in the graph yet, in order,
+        # then the edges that do not exist yet (in either orientation), the first cost of a repeated edge being kept
+        # Large batches skip the buffer: the new canonical pairs are appended to the stored ones, deduplicated
+        # and sorted with NumPy, and the arrays are assembled from the resulting columns
+        # Complexity: O(n + m log m) for a large batch
+        if len(origins) < BULK_THRESHOLD:
+            BatchMutations._insertColumns(self, vertices, origins, destinations, costs)
+            return
+        import numpy as np
+        self._compact()
+        # The canonical edges of a row are its entries that are not lower than the row, in the order of the weights
+        rows = _rowHeads(self._offsets)
+        neighbours = np.frombuffer(self._neighbours, dtype=np.int64)
+        canonical = neighbours >= rows
+        weights, typecode = _columnArrays(self._weights, costs)
+        index = self._index
+        labels = self._labels
+        for x in distinctLabels(vertices, origins, destinations):
+            if x not in index:
+                index[x] = len(labels)
+                labels.append(x)
+        first, second = endpointIndices(labels, origins, destinations)
+        low = np.concatenate((rows[canonical], np.minimum(first, second)))
+        high = np.concatenate((neighbours[canonical], np.maximum(first, second)))
+        # The stored edges come first, so an edge that exists already keeps its cost
+        kept = firstOccurrences(low, high, len(labels))
+        # The pairs are distinct from now on, so sorting them by a single key needs no stable sort
+        order = kept[np.argsort(low[kept] * len(labels) + high[kept])]
+        low = low[order]
+        high = high[order]
+        # Every edge appears in the rows of both endpoints, a loop only once
+        loops = low == high
+        heads = np.concatenate((low, high[~loops]))
+        tails = np.concatenate((high, low[~loops]))
+        entries = np.argsort(heads * len(labels) + tails)
+        self._offsets = _rowOffsets(heads[entries], len(labels))
+        self._neighbours = _toArray(tails[entries], 'q')
+        self._upper = _rowOffsets(low, len(labels))
+        self._weights = _toArray(weights[order], typecode)
+
+    def _removeMany(self, pairs):
+        # Removes the edges given by their endpoints that are in the graph
+        for x, y in pairs:
+            if self.isEdge(x, y):
+                self._unbuffer(_canonical(self._index[x], self._index[y]))
+        self._settle()
+
+    def isolated_vertices(self):
+        self._compact()
+        for i in range(len(self._labels)):
+            if self._offsets[i + 1] == self._offsets[i]:
+                yield self._labels[i]
+
+
+def _canonical(i, j):
+    # Returns the pair of indices with the lower one first
+    if i <= j:
+        return i, j
+    return j, i
@@ -1,4 +1,6 @@
 class Edge:
+    __slots__ = ("_origin", "_dest", "_weight")
+
     def __init__(self,origin, destinaton, weight=0):
         self._origin = origin
         self._dest = destinaton
@@ -20,8 +22,7 @@ class Edge:
         return self.origin == other.origin and self.destination == other.destination
 
     def __hash__(self):
-        return hash(str(self.origin)+str(self.destination))
+        return hash((self._origin, self._dest))
 
     def __str__(self):
         return "(" + str(self.origin) + ", " + str(self.destination) + ")" + " weight: " + str(self.weight)
-
@@ -0,0 +1,161 @@
+from graph import UndirectedGraph
+from csr import CSRUndirectedGraph
+from overlay import UndirectedGraphOverlay
+import numpy as np
+
+
+def _sampleDistinct(rng, total, k):
+    # Draws k distinct integers from [0, total), uniformly among all the subsets of size k
+    if 2 * k > total:
+        # Dense case: most draws would be rejected duplicates, so the complement is sampled instead
+        excluded = _sampleDistinct(rng, total, total - k)
+        chosen = np.setdiff1d(np.arange(total, dtype=np.int64), excluded, assume_unique=True)
+    else:
+        chosen = np.empty(0, dtype=np.int64)
+        while len(chosen) < k:
+            # Ask for a few more than needed, most of the duplicates are absorbed in a single batch
+            draws = rng.integers(0, total, size=(k - len(chosen)) * 11 // 10 + 16)
+            chosen = np.unique(np.concatenate((chosen, draws)))
+        if len(chosen) > k:
+            chosen = rng.choice(chosen, k, replace=False)
+    rng.shuffle(chosen)
+    return chosen
+
+
+def _insertEdges(ddg, n, origins, destinations, rng):
+    # Adds the vertices 0, 1, ..., n-1 and the given edges with random costs between 0 and 1000
+    costs = rng.integers(0, 1001, size=len(origins))
+    with ddg.batch():
+        ddg.add_vertices_from(np.arange(n))
+        ddg.add_edges_from(np.column_stack((origins, destinations)), costs=costs)
+
+
+def _orderedPairs(indices, n):
+    # Maps indices from [0, n(n-1)) to the (origin, destination) pairs of distinct vertices
+    origins = indices // (n - 1)
+    rest = indices % (n - 1)
+    destinations = rest + (rest >= origins)
+    return origins, destinations
+
+
+def _unorderedPairs(indices):
+    # Maps indices from [0, n(n-1)/2) to the pairs of distinct vertices (i, j) with i < j,
+    # the pairs being numbered by increasing j: the pair (i, j) has the index j(j-1)/2 + i
+    destinations = ((1 + np.sqrt(1 + 8 * indices.astype(np.float64))) // 2).astype(np.int64)
+    # The rounding errors of the square root are corrected
+    destinations -= destinations * (destinations - 1) // 2 > indices
+    destinations += (destinations + 1) * destinations // 2 <= indices
+    return indices - destinations * (destinations - 1) // 2, destinations
+
+
+def _isUndirected(ddg):
+    return isinstance(ddg, (UndirectedGraph, CSRUndirectedGraph, UndirectedGraphOverlay))
+
+
+def _possibleEdges(ddg, n):
+    # The number of edges between distinct vertices among n: ordered pairs in a directed graph,
+    # unordered pairs in an undirected one
+    if _isUndirected(ddg):
+        return n * (n - 1) // 2
+    return n * (n - 1)
+
+
+def _indexedPairs(ddg, indices, n):
+    # Maps indices from [0, _possibleEdges(ddg, n)) to the endpoints of the edges
+    if _isUndirected(ddg):
+        return _unorderedPairs(indices)
+    return _orderedPairs(indices, max(n, 2))
+
+
+def generateRandom(ddg, x, y, seed=None):
+    """
+    Generates a graph with a given number of vertices and edges, the latter of which are randomly assigned.
+    The edges are drawn in batches; when more than half of the possible edges are requested,
+    the missing edges are drawn instead, so the running time does not blow up for dense graphs
+    :param ddg: A directed or an undirected graph instance
+    :param x: The number of vertices
+    :param y: The number of edges, at most x(x-1) edges are generated, x(x-1)/2 in an undirected graph
+    :param seed: An optional seed, the same seed always generates the same graph
+    :return:
+    """
+    ddg.clear()
+    rng = np.random.default_rng(seed)
+    total = _possibleEdges(ddg, x)
+    chosen = _sampleDistinct(rng, total, min(y, total))
+    origins, destinations = _indexedPairs(ddg, chosen, x)
+    _insertEdges(ddg, x, origins, destinations, rng)
+
+
+def erdosRenyi(ddg, n, p, seed=None):
+    """
+    Generates an Erdos-Renyi graph G(n, p): every one of the n(n-1) possible edges (n(n-1)/2 in an undirected graph)
+    is present with probability p, independently of the others
+    :param ddg: A directed or an undirected graph instance
+    :param n: The number of vertices
+    :param p: The probability of an edge
+    :param seed: An optional seed
+    :return:
+    """
+    ddg.clear()
+    rng = np.random.default_rng(seed)
+    total = _possibleEdges(ddg, n)
+    # The number of edges follows a binomial distribution, the edges themselves are a uniform subset
+    chosen = _sampleDistinct(rng, total, int(rng.binomial(total, p)))
+    origins, destinations = _indexedPairs(ddg, chosen, n)
+    _insertEdges(ddg, n, origins, destinations, rng)
+
+
+def barabasiAlbert(ddg, n, m, seed=None):
+    """
+    Generates a scale free graph following the Barabasi-Albert model: the vertices are added one by one
+    and every new vertex is linked to m distinct existing vertices, chosen with a probability
+    proportional to their degree. In a directed graph the edges go from the new vertex to the chosen ones
+    :param ddg: A directed or an undirected graph instance
+    :param n: The number of vertices
+    :param m: The number of edges added with every vertex
+    :param seed: An optional seed
+    :return:
+    """
+    if m < 1 or m >= n:
+        raise ValueError("The number of edges per vertex must be between 1 and n-1")
+    ddg.clear()
+    rng = np.random.default_rng(seed)
+    origins = []
+    destinations = []
+    # Every vertex appears in this list once per incident edge, so that a uniform draw from it
+    # picks a vertex with a probability proportional to its degree
+    endpoints = []
+    # The first new vertex is linked to all of the m initial vertices
+    targets = list(range(m))
+    for vertex in range(m, n):
+        for target in targets:
+            origins.append(vertex)
+            destinations.append(target)
+        endpoints.extend(targets)
+        endpoints.extend([vertex] * m)
+        chosen = set()
+        while len(chosen) < m:
+            draws = rng.integers(0, len(endpoints), size=m - len(chosen))
+            chosen.update(endpoints[i] for i in draws.tolist())
+        targets = list(chosen)[:m]
+    _insertEdges(ddg, n, np.array(origins, dtype=np.int64), np.array(destinations, dtype=np.int64), rng)
+
+
+def grid(ddg, rows, columns, seed=None):
+    """
+    Generates a grid graph: the vertex r * columns + c is linked to its right and lower neighbours.
+    A directed graph receives the edges in both directions
+    :param ddg: A directed or an undirected graph instance
+    :param rows: The number of rows
+    :param columns: The number of columns
+    :param seed: An optional seed for the costs
+    :return:
+    """
+    ddg.clear()
+    rng = np.random.default_rng(seed)
+    labels = np.arange(rows * columns, dtype=np.int64).reshape(rows, columns)
+    origins = np.concatenate((labels[:, :-1].ravel(), labels[:-1, :].ravel()))
+    destinations = np.concatenate((labels[:, 1:].ravel(), labels[1:, :].ravel()))
+    if not _isUndirected(ddg):
+        origins, destinations = np.concatenate((origins, destinations)), np.concatenate((destinations, origins))
+    _insertEdges(ddg, rows * columns, origins, destinations, rng)
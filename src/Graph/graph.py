@@ -1,13 +1,26 @@
 from vertex import Vertex
 from edge import Edge
+from batch import BULK_THRESHOLD, BatchMutations, distinctLabels, edgeColumns, endpointIndices, firstOccurrences, groupInto, labelList
+from csr import CSRDirectedGraph, CSRUndirectedGraph
+from overlay import DirectedGraphOverlay, UndirectedGraphOverlay
+from array import array
+import bz2
 import copy
+import gzip
+from itertools import chain
+import mmap
+import os
 import random
+import struct
 
-class DirectedGraph:
+class DirectedGraph(BatchMutations):
     def __init__(self):
         self._dictOut = {}
         self._dictIn = {}
+        # The costs are keyed by the (origin, destination) pair of labels
         self._dictCost = {}
+        # The number of edges having a negative cost, kept up to date by every operation that changes the costs
+        self._negativeCosts = 0
 
     @property
     def vertexCount(self):
@@ -19,14 +32,22 @@ class DirectedGraph:
         # Returns the number of edges of the graph
         return len(self._dictCost.keys())
 
+    @property
+    def hasNegativeCost(self):
+        # Returns True if at least one edge has a negative cost
+        # Complexity: Theta(1)
+        return self._negativeCosts > 0
+
     def addVertex(self, x):
         # Adds a new vertex with a given label (both in Din and Dout)
         # Precondition: The vertex does not exist (the label is unique)
         if self.isVertex(x):
             raise ValueError("Vertex already in the graph!")
         new_vertex = Vertex(x)
-        self._dictIn[new_vertex] = []
-        self._dictOut[new_vertex] = []
+        # The neighbours are kept as the keys of insertion ordered dictionaries (values are unused)
+        # so that membership tests, insertions and removals are constant time
+        self._dictIn[new_vertex] = {}
+        self._dictOut[new_vertex] = {}
 
     def parseX(self):
         # Returns an iterator for parsing all the vertices
@@ -35,9 +56,14 @@ class DirectedGraph:
 
     def parseXY(self):
         #Returns an iterator for parsing all the vertices
-        for edge in self._dictCost.keys():
-            cost = self._dictCost[edge]
-            yield Edge(edge.origin, edge.destination, cost)
+        for (origin, destination), cost in self._dictCost.items():
+            yield Edge(origin, destination, cost)
+
+    def parseXYTuples(self):
+        # Returns an iterator for parsing all the edges as (origin, destination, cost) tuples
+        # No Edge object is allocated, which makes it the cheaper choice for iteration heavy code
+        for (origin, destination), cost in self._dictCost.items():
+            yield origin, destination, cost
 
     def parseDout(self,x):
         # Returns an iterator for parsing the outbound neighbours of x
@@ -58,6 +84,7 @@ class DirectedGraph:
     def isEdge(self,x,y):
         # Returns True if there is an edge from x to y, False otherwise
         # Precondition: Both of the given endpoints are vertices of the graph
+        # Complexity: Theta(1)
         if not self.isVertex(x):
             return False
         if not self.isVertex(y):
@@ -70,12 +97,13 @@ class DirectedGraph:
         if self.isEdge(x,y):
             raise ValueError("Edge already exists!")
         # Add y as an outbound neighbour of x
-        self._dictOut[Vertex(x)].append(Vertex(y))
+        self._dictOut[Vertex(x)][Vertex(y)] = None
         # Add x as an inbound neighbour of y
-        self._dictIn[Vertex(y)].append(Vertex(x))
-        # Create an Edge object (generate a new key - value pair for the Dcost)
-        new_edge = Edge(x, y, c)
-        self._dictCost[new_edge] = new_edge.weight
+        self._dictIn[Vertex(y)][Vertex(x)] = None
+        # Generate a new key - value pair for the Dcost
+        self._dictCost[(x, y)] = c
+        if c < 0:
+            self._negativeCosts += 1
 
     def isVertex(self, x):
         # Checks for the existence of a vertex with a given label
@@ -102,42 +130,45 @@ class DirectedGraph:
     def removeEdge(self, x, y):
         # Removes an edge given a souce and a destination vertex
         # Precondition: The edge exists
-        rem_edge = Edge(x,y)
+        # Complexity: Theta(1)
+        rem_edge = (x, y)
         if rem_edge not in self._dictCost.keys():
             raise ValueError("Edge does not exist!")
 
         # Delete x as a predecessor of y
-        self._dictIn[Vertex(y)].remove(Vertex(x))
+        del self._dictIn[Vertex(y)][Vertex(x)]
 
         # Delete y as a successor of x
-        self._dictOut[Vertex(x)].remove(Vertex(y))
+        del self._dictOut[Vertex(x)][Vertex(y)]
 
         # Delete the key from Dcost
-        self._dictCost.pop(rem_edge)
+        if self._dictCost.pop(rem_edge) < 0:
+            self._negativeCosts -= 1
 
     def removeVertex(self, x):
         # Removes a vertex having a given label
         # Precondition: the vertex exists
+        # Complexity: Theta(deg(x))
         if Vertex(x) not in self._dictOut.keys():
             raise ValueError("Vertex does not exist!")
 
-        # Traverse the list of inbound neighbours
-        predecessors = self._dictIn[Vertex(x)]
-        for i in range(len(predecessors)):
+        # Traverse the inbound neighbours
+        for predecessor in self._dictIn[Vertex(x)]:
             # Delete the key-value pair from dictCost
-            edge_in = Edge(predecessors[i].label,x)
-            self._dictCost.pop(edge_in)
+            edge_in = (predecessor.label, x)
+            if self._dictCost.pop(edge_in) < 0:
+                self._negativeCosts -= 1
             # Delete x as a successor of the current inbound neighbour
-            self._dictOut[predecessors[i]].remove(Vertex(x))
+            del self._dictOut[predecessor][Vertex(x)]
 
-        # Traverse the list of outbound neighbours
-        successors = self._dictOut[Vertex(x)]
-        for j in range(len(successors)):
+        # Traverse the outbound neighbours
+        for successor in self._dictOut[Vertex(x)]:
             # Delete the key-value pair from dictCost
-            edge_out = Edge(x,successors[j].label)
-            self._dictCost.pop(edge_out)
+            edge_out = (x, successor.label)
+            if self._dictCost.pop(edge_out) < 0:
+                self._negativeCosts -= 1
             # Delete x as a predecessor of the current outbound neighbour
-            self._dictIn[successors[j]].remove(Vertex(x))
+            del self._dictIn[successor][Vertex(x)]
 
         # Delete the key vertex from Din and Dout
         self._dictIn.pop(Vertex(x))
@@ -147,8 +178,7 @@ class DirectedGraph:
         # Returns the cost of an edge specified by the two endpoints
         # Precondition: The edge exists
         if self.isEdge(x,y):
-            found = Edge(x,y)
-            return self._dictCost[found]
+            return self._dictCost[(x, y)]
         else:
             raise ValueError("The edge does not exist!")
 
@@ -156,8 +186,8 @@ class DirectedGraph:
         # Modifies the cost of an edge
         # Precondition : The edge exists
         if self.isEdge(x,y):
-            found = Edge(x,y)
-            self._dictCost[found] = c
+            self._negativeCosts += (c < 0) - (self._dictCost[(x, y)] < 0)
+            self._dictCost[(x, y)] = c
         else:
             raise ValueError("The edge does not exist!")
 
@@ -167,8 +197,7 @@ class DirectedGraph:
         if not self.isVertex(x):
             raise ValueError("The vertex specified is not valid")
         for inbound in self._dictIn[Vertex(x)]:
-            inbound_edge = Edge(inbound.label,x)
-            cost = self._dictCost[inbound_edge]
+            cost = self._dictCost[(inbound.label, x)]
             yield Edge(inbound.label, x, cost)
 
     def outboundEdges(self,x):
@@ -177,32 +206,117 @@ class DirectedGraph:
         if not self.isVertex(x):
             raise ValueError("The vertex specified is not valid")
         for outbound in self._dictOut[Vertex(x)]:
-            outbound_edge = Edge(x,outbound.label)
-            cost = self._dictCost[outbound_edge]
+            cost = self._dictCost[(x, outbound.label)]
             yield Edge(x, outbound.label, cost)
 
+    def inboundEdgeTuples(self, x):
+        # Returns an iterator for parsing the inbound edges of a vertex as (origin, destination, cost) tuples
+        # Precondition: The vertex exists
+        if not self.isVertex(x):
+            raise ValueError("The vertex specified is not valid")
+        for inbound in self._dictIn[Vertex(x)]:
+            yield inbound.label, x, self._dictCost[(inbound.label, x)]
+
+    def outboundEdgeTuples(self, x):
+        # Returns an iterator for parsing the outbound edges of a vertex as (origin, destination, cost) tuples
+        # Precondition: The vertex exists
+        if not self.isVertex(x):
+            raise ValueError("The vertex specified is not valid")
+        for outbound in self._dictOut[Vertex(x)]:
+            yield x, outbound.label, self._dictCost[(x, outbound.label)]
+
     def deepcopy(self):
         # Generates a deep copy of a Double Directed Graph instance and returns it
         copy_ddg = DirectedGraph()
         copy_ddg._dictOut = copy.deepcopy(self._dictOut)
         copy_ddg._dictIn = copy.deepcopy(self._dictIn)
         copy_ddg._dictCost = copy.deepcopy(self._dictCost)
+        copy_ddg._negativeCosts = self._negativeCosts
         return copy_ddg
 
+    def snapshot(self):
+        # Returns a copy-on-write view of the graph: the view can be modified freely in O(changes) time and memory
+        # while this graph is shared with it, as long as this graph itself is not modified in the meantime
+        return DirectedGraphOverlay(self)
+
+    def toCSR(self):
+        # Converts the graph to the compact, integer indexed storage
+        # The returned graph exposes the same interface and does not share any state with this one
+        return CSRDirectedGraph(self)
+
     def clear(self):
         self._dictOut.clear()
         self._dictIn.clear()
         self._dictCost.clear()
+        self._negativeCosts = 0
+
+    def _insertMany(self, vertices, edges):
+        # Adds the vertices that are not in the graph yet, in order, then the edges that do not exist yet
+        # Duplicate edges keep their first cost. The endpoints of the edges must be vertices of the graph
+        # The preconditions of addVertex and addEdge are not checked one by one
+        self._insertColumns(labelList(vertices), *edgeColumns(edges))
+
+    def _insertColumns(self, vertices, origins, destinations, costs):
+        # Adds the given vertices and the endpoints of the edges that are not in the graph yet, in order,
+        # then the edges that do not exist yet, the first cost of a repeated edge being kept
+        # Large batches are deduplicated and grouped by vertex with NumPy, so that every row of the
+        # inbound and outbound dictionaries is updated once and the costs are stored in a single update
+        dictOut = self._dictOut
+        dictIn = self._dictIn
+        dictCost = self._dictCost
+        labels = distinctLabels(vertices, origins, destinations)
+        verts = [Vertex(x) for x in labels]
+        for vertex in verts:
+            if vertex not in dictOut:
+                dictOut[vertex] = {}
+                dictIn[vertex] = {}
+        if len(origins) < BULK_THRESHOLD:
+            for key, c in zip(zip(origins, destinations), costs):
+                if key not in dictCost:
+                    dictOut[Vertex(key[0])][Vertex(key[1])] = None
+                    dictIn[Vertex(key[1])][Vertex(key[0])] = None
+                    dictCost[key] = c
+                    if c < 0:
+                        self._negativeCosts += 1
+            return
+        first, second = endpointIndices(labels, origins, destinations)
+        kept = firstOccurrences(first, second, len(labels))
+        first = first[kept]
+        second = second[kept]
+        keys = list(zip(map(labels.__getitem__, first.tolist()), map(labels.__getitem__, second.tolist())))
+        kept = kept.tolist()
+        if len(dictCost) > 0:
+            fresh = [k for k, key in enumerate(keys) if key not in dictCost]
+            first = first[fresh]
+            second = second[fresh]
+            keys = list(map(keys.__getitem__, fresh))
+            kept = list(map(kept.__getitem__, fresh))
+        costs = list(map(costs.__getitem__, kept))
+        groupInto(dictOut, verts, first, second)
+        groupInto(dictIn, verts, second, first)
+        dictCost.update(zip(keys, costs))
+        self._negativeCosts += sum(1 for c in costs if c < 0)
+
+    def _removeMany(self, pairs):
+        # Removes the edges given by their endpoints that are in the graph
+        dictCost = self._dictCost
+        for x, y in pairs:
+            if (x, y) in dictCost:
+                del self._dictIn[Vertex(y)][Vertex(x)]
+                del self._dictOut[Vertex(x)][Vertex(y)]
+                if dictCost.pop((x, y)) < 0:
+                    self._negativeCosts -= 1
 
     def isolated_vertices(self):
-        for vertex in self._dictOut.keys():
-            if self.getIndegree(vertex.label) == 0 and self.getOutdegree(vertex.label) == 0:
+        for vertex, successors in self._dictOut.items():
+            if len(successors) == 0 and len(self._dictIn[vertex]) == 0:
                 yield vertex.label
 
 
-class UndirectedGraph:
+class UndirectedGraph(BatchMutations):
     def __init__(self):
         self._vertices = {}
+        # The costs are keyed by the pair of labels, in the orientation the edge was added with
         self._edges = {}
 
     @property
@@ -226,7 +340,7 @@ class UndirectedGraph:
 
     def isVertex(self, x):
         # Checks for the existence of a vertex with a given label
-        # Complexity: O(n)
+        # Complexity: Theta(1)
         if Vertex(x) in self._vertices.keys():
             return True
         return False
@@ -234,7 +348,7 @@ class UndirectedGraph:
     def isEdge(self, x, y):
         # Returns True if there is an edge from x to y, False otherwise
         # Precondition: Both of the given endpoints are vertices of the graph
-        # Complexity: O(n + m)
+        # Complexity: Theta(1)
         if not self.isVertex(x):
             return False
         if not self.isVertex(y):
@@ -248,9 +362,13 @@ class UndirectedGraph:
 
     def parseXY(self):
         # Returns an iterator for parsing all the vertices
-        for edge in self._edges:
-            cost = self._edges[edge]
-            yield Edge(edge.origin, edge.destination, cost)
+        for (origin, destination), cost in self._edges.items():
+            yield Edge(origin, destination, cost)
+
+    def parseXYTuples(self):
+        # Returns an iterator for parsing all the edges as (origin, destination, cost) tuples
+        for (origin, destination), cost in self._edges.items():
+            yield origin, destination, cost
 
     def parseAdjacent(self, x):
         # Returns an iterator for parsing all vertices adjacent to X
@@ -263,49 +381,48 @@ class UndirectedGraph:
     def addVertex(self, x):
         # Adds a new vertex with a given label
         # Precondition: The vertex does not exist (the label is unique)
-        # Complexity: O(n)
+        # Complexity: Theta(1)
         if self.isVertex(x):
             raise ValueError("Vertex already in the graph!")
         new_vertex = Vertex(x)
-        self._vertices[new_vertex] = []
+        # The adjacent vertices are kept as the keys of an insertion ordered dictionary,
+        # each one mapped to the key the edge is stored under in the cost dictionary,
+        # so that an edge is found in a single lookup whatever the order of its endpoints
+        self._vertices[new_vertex] = {}
 
     def addEdge(self,x,y,c):
         # Adds an edge from x to y
         # Precondition: there is no edge from x to y
-        # Complexity: O(n+m)
+        # Complexity: Theta(1)
 
         if self.isEdge(x,y):
             raise ValueError("Edge already exists!")
-        self._vertices[Vertex(x)].append(Vertex(y))
-        self._vertices[Vertex(y)].append(Vertex(x))
-        new_edge = Edge(x, y, c)
+        new_edge = (x, y)
+        self._vertices[Vertex(x)][Vertex(y)] = new_edge
+        self._vertices[Vertex(y)][Vertex(x)] = new_edge
         self._edges[new_edge] = c
 
     def removeEdge(self, x, y):
         # Removes an edge given two endpoints
         # Precondition: The edge exists
-        # Complexity: O(n+m)
+        # Complexity: Theta(1)
         if not self.isEdge(x,y):
             raise ValueError("Edge does not exist!")
-        self._vertices[Vertex(x)].remove(Vertex(y))
-        self._vertices[Vertex(y)].remove(Vertex(x))
-        rem_edge = Edge(x, y, 0)
-        if rem_edge not in self._edges.keys():
-            rem_edge = Edge(y, x, 0)
+        rem_edge = self._vertices[Vertex(x)].pop(Vertex(y))
+        self._vertices[Vertex(y)].pop(Vertex(x), None)
         self._edges.pop(rem_edge)
 
     def removeVertex(self, x):
         # Removes a vertex having a given label
         # Precondition: the vertex exists
-        # Complexity O(n+m)
+        # Complexity Theta(deg(x))
         if Vertex(x) not in self._vertices.keys():
             raise ValueError("Vertex does not exist!")
         adjacent = self._vertices[Vertex(x)]
-        for vertex in adjacent:
-            self._vertices[vertex].remove(Vertex(x))
-            rem_edge = Edge(x, vertex.label, 0)
-            if rem_edge not in self._edges.keys():
-                rem_edge = Edge(vertex.label, x, 0)
+        for vertex, rem_edge in adjacent.items():
+            # A self loop has a single entry in the adjacency and a single cost
+            if vertex != Vertex(x):
+                del self._vertices[vertex][Vertex(x)]
             self._edges.pop(rem_edge)
         self._vertices.pop(Vertex(x))
 
@@ -313,46 +430,445 @@ class UndirectedGraph:
         # Returns the cost of an edge specified by the two endpoints
         # Precondition: The edge exists
         if self.isEdge(x,y):
-            found = Edge(x,y)
-        #     return self._edges[found]
-        # elif self.isEdge(y, x):
-        #     found = Edge(y, x)
-        #     return self._edges[found]
-            if found not in self._edges.keys():
-                return self._edges[Edge(y,x)]
-            return self._edges[found]
+            return self._edges[self._vertices[Vertex(x)][Vertex(y)]]
         else:
             raise ValueError("The edge does not exist!")
 
     def setCostEdge(self, x, y, c):
         # Modifies the cost of an edge
         # Precondition : The edge exists
+        # The cost is stored under the orientation the edge was added with
         if self.isEdge(x,y):
-            found = Edge(x,y)
-            self._edges[found] = c
-        elif self.isEdge(y, x):
-            found = Edge(y, x)
-            self._edges[found] = c
+            self._edges[self._vertices[Vertex(x)][Vertex(y)]] = c
         else:
             raise ValueError("The edge does not exist!")
 
     def deepcopy(self):
         # Generates a deep copy of a Double Directed Graph instance and returns it
         copy_udg = UndirectedGraph()
-        copy_udg._edges = copy.deepcopy(self._edges)
-        copy_udg._vertices = copy.deepcopy(self._vertices)
+        # Copied together so that the adjacency and the costs keep sharing their edge keys
+        copy_udg._edges, copy_udg._vertices = copy.deepcopy((self._edges, self._vertices))
         return copy_udg
 
+    def snapshot(self):
+        # Returns a copy-on-write view of the graph: the view can be modified freely in O(changes) time and memory
+        # while this graph is shared with it, as long as this graph itself is not modified in the meantime
+        return UndirectedGraphOverlay(self)
+
+    def toCSR(self):
+        # Converts the graph to the compact, integer indexed storage
+        # The returned graph exposes the same interface and does not share any state with this one
+        return CSRUndirectedGraph(self)
+
     def clear(self):
         self._edges.clear()
         self._vertices.clear()
 
+    def _insertMany(self, vertices, edges):
+        # Adds the vertices that are not in the graph yet, in order, then the edges that do not exist yet
+        # (in either orientation). The endpoints of the edges must be vertices of the graph
+        self._insertColumns(labelList(vertices), *edgeColumns(edges))
+
+    def _insertColumns(self, vertices, origins, destinations, costs):
+        # Adds the given vertices and the endpoints of the edges that are not in the graph yet, in order,
+        # then the edges that do not exist yet in either orientation, the first cost of a repeated edge being kept
+        # Large batches are deduplicated and grouped by vertex with NumPy
+        adjacency = self._vertices
+        edges = self._edges
+        labels = distinctLabels(vertices, origins, destinations)
+        verts = [Vertex(x) for x in labels]
+        for vertex in verts:
+            if vertex not in adjacency:
+                adjacency[vertex] = {}
+        if len(origins) < BULK_THRESHOLD:
+            for key, c in zip(zip(origins, destinations), costs):
+                first = Vertex(key[0])
+                second = Vertex(key[1])
+                if second not in adjacency[first]:
+                    adjacency[first][second] = key
+                    adjacency[second][first] = key
+                    edges[key] = c
+            return
+        import numpy as np
+        first, second = endpointIndices(labels, origins, destinations)
+        kept = firstOccurrences(first, second, len(labels), symmetric=True)
+        if len(edges) > 0:
+            kept = kept[[verts[second[k]] not in adjacency[verts[first[k]]] for k in kept.tolist()]]
+        first = first[kept]
+        second = second[kept]
+        keys = list(zip(map(labels.__getitem__, first.tolist()), map(labels.__getitem__, second.tolist())))
+        # Both directions are grouped at once, each edge k giving the entries 2k (in the row of its first endpoint)
+        # and 2k + 1 (in the row of its second one), so that every row lists its neighbours in the order of
+        # the edges, as edge by edge insertion does. A loop appears once in the row of its vertex
+        heads = np.empty(2 * len(first), dtype=np.int64)
+        heads[0::2] = first
+        heads[1::2] = second
+        tails = np.empty(2 * len(first), dtype=np.int64)
+        tails[0::2] = second
+        tails[1::2] = first
+        entries = np.ones(2 * len(first), dtype=bool)
+        entries[1::2] = first != second
+        entries = entries.nonzero()[0]
+        groupInto(adjacency, verts, heads[entries], tails[entries], keys, entries >> 1)
+        edges.update(zip(keys, map(costs.__getitem__, kept.tolist())))
+
+    def _removeMany(self, pairs):
+        # Removes the edges given by their endpoints that are in the graph
+        adjacency = self._vertices
+        for x, y in pairs:
+            first = Vertex(x)
+            second = Vertex(y)
+            if first in adjacency and second in adjacency[first]:
+                key = adjacency[first].pop(second)
+                adjacency[second].pop(first, None)
+                self._edges.pop(key)
+
     def isolated_vertices(self):
         for vertex in self._vertices.keys():
             if len(self._vertices[vertex]) == 0:
                 yield vertex.label
 
 
+def printProgress(done, total):
+    """
+    Progress callback for the loaders, printing the percentage of the file that was read
+    :param done: The number of bytes read so far
+    :param total: The size of the file in bytes
+    :return:
+    """
+    print("Read " + str(done * 100 // max(total, 1)) + "% of the file")
+
+
+def _openGraphFile(file_name):
+    # Opens a graph file in binary mode, decompressing gzip and bz2 files transparently
+    # Returns the stream to read from and the raw file, whose position tracks the progress
+    raw = open(file_name, 'rb')
+    magic = raw.read(3)
+    raw.seek(0)
+    if magic[:2] == b'\x1f\x8b':
+        return gzip.GzipFile(fileobj=raw), raw
+    if magic == b'BZh':
+        return bz2.BZ2File(raw), raw
+    return raw, raw
+
+
+def _readChunks(stream, chunk_size):
+    # Reads a stream in blocks of chunk_size bytes and yields them cut at line boundaries
+    rest = b''
+    while True:
+        block = stream.read(chunk_size)
+        if not block:
+            break
+        block = rest + block
+        cut = block.rfind(b'\n') + 1
+        rest = block[cut:]
+        if cut > 0:
+            yield block[:cut]
+    if rest:
+        yield rest
+
+
+def _parseEdgeLines(data):
+    """
+    Parses a block of complete lines in the 'origin destination cost' format,
+    where a line holding a single label specifies an isolated vertex
+    :param data: The bytes of the lines
+    :return: The list of the vertices in the order they appear (with repetitions)
+    and the list of (origin, destination, cost) triples
+    """
+    vertices = []
+    edges = []
+    for line in data.split(b'\n'):
+        fields = line.split()
+        if len(fields) >= 3:
+            origin = int(fields[0])
+            destination = int(fields[1])
+            vertices.append(origin)
+            vertices.append(destination)
+            edges.append((origin, destination, int(fields[2])))
+        elif len(fields) == 1:
+            vertices.append(int(fields[0]))
+        elif len(fields) == 2:
+            raise ValueError("Invalid line in the graph file: " + line.decode(errors='replace'))
+    return vertices, edges
+
+
+def _parseEdgeColumns(data):
+    """
+    Parses a block of complete lines in the 'origin destination cost' format like _parseEdgeLines.
+    When every line holds one or three fields of at most 17 characters (so that they fit in 64 bits)
+    the whole block is converted at once by NumPy, otherwise the lines are parsed one by one
+    :param data: The bytes of the lines
+    :return: The vertices in the order they appear (with repetitions) and the edges, as a NumPy array
+    and an array of (origin, destination, cost) rows, or as the lists returned by _parseEdgeLines
+    """
+    import numpy as np
+    raw = np.frombuffer(data, dtype=np.uint8)
+    separators = np.zeros(256, dtype=bool)
+    separators[list(b' \t\n\r\x0b\x0c')] = True
+    space = separators[raw]
+    # A field spans from a byte that follows white space (or the start) to a byte followed by white space (or the end)
+    starts = np.flatnonzero(~space & np.concatenate(([True], space[:-1])))
+    stops = np.flatnonzero(~space & np.concatenate((space[1:], [True])))
+    lines = np.searchsorted(np.flatnonzero(raw == 10), starts)
+    fields = np.bincount(lines)
+    if len(starts) == 0 or not np.all((fields <= 1) | (fields == 3)) or int((stops - starts).max()) >= 18:
+        return _parseEdgeLines(data)
+    try:
+        values = np.fromstring(data, dtype=np.int64, sep=' ')
+    except ValueError:
+        return _parseEdgeLines(data)
+    if len(values) != len(starts):
+        return _parseEdgeLines(data)
+    # The number of fields of the line of every field, and the rank of every field in its line
+    fields = fields[lines]
+    rank = np.arange(len(lines)) - np.searchsorted(lines, lines)
+    edges = values[fields == 3].reshape(-1, 3)
+    return values[(fields == 1) | ((fields == 3) & (rank < 2))], edges
+
+
+def _insertChunk(ddg, vertices, edges, counted):
+    # Inserts the vertices and the edges parsed from a chunk of a graph file, in a batch of their own
+    # unless a batch is in progress. In the counted format the vertices 0, 1, ..., n-1 are added beforehand
+    # and single labels are ignored; as with addEdge, an endpoint that is not a vertex raises a ValueError
+    with ddg.batch():
+        if counted:
+            n = ddg.vertexCount
+            if hasattr(edges, 'ndim'):
+                invalid = len(edges) > 0 and (int(edges[:, :2].min()) < 0 or int(edges[:, :2].max()) >= n)
+            else:
+                invalid = any(not (0 <= x < n and 0 <= y < n) for x, y, _ in edges)
+            if invalid:
+                raise ValueError("The vertex specified is not valid")
+        else:
+            ddg.add_vertices_from(vertices)
+        ddg.add_edges_from(edges)
+
+
+def _streamInto(ddg, stream, raw, total, chunk_size, progress, limit=None):
+    # Parses the lines of an opened graph file chunk by chunk and inserts them into the graph
+    # in a single batch, so that the indexes are built once from the edges of all the chunks
+    # A limit on the number of edges marks the counted format, the lines after the last edge are not read
+    # and an edge given twice raises a ValueError, as with addEdge
+    loaded = 0
+    with ddg.batch():
+        for chunk in _readChunks(stream, chunk_size):
+            vertices, edges = _parseEdgeColumns(chunk)
+            if limit is not None and loaded + len(edges) > limit:
+                edges = edges[:limit - loaded]
+            _insertChunk(ddg, vertices, edges, limit is not None)
+            loaded += len(edges)
+            if progress is not None:
+                progress(raw.tell(), total)
+            if limit is not None and loaded >= limit:
+                break
+    if limit is not None and ddg.edgeCount < loaded:
+        raise ValueError("Edge already exists!")
+
+
+def streamEdgeList(file_name, ddg, chunk_size=1 << 22, progress=None):
+    """
+    Loads a file in the format that only specifies the edges and isolated vertices
+    without reading it into memory as a whole: the file is read in chunks of complete lines,
+    each chunk is parsed at once and the parsed chunks are inserted into the graph in a single batch.
+    Repeated edges keep the cost given by their first occurrence
+    :param file_name: The name of the file, which may be compressed with gzip or bz2
+    :param ddg: A graph, which is cleared first
+    :param chunk_size: The number of bytes read at a time
+    :param progress: An optional callback receiving the number of bytes read and the size of the file
+    :return:
+    """
+    ddg.clear()
+    stream, raw = _openGraphFile(file_name)
+    try:
+        _streamInto(ddg, stream, raw, os.path.getsize(file_name), chunk_size, progress)
+    finally:
+        stream.close()
+        raw.close()
+
+
+def streamCountedEdgeList(file_name, ddg, chunk_size=1 << 22, progress=None):
+    """
+    Loads a file in the format whose first line specifies the number of vertices n and of edges m,
+    the vertices being labelled 0, 1, ..., n-1, reading the m edges in chunks.
+    Single labels and the lines after the m-th edge are ignored; an endpoint outside 0, 1, ..., n-1
+    or an edge given twice raises a ValueError, as addEdge does
+    :param file_name: The name of the file, which may be compressed with gzip or bz2
+    :param ddg: A graph, which is cleared first
+    :param chunk_size: The number of bytes read at a time
+    :param progress: An optional callback receiving the number of bytes read and the size of the file
+    :return:
+    """
+    ddg.clear()
+    stream, raw = _openGraphFile(file_name)
+    try:
+        # Split the number indicating the vertices and the edges
+        v_e = stream.readline().split()
+        vertices = int(v_e[0])
+        edges = int(v_e[1])
+        ddg.add_vertices_from(range(vertices))
+        _streamInto(ddg, stream, raw, os.path.getsize(file_name), chunk_size, progress, edges)
+    finally:
+        stream.close()
+        raw.close()
+
+
+def iterEdgeList(file_name, counted=False, chunk_size=1 << 22):
+    """
+    Iterates over the edges of a graph file without building the graph: the file is read
+    in chunks of complete lines and only the edges of the current chunk are held in memory
+    :param file_name: The name of the file, which may be compressed with gzip or bz2
+    :param counted: Whether the first line of the file specifies the number of vertices and of edges,
+    in which case only that number of edges is read
+    :param chunk_size: The number of bytes read at a time
+    :return: A generator of (origin, destination, cost) triples, in the order of the file
+    """
+    stream, raw = _openGraphFile(file_name)
+    try:
+        limit = int(stream.readline().split()[1]) if counted else None
+        loaded = 0
+        for chunk in _readChunks(stream, chunk_size):
+            _, edges = _parseEdgeLines(chunk)
+            if limit is not None and loaded + len(edges) > limit:
+                edges = edges[:limit - loaded]
+            loaded += len(edges)
+            yield from edges
+            if limit is not None and loaded >= limit:
+                break
+    finally:
+        stream.close()
+        raw.close()
+
+
+def _isCompressed(file_name):
+    f = open(file_name, 'rb')
+    magic = f.read(3)
+    f.close()
+    return magic[:2] == b'\x1f\x8b' or magic == b'BZh'
+
+
+def _lineRanges(file_name, start, chunk_size):
+    # Splits the file, from the offset start on, into byte ranges of about chunk_size bytes
+    # that begin and end at line boundaries
+    size = os.path.getsize(file_name)
+    f = open(file_name, 'rb')
+    ranges = []
+    while start < size:
+        f.seek(min(size, start + chunk_size))
+        f.readline()
+        stop = min(size, f.tell())
+        ranges.append((start, stop))
+        start = stop
+    f.close()
+    return ranges
+
+
+def _parseRange(file_name, start, stop, counted):
+    # Worker: parses the lines of a byte range into NumPy arrays, cheap to send back to the parent.
+    # The vertices are sent once each, in the order they first appear, and not at all in the counted format
+    import numpy as np
+    f = open(file_name, 'rb')
+    f.seek(start)
+    data = f.read(stop - start)
+    f.close()
+    vertices, edges = _parseEdgeColumns(data)
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 3)
+    if counted:
+        return np.empty(0, dtype=np.int64), edges
+    return np.array(distinctLabels(vertices, [], []), dtype=np.int64), edges
+
+
+def _parallelInto(ddg, file_name, start, workers, chunk_size, progress, limit=None):
+    # Parses the byte ranges of the file in worker processes and merges them into the graph in file order,
+    # so that the result is the same as the one of the sequential loader. At most two ranges per worker
+    # are in flight while the parent collects the parsed arrays; once every range is parsed, the arrays
+    # are concatenated and inserted at once, so the graph indexes are built in a single bulk insertion
+    import numpy as np
+    from collections import deque
+    # The process pool machinery is only imported when a parallel load is requested
+    from concurrent.futures import ProcessPoolExecutor
+    ranges = iter(_lineRanges(file_name, start, chunk_size))
+    total = os.path.getsize(file_name)
+    counted = limit is not None
+    loaded = 0
+    vertexArrays = [np.empty(0, dtype=np.int64)]
+    edgeArrays = [np.empty((0, 3), dtype=np.int64)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        inFlight = deque()
+
+        def submitNext():
+            for first, last in ranges:
+                inFlight.append((last, executor.submit(_parseRange, file_name, first, last, counted)))
+                return
+
+        for _ in range(2 * workers):
+            submitNext()
+        while len(inFlight) > 0:
+            stop, future = inFlight.popleft()
+            vertices, edges = future.result()
+            submitNext()
+            if counted and loaded + len(edges) > limit:
+                edges = edges[:limit - loaded]
+            vertexArrays.append(vertices)
+            edgeArrays.append(edges)
+            loaded += len(edges)
+            if progress is not None:
+                progress(stop, total)
+            if counted and loaded >= limit:
+                executor.shutdown(cancel_futures=True)
+                break
+    _insertChunk(ddg, np.concatenate(vertexArrays), np.concatenate(edgeArrays), counted)
+    if counted and ddg.edgeCount < loaded:
+        raise ValueError("Edge already exists!")
+
+
+def parallelEdgeList(file_name, ddg, workers=None, chunk_size=1 << 24, progress=None):
+    """
+    Loads a file in the format that only specifies the edges and isolated vertices,
+    parsing byte ranges cut at line boundaries in parallel worker processes.
+    The graph is the same as the one built by streamEdgeList.
+    Compressed files cannot be split and are loaded sequentially
+    :param file_name: The name of the file
+    :param ddg: A graph, which is cleared first
+    :param workers: The number of worker processes, None for one per core
+    :param chunk_size: The approximate number of bytes of a range
+    :param progress: An optional callback receiving the number of bytes parsed and the size of the file
+    :return:
+    """
+    if _isCompressed(file_name):
+        streamEdgeList(file_name, ddg, progress=progress)
+        return
+    ddg.clear()
+    _parallelInto(ddg, file_name, 0, workers, chunk_size, progress)
+
+
+def parallelCountedEdgeList(file_name, ddg, workers=None, chunk_size=1 << 24, progress=None):
+    """
+    Loads a file in the format whose first line specifies the number of vertices and of edges,
+    parsing byte ranges cut at line boundaries in parallel worker processes.
+    The graph is the same as the one built by streamCountedEdgeList
+    :param file_name: The name of the file
+    :param ddg: A graph, which is cleared first
+    :param workers: The number of worker processes, None for one per core
+    :param chunk_size: The approximate number of bytes of a range
+    :param progress: An optional callback receiving the number of bytes parsed and the size of the file
+    :return:
+    """
+    if _isCompressed(file_name):
+        streamCountedEdgeList(file_name, ddg, progress=progress)
+        return
+    ddg.clear()
+    f = open(file_name, 'rb')
+    # Split the number indicating the vertices and the edges
+    v_e = f.readline().split()
+    start = f.tell()
+    f.close()
+    ddg.add_vertices_from(range(int(v_e[0])))
+    _parallelInto(ddg, file_name, start, workers, chunk_size, progress, int(v_e[1]))
+
+
 def readingFunc1(file_name, ddg):
     """
     Reading function for the file format that explicitly specifies
@@ -360,20 +876,7 @@ def readingFunc1(file_name, ddg):
     :param file_name: The name of the file
     :return:
     """
-    ddg.clear()
-    f = open(file_name, 'rt')
-    line = f.readlines()
-    f.close()
-    # Split the number indicating the vertices and the edges
-    v_e = line[0].strip().split(' ')
-    vertices = int(v_e[0])
-    edges = int(v_e[1])
-    for i in range(vertices):
-        ddg.addVertex(i)
-    # Iterate through the lines specifying the edges and shape the graph
-    for j in range(1,edges+1):
-        edge = line[j].strip().split(' ',3)
-        ddg.addEdge(int(edge[0]),int(edge[1]),int(edge[2]))
+    streamCountedEdgeList(file_name, ddg)
 
 
 def readingFunc2(file_name,ddg):
@@ -383,22 +886,7 @@ def readingFunc2(file_name,ddg):
     :param file_name: The name of the file
     :return:
     """
-    ddg.clear()
-    f = open(file_name, 'rt')
-    lines = f.readlines()
-    f.close()
-    # Iterate through the lines that specify the edges and shape the graph
-    for j in range(len(lines)):
-        # Split the parameters: starting vertex, destination vertex, weight
-        edge = lines[j].strip().split(' ', 3)
-        if len(edge) >= 1:
-            if not ddg.isVertex(int(edge[0])):
-                ddg.addVertex(int(edge[0]))
-            if len(edge) >= 2:
-                if not ddg.isVertex(int(edge[1])):
-                    ddg.addVertex(int(edge[1]))
-                if not ddg.isEdge(int(edge[0]), int(edge[1])):
-                    ddg.addEdge(int(edge[0]), int(edge[1]), int(edge[2]))
+    streamEdgeList(file_name, ddg)
 
 
 def generate(ddg, x, y):
@@ -410,20 +898,24 @@ def generate(ddg, x, y):
     :return:
     """
     ddg.clear()
-    # Add the vertices
-    for i in range(x):
-        ddg.addVertex(i)
-    # Add the edges
     # The maximum number of edges for a double directed graph is x(x-1)
     # In case a larger number is provided for the edge count, generate only the maximum number possible
     if y > x*(x-1):
         y = x*(x-1)
-    while ddg.edgeCount < y:
+    # The edges are drawn into a dictionary, which keeps the first cost of every edge, then added at once
+    # In an undirected graph both orientations are the same edge
+    undirected = isinstance(ddg, (UndirectedGraph, CSRUndirectedGraph, UndirectedGraphOverlay))
+    edges = {}
+    while len(edges) < y:
         randomOrigin = random.randint(0,x-1)
         randomDestination = random.randint(0,x-1)
         randomCost = random.randint(0,1000)
-        if (randomOrigin != randomDestination) and not ddg.isEdge(randomOrigin, randomDestination):
-            ddg.addEdge(randomOrigin, randomDestination, randomCost)
+        if (randomOrigin != randomDestination) and (randomOrigin, randomDestination) not in edges and \
+                not (undirected and (randomDestination, randomOrigin) in edges):
+            edges[(randomOrigin, randomDestination)] = randomCost
+    with ddg.batch():
+        ddg.add_vertices_from(range(x))
+        ddg.add_edges_from(list(edges), costs=list(edges.values()))
 
 def writeToFile(ddg, file_name):
     """
@@ -435,18 +927,101 @@ def writeToFile(ddg, file_name):
     f = open(file_name, 'wt')
 
     # Add the edges
-    for edge in ddg.parseXY():
-        line = str(edge.origin) + ' ' + str(edge.destination) + ' ' + str(edge.weight)
+    for origin, destination, cost in ddg.parseXYTuples():
+        line = str(origin) + ' ' + str(destination) + ' ' + str(cost)
         f.write(line)
         f.write('\n')
 
     # Add the isolated vertices
-    for vertex in ddg.parseX():
-        if ddg.getIndegree(vertex) == 0 and ddg.getOutdegree(vertex) == 0:
-            line = str(vertex)
-            f.write(line)
-            f.write('\n')
+    for vertex in ddg.isolated_vertices():
+        line = str(vertex)
+        f.write(line)
+        f.write('\n')
+
+    f.close()
+
+
+# Binary snapshot format: a header followed by the label table and the six CSR arrays.
+# The header holds the magic string, the vertex count, the edge count, the number of negative costs,
+# the kind of labels (b'i' for integers, b's' for strings) and the type of the costs (b'q' or b'd').
+# Every section starts at a multiple of 8 bytes and the arrays are stored in the native byte order
+_BINARY_MAGIC = b'GRAPHCSR'
+_BINARY_HEADER = struct.Struct('<8sQQQcc6x')
+
+
+def _padding(size):
+    return b'\0' * (-size % 8)
+
+
+def writeBinary(ddg, file_name):
+    """
+    Writes a directed graph to a binary snapshot that readBinary maps into memory
+    :param ddg: A given instance of graph, converted to the CSR storage if needed
+    :param file_name: The path to the file
+    :return:
+    """
+    csr = ddg if isinstance(ddg, CSRDirectedGraph) else CSRDirectedGraph(ddg)
+    labels = list(csr.parseX())
+    buffers = csr.buffers()
+    weights = buffers[2]
+    weightCode = (weights.typecode if isinstance(weights, array) else weights.format).encode()
+
+    if all(isinstance(label, int) for label in labels):
+        labelKind = b'i'
+        labelSections = [array('q', labels).tobytes()]
+    elif all(isinstance(label, str) for label in labels):
+        labelKind = b's'
+        encoded = [label.encode() for label in labels]
+        offsets = array('q', [0])
+        for label in encoded:
+            offsets.append(offsets[-1] + len(label))
+        labelSections = [offsets.tobytes(), b''.join(encoded)]
+    else:
+        raise ValueError("Only graphs labelled by integers or by strings can be written in binary form")
+
+    negativeCosts = sum(1 for weight in weights if weight < 0)
+    f = open(file_name, 'wb')
+    f.write(_BINARY_HEADER.pack(_BINARY_MAGIC, len(labels), csr.edgeCount, negativeCosts, labelKind, weightCode))
+    for section in labelSections + [bytes(buffer) for buffer in buffers]:
+        f.write(section)
+        f.write(_padding(len(section)))
+    f.close()
+
+
+def readBinary(file_name):
+    """
+    Maps a binary snapshot written by writeBinary into memory. The CSR arrays are served directly
+    from the mapped pages, so loading does not copy them and processes mapping the same file
+    share a single copy in the page cache. The mapping is private: changing a cost does not alter the file
+    :param file_name: The path to the file
+    :return: A CSRDirectedGraph backed by the mapped file
+    """
+    f = open(file_name, 'rb')
+    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    f.close()
+    view = memoryview(mapped)
+    magic, n, m, negativeCosts, labelKind, weightCode = _BINARY_HEADER.unpack_from(view)
+    if magic != _BINARY_MAGIC:
+        raise ValueError("The file is not a binary graph snapshot")
 
+    position = _BINARY_HEADER.size
 
+    def section(size, typecode=None):
+        # Returns the next section of the file, as raw bytes or cast to the given type
+        nonlocal position
+        part = view[position:position + size]
+        position += size + (-size % 8)
+        if typecode is None:
+            return part
+        return part.cast(typecode)
 
+    if labelKind == b'i':
+        labels = section(8 * n, 'q').tolist()
+    else:
+        offsets = section(8 * (n + 1), 'q')
+        blob = section(offsets[n])
+        labels = [str(blob[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(n)]
 
+    buffers = (section(8 * (n + 1), 'q'), section(8 * m, 'q'), section(8 * m, weightCode.decode()),
+               section(8 * (n + 1), 'q'), section(8 * m, 'q'), section(8 * m, 'q'))
+    return CSRDirectedGraph.fromBuffers(labels, buffers, negativeCosts)
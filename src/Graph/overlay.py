@@ -0,0 +1,485 @@
+from batch import BatchMutations
+from edge import Edge
+
+
+def _emptyLike(graph):
+    # Returns a new, empty graph of the same storage as the graph at the bottom of a chain of overlays
+    while isinstance(graph, (DirectedGraphOverlay, UndirectedGraphOverlay)):
+        graph = graph._base
+    return type(graph)()
+
+
+def _countNegativeCosts(graph):
+    # Counts the edges of a graph that have a negative cost, only scanning them if there is any
+    if not getattr(graph, "hasNegativeCost", True):
+        return 0
+    return sum(1 for _, _, c in graph.parseXYTuples() if c < 0)
+
+
+class DirectedGraphOverlay(BatchMutations):
+    """
+    Copy-on-write view of a directed graph: the base graph is shared, not copied,
+    and the overlay only records the vertices and edges that were added, removed or had their cost changed.
+    Building the view is Theta(1) and every change costs O(1) memory (removing a vertex records its edges).
+    The base graph must not be modified while the overlay is in use
+    """
+    def __init__(self, base):
+        self._base = base
+        # Vertices of the base graph that were removed from the view
+        self._removedVertices = set()
+        # Vertices that were added to the view (including removed base vertices that were added again)
+        self._addedVertices = {}
+        # Adjacency of the added edges only, and their costs
+        self._addedOut = {}
+        self._addedIn = {}
+        self._addedCost = {}
+        # Base edges that were removed, and new costs of the base edges
+        self._removedEdges = set()
+        self._costOverride = {}
+        # Differences between the degrees in the view and the degrees in the base graph
+        self._outDelta = {}
+        self._inDelta = {}
+        self._vertexCount = base.vertexCount
+        self._edgeCount = base.edgeCount
+        self._negativeDelta = 0
+        self._baseNegatives = None
+
+    def _inBase(self, x):
+        # Checks whether x is a vertex of the base graph that is still visible
+        return x not in self._removedVertices and self._base.isVertex(x)
+
+    def _isBaseEdge(self, x, y):
+        return (x, y) not in self._removedEdges and self._inBase(x) and self._inBase(y) and self._base.isEdge(x, y)
+
+    def _shift(self, delta, x, value):
+        delta[x] = delta.get(x, 0) + value
+
+    @property
+    def vertexCount(self):
+        # Returns the number of vertices of the graph
+        return self._vertexCount
+
+    @property
+    def edgeCount(self):
+        # Returns the number of edges of the graph
+        return self._edgeCount
+
+    @property
+    def hasNegativeCost(self):
+        # Returns True if at least one edge has a negative cost
+        # The base graph is scanned at most once, the first time the question is asked
+        if self._baseNegatives is None:
+            self._baseNegatives = _countNegativeCosts(self._base)
+        return self._baseNegatives + self._negativeDelta > 0
+
+    def isVertex(self, x):
+        # Checks for the existence of a vertex with a given label
+        return x in self._addedVertices or self._inBase(x)
+
+    def isEdge(self, x, y):
+        # Returns True if there is an edge from x to y, False otherwise
+        return (x, y) in self._addedCost or self._isBaseEdge(x, y)
+
+    def addVertex(self, x):
+        # Adds a new vertex with a given label
+        # Precondition: The vertex does not exist (the label is unique)
+        if self.isVertex(x):
+            raise ValueError("Vertex already in the graph!")
+        self._addedVertices[x] = None
+        self._vertexCount += 1
+
+    def addEdge(self, x, y, c):
+        # Adds an edge from x to y
+        # Precondition: there is no edge from x to y and both endpoints are vertices
+        if self.isEdge(x, y):
+            raise ValueError("Edge already exists!")
+        if not self.isVertex(x) or not self.isVertex(y):
+            raise ValueError("The vertex specified is not valid")
+        self._addedCost[(x, y)] = c
+        self._addedOut.setdefault(x, {})[y] = None
+        self._addedIn.setdefault(y, {})[x] = None
+        self._shift(self._outDelta, x, 1)
+        self._shift(self._inDelta, y, 1)
+        self._edgeCount += 1
+        if c < 0:
+            self._negativeDelta += 1
+
+    def removeEdge(self, x, y):
+        # Removes an edge given a source and a destination vertex
+        # Precondition: The edge exists
+        if (x, y) in self._addedCost:
+            cost = self._addedCost.pop((x, y))
+            del self._addedOut[x][y]
+            del self._addedIn[y][x]
+        elif self._isBaseEdge(x, y):
+            cost = self.costEdge(x, y)
+            self._costOverride.pop((x, y), None)
+            self._removedEdges.add((x, y))
+        else:
+            raise ValueError("Edge does not exist!")
+        self._shift(self._outDelta, x, -1)
+        self._shift(self._inDelta, y, -1)
+        self._edgeCount -= 1
+        if cost < 0:
+            self._negativeDelta -= 1
+
+    def removeVertex(self, x):
+        # Removes a vertex having a given label, together with its edges
+        # Precondition: the vertex exists
+        if not self.isVertex(x):
+            raise ValueError("Vertex does not exist!")
+        for y in list(self.parseDout(x)):
+            self.removeEdge(x, y)
+        for y in list(self.parseDin(x)):
+            self.removeEdge(y, x)
+        if x in self._addedVertices:
+            del self._addedVertices[x]
+        else:
+            self._removedVertices.add(x)
+        self._addedOut.pop(x, None)
+        self._addedIn.pop(x, None)
+        self._outDelta.pop(x, None)
+        self._inDelta.pop(x, None)
+        self._vertexCount -= 1
+
+    def parseX(self):
+        # Returns an iterator for parsing all the vertices
+        for x in self._base.parseX():
+            if x not in self._removedVertices:
+                yield x
+        for x in self._addedVertices:
+            yield x
+
+    def parseXYTuples(self):
+        # Returns an iterator for parsing all the edges as (origin, destination, cost) tuples
+        for x, y, c in self._base.parseXYTuples():
+            if (x, y) not in self._removedEdges and self._inBase(x) and self._inBase(y):
+                yield x, y, self._costOverride.get((x, y), c)
+        for (x, y), c in self._addedCost.items():
+            yield x, y, c
+
+    def parseXY(self):
+        # Returns an iterator for parsing all the edges
+        for x, y, c in self.parseXYTuples():
+            yield Edge(x, y, c)
+
+    def parseDout(self, x):
+        # Returns an iterator for parsing the outbound neighbours of x
+        # Precondition: the given vertex exists
+        if not self.isVertex(x):
+            raise ValueError("The vertex specified is not valid")
+        if self._inBase(x):
+            for y in self._base.parseDout(x):
+                if (x, y) not in self._removedEdges and self._inBase(y):
+                    yield y
+        for y in self._addedOut.get(x, {}):
+            yield y
+
+    def parseDin(self, x):
+        # Returns an iterator for parsing the inbound neighbours of x
+        # Precondition: the given vertex exists
+        if not self.isVertex(x):
+            raise ValueError("The vertex specified is not valid")
+        if self._inBase(x):
+            for y in self._base.parseDin(x):
+                if (y, x) not in self._removedEdges and self._inBase(y):
+                    yield y
+        for y in self._addedIn.get(x, {}):
+            yield y
+
+    def getIndegree(self, x):
+        # Calculates the indegree for a given vertex
+        # Precondition: The given vertex exists
+        if not self.isVertex(x):
+            raise ValueError("The vertex specified is not valid")
+        base = self._base.getIndegree(x) if self._inBase(x) else 0
+        return base + self._inDelta.get(x, 0)
+
+    def getOutdegree(self, x):
+        # Calculates the outdegree for a given vertex
+        # Precondition: The given vertex exists
+        if not self.isVertex(x):
+            raise ValueError("The vertex specified is not valid")
+        base = self._base.getOutdegree(x) if self._inBase(x) else 0
+        return base + self._outDelta.get(x, 0)
+
+    def costEdge(self, x, y):
+        # Returns the cost of an edge specified by the two endpoints
+        # Precondition: The edge exists
+        if (x, y) in self._addedCost:
+            return self._addedCost[(x, y)]
+        if self._isBaseEdge(x, y):
+            if (x, y) in self._costOverride:
+                return self._costOverride[(x, y)]
+            return self._base.costEdge(x, y)
+        raise ValueError("The edge does not exist!")
+
+    def setCostEdge(self, x, y, c):
+        # Modifies the cost of an edge, the base graph is left untouched
+        # Precondition : The edge exists
+        old = self.costEdge(x, y)
+        if (x, y) in self._addedCost:
+            self._addedCost[(x, y)] = c
+        else:
+            self._costOverride[(x, y)] = c
+        self._negativeDelta += (c < 0) - (old < 0)
+
+    def inboundEdges(self, x):
+        # Returns an iterator for parsing all the inbound edges for a specified vertex
+        # Precondition: The vertex exists
+        for y in self.parseDin(x):
+            yield Edge(y, x, self.costEdge(y, x))
+
+    def outboundEdges(self, x):
+        # Returns an iterator for parsing all the outbound edges for a specified vertex
+        # Precondition: The vertex exists
+        for y in self.parseDout(x):
+            yield Edge(x, y, self.costEdge(x, y))
+
+    def inboundEdgeTuples(self, x):
+        # Returns an iterator for parsing the inbound edges of a vertex as (origin, destination, cost) tuples
+        # Precondition: The vertex exists
+        for y in self.parseDin(x):
+            yield y, x, self.costEdge(y, x)
+
+    def outboundEdgeTuples(self, x):
+        # Returns an iterator for parsing the outbound edges of a vertex as (origin, destination, cost) tuples
+        # Precondition: The vertex exists
+        for y in self.parseDout(x):
+            yield x, y, self.costEdge(x, y)
+
+    def snapshot(self):
+        # Returns a copy-on-write view stacked on top of this one
+        return DirectedGraphOverlay(self)
+
+    def deepcopy(self):
+        # Materializes the view into an independent graph with the storage of the base graph
+        copy_graph = _emptyLike(self)
+        copy_graph._insertMany(self.parseX(), self.parseXYTuples())
+        return copy_graph
+
+    def clear(self):
+        # Detaches the view from the base graph, which is left untouched
+        self.__init__(_emptyLike(self))
+
+    def _insertMany(self, vertices, edges):
+        # Adds the vertices that are not in the graph yet, in order, then the edges that do not exist yet
+        for x in vertices:
+            if not self.isVertex(x):
+                self.addVertex(x)
+        for x, y, c in edges:
+            if not self.isEdge(x, y):
+                self.addEdge(x, y, c)
+
+    def _removeMany(self, pairs):
+        # Removes the edges given by their endpoints that are in the graph
+        for x, y in pairs:
+            if self.isEdge(x, y):
+                self.removeEdge(x, y)
+
+    def isolated_vertices(self):
+        for x in self.parseX():
+            if self.getIndegree(x) == 0 and self.getOutdegree(x) == 0:
+                yield x
+
+
+class UndirectedGraphOverlay(BatchMutations):
+    """
+    Copy-on-write view of an undirected graph, recording only the changes made to the shared base graph.
+    The base graph must not be modified while the overlay is in use
+    """
+    def __init__(self, base):
+        self._base = base
+        self._removedVertices = set()
+        self._addedVertices = {}
+        # Adjacency of the added edges only; the costs are keyed by the set of the two endpoints
+        # and keep the orientation the edge was added with
+        self._addedAdjacent = {}
+        self._addedEdges = {}
+        self._removedEdges = set()
+        self._costOverride = {}
+        self._degreeDelta = {}
+        self._vertexCount = base.vertexCount
+        self._edgeCount = base.edgeCount
+
+    def _inBase(self, x):
+        return x not in self._removedVertices and self._base.isVertex(x)
+
+    def _isBaseEdge(self, x, y):
+        return (frozenset((x, y)) not in self._removedEdges and self._inBase(x) and self._inBase(y)
+                and self._base.isEdge(x, y))
+
+    def _shift(self, x, value):
+        self._degreeDelta[x] = self._degreeDelta.get(x, 0) + value
+
+    @property
+    def vertexCount(self):
+        # Returns the number of vertices of the graph
+        return self._vertexCount
+
+    @property
+    def edgeCount(self):
+        # Returns the number of edges of the graph
+        return self._edgeCount
+
+    def degree(self, x):
+        # Returns the number of vertices adjacent to X
+        if not self.isVertex(x):
+            raise ValueError("Vertex does not exist!")
+        base = self._base.degree(x) if self._inBase(x) else 0
+        return base + self._degreeDelta.get(x, 0)
+
+    def isVertex(self, x):
+        # Checks for the existence of a vertex with a given label
+        return x in self._addedVertices or self._inBase(x)
+
+    def isEdge(self, x, y):
+        # Returns True if there is an edge between x and y, False otherwise
+        return frozenset((x, y)) in self._addedEdges or self._isBaseEdge(x, y)
+
+    def parseX(self):
+        # Returns an iterator for parsing all the vertices
+        for x in self._base.parseX():
+            if x not in self._removedVertices:
+                yield x
+        for x in self._addedVertices:
+            yield x
+
+    def parseXYTuples(self):
+        # Returns an iterator for parsing all the edges as (origin, destination, cost) tuples
+        for x, y, c in self._base.parseXYTuples():
+            key = frozenset((x, y))
+            if key not in self._removedEdges and self._inBase(x) and self._inBase(y):
+                yield x, y, self._costOverride.get(key, c)
+        for x, y, c in self._addedEdges.values():
+            yield x, y, c
+
+    def parseXY(self):
+        # Returns an iterator for parsing all the edges
+        for x, y, c in self.parseXYTuples():
+            yield Edge(x, y, c)
+
+    def parseAdjacent(self, x):
+        # Returns an iterator for parsing all vertices adjacent to X
+        if not self.isVertex(x):
+            raise ValueError("Vertex does not exist!")
+        if self._inBase(x):
+            for y in self._base.parseAdjacent(x):
+                if frozenset((x, y)) not in self._removedEdges and self._inBase(y):
+                    yield y
+        for y in self._addedAdjacent.get(x, {}):
+            yield y
+
+    def addVertex(self, x):
+        # Adds a new vertex with a given label
+        # Precondition: The vertex does not exist (the label is unique)
+        if self.isVertex(x):
+            raise ValueError("Vertex already in the graph!")
+        self._addedVertices[x] = None
+        self._vertexCount += 1
+
+    def addEdge(self, x, y, c):
+        # Adds an edge between x and y
+        # Precondition: there is no edge between x and y and both endpoints are vertices
+        if self.isEdge(x, y):
+            raise ValueError("Edge already exists!")
+        if not self.isVertex(x) or not self.isVertex(y):
+            raise ValueError("The vertex specified is not valid")
+        self._addedEdges[frozenset((x, y))] = (x, y, c)
+        self._addedAdjacent.setdefault(x, {})[y] = None
+        self._addedAdjacent.setdefault(y, {})[x] = None
+        self._shift(x, 1)
+        if x != y:
+            self._shift(y, 1)
+        self._edgeCount += 1
+
+    def removeEdge(self, x, y):
+        # Removes an edge given two endpoints
+        # Precondition: The edge exists
+        key = frozenset((x, y))
+        if key in self._addedEdges:
+            del self._addedEdges[key]
+            del self._addedAdjacent[x][y]
+            self._addedAdjacent[y].pop(x, None)
+        elif self._isBaseEdge(x, y):
+            self._costOverride.pop(key, None)
+            self._removedEdges.add(key)
+        else:
+            raise ValueError("Edge does not exist!")
+        self._shift(x, -1)
+        if x != y:
+            self._shift(y, -1)
+        self._edgeCount -= 1
+
+    def removeVertex(self, x):
+        # Removes a vertex having a given label, together with its edges
+        # Precondition: the vertex exists
+        if not self.isVertex(x):
+            raise ValueError("Vertex does not exist!")
+        for y in list(self.parseAdjacent(x)):
+            self.removeEdge(x, y)
+        if x in self._addedVertices:
+            del self._addedVertices[x]
+        else:
+            self._removedVertices.add(x)
+        self._addedAdjacent.pop(x, None)
+        self._degreeDelta.pop(x, None)
+        self._vertexCount -= 1
+
+    def costEdge(self, x, y):
+        # Returns the cost of an edge specified by the two endpoints
+        # Precondition: The edge exists
+        key = frozenset((x, y))
+        if key in self._addedEdges:
+            return self._addedEdges[key][2]
+        if self._isBaseEdge(x, y):
+            if key in self._costOverride:
+                return self._costOverride[key]
+            return self._base.costEdge(x, y)
+        raise ValueError("The edge does not exist!")
+
+    def setCostEdge(self, x, y, c):
+        # Modifies the cost of an edge, the base graph is left untouched
+        # Precondition : The edge exists
+        key = frozenset((x, y))
+        if key in self._addedEdges:
+            origin, destination, _ = self._addedEdges[key]
+            self._addedEdges[key] = (origin, destination, c)
+        elif self._isBaseEdge(x, y):
+            self._costOverride[key] = c
+        else:
+            raise ValueError("The edge does not exist!")
+
+    def snapshot(self):
+        # Returns a copy-on-write view stacked on top of this one
+        return UndirectedGraphOverlay(self)
+
+    def deepcopy(self):
+        # Materializes the view into an independent graph with the storage of the base graph
+        copy_graph = _emptyLike(self)
+        copy_graph._insertMany(self.parseX(), self.parseXYTuples())
+        return copy_graph
+
+    def clear(self):
+        # Detaches the view from the base graph, which is left untouched
+        self.__init__(_emptyLike(self))
+
+    def _insertMany(self, vertices, edges):
+        # Adds the vertices that are not in the graph yet, in order, then the edges that do not exist yet
+        for x in vertices:
+            if not self.isVertex(x):
+                self.addVertex(x)
+        for x, y, c in edges:
+            if not self.isEdge(x, y):
+                self.addEdge(x, y, c)
+
+    def _removeMany(self, pairs):
+        # Removes the edges given by their endpoints that are in the graph
+        for x, y in pairs:
+            if self.isEdge(x, y):
+                self.removeEdge(x, y)
+
+    def isolated_vertices(self):
+        for x in self.parseX():
+            if self.degree(x) == 0:
+                yield x
@@ -1,17 +1,34 @@
+import threading
+import weakref
+
+
 class Vertex:
-    def __init__(self, label):
-        self._label = label
+    # Vertices are interned: building a Vertex for a label that is already in use
+    # returns the existing instance, so every label maps to a single object
+    # The graphs compare vertices by identity, so a new label is interned under a lock:
+    # threads building the same label at the same time all get the same instance
+    __slots__ = ("_label", "__weakref__")
+    _interned = weakref.WeakValueDictionary()
+    _lock = threading.Lock()
+
+    def __new__(cls, label):
+        vertex = cls._interned.get(label)
+        if vertex is None:
+            with cls._lock:
+                vertex = cls._interned.get(label)
+                if vertex is None:
+                    vertex = super().__new__(cls)
+                    vertex._label = label
+                    cls._interned[label] = vertex
+        return vertex
 
     @property
     def label(self):
         return self._label
 
-    def __eq__(self, other):
-        return self.label == other.label
-
-    def __hash__(self):
-        return hash(str(self._label))
+    def __reduce__(self):
+        # Copies and unpickled instances go through the interning cache as well
+        return Vertex, (self._label,)
 
     def __str__(self):
         return str(self.label)
-
@@ -0,0 +1,106 @@
+import heapq
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from FloydWarshall import printResult
+from ShortestPath import spfa
+
+
+# The reweighted adjacency lists, set up once in every worker process
+_shared = {}
+
+
+def _dijkstraRow(adjacency, s):
+    # Dijkstra's algorithm over integer indexed adjacency lists of (neighbour, non negative cost) pairs
+    # Returns the row of s in the cost and prev matrices
+    n = len(adjacency)
+    dist = [math.inf] * n
+    prev = [-1] * n
+    dist[s] = 0
+    heap = [(0, s)]
+    while len(heap) > 0:
+        cost, x = heapq.heappop(heap)
+        if cost > dist[x]:
+            continue
+        for y, c in adjacency[x]:
+            if cost + c < dist[y]:
+                dist[y] = cost + c
+                prev[y] = x
+                heapq.heappush(heap, (dist[y], y))
+    return dist, prev
+
+
+def _setAdjacency(adjacency):
+    _shared["adjacency"] = adjacency
+
+
+def _sharedDijkstraRow(s):
+    return _dijkstraRow(_shared["adjacency"], s)
+
+
+def johnson(ddg, workers=1):
+    """
+    Computes the minimum cost walks between all pairs of vertices of a sparse graph
+    whose vertices are labelled 0, 1, ..., n-1 and whose costs may be negative.
+    A single Bellman-Ford pass computes a potential h for which every reweighted cost
+    c(x, y) + h(x) - h(y) is non negative, after which Dijkstra's algorithm is run from every vertex
+    :param ddg: A directed graph
+    :param workers: The number of worker processes sharing the Dijkstra runs,
+    None for one per core, 1 to run in the current process
+    :return: The cost matrix and the prev matrix, as lists of rows, in the same form as the ones
+    printResult expects. If the graph has negative cost cycles, the cost of the trivial walk
+    of every vertex on a witness cycle is set to minus infinity
+    """
+    n = ddg.vertexCount
+    costMatrix = [[math.inf] * n for _ in range(n)]
+    prevMatrix = [[-1] * n for _ in range(n)]
+
+    # Starting every vertex with cost 0 is the same as adding a new vertex linked to all of them with cost 0
+    potential, _, cycle = spfa(ddg, ddg.parseX())
+    if len(cycle) > 0:
+        for vertex in cycle:
+            costMatrix[vertex][vertex] = -math.inf
+        return costMatrix, prevMatrix
+
+    adjacency = [[] for _ in range(n)]
+    for x, y, c in ddg.parseXYTuples():
+        if not isinstance(x, int) or not isinstance(y, int) or not 0 <= x < n or not 0 <= y < n:
+            raise ValueError("The vertices of the graph must be labelled 0, 1, ..., n-1")
+        # Loops are ignored, trivial walks always cost 0
+        if x != y:
+            adjacency[x].append((y, c + potential[x] - potential[y]))
+
+    if workers == 1:
+        rows = (_dijkstraRow(adjacency, s) for s in range(n))
+        for s, row in enumerate(rows):
+            _fillRow(costMatrix, prevMatrix, potential, s, row)
+    else:
+        chunk = max(1, n // (4 * (workers or os.cpu_count() or 1)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_setAdjacency, initargs=(adjacency,)) as executor:
+            for s, row in enumerate(executor.map(_sharedDijkstraRow, range(n), chunksize=chunk)):
+                _fillRow(costMatrix, prevMatrix, potential, s, row)
+
+    return costMatrix, prevMatrix
+
+
+def _fillRow(costMatrix, prevMatrix, potential, s, row):
+    # Undoes the reweighting for the walks starting at s
+    dist, prev = row
+    for t in range(len(dist)):
+        if dist[t] != math.inf:
+            costMatrix[s][t] = dist[t] - potential[s] + potential[t]
+    prevMatrix[s] = prev
+
+
+def lowestCostWalkJohnson(ddg, source, destination, workers=1):
+    """
+    Determines the minimum cost walk from a source vertex to a target vertex
+    using Johnson's algorithm and prints it
+    :param ddg: A directed graph
+    :param source: A given source vertex
+    :param destination: A given destination vertex
+    :param workers: The number of worker processes
+    :return:
+    """
+    costMatrix, prevMatrix = johnson(ddg, workers)
+    printResult(costMatrix, prevMatrix, source, destination)
@@ -1,41 +1,140 @@
 from graph import DirectedGraph
-import networkx as nx
-import matplotlib.pyplot as plt
+from array import array
+from collections import deque, namedtuple
+from itertools import count
+import heapq
+import sys
+
+
+# The times computed by schedule_activities: dictionaries mapping every activity to its earliest and
+# latest start and end times, the critical activities in topological order and the minimal total time
+ActivitySchedule = namedtuple("ActivitySchedule", ["earliest_start", "earliest_end", "latest_start", "latest_end", "critical", "total"])
 
 
 def read_list_of_activities(ddg, duration, file_name):
     """
     Reads files containing activities in the format 'activity duration prerequisites'
-    and populates a given graph structure accordingly
+    and populates a given graph structure accordingly.
+    The file is read once, line by line: activity and prerequisite names are case insensitive
+    and a prerequisite may be defined after the activities depending on it
     :param ddg: A directed graph
     :param duration: A dictionary where each activity will be mapped to its corresponding
     duration in arbitrary time units
     :param file_name: The name of the file to be read
     :return:
     """
+    # Every name met is normalised once, the same label object is then shared by all its occurrences
+    labels = {}
+    activities = {}
+    dependencies = {}
+
+    with open(file_name, 'rt') as f:
+        for line in f:
+            fields = line.split(None, 2)
+            if len(fields) < 2:
+                continue
+            vertex = labels.get(fields[0])
+            if vertex is None:
+                vertex = labels[fields[0]] = sys.intern(fields[0].lower())
+            # The first definition of an activity is the one kept
+            if vertex in activities:
+                continue
+            activities[vertex] = int(fields[1])
+            if len(fields) >= 3:
+                for name in fields[2].split(','):
+                    name = name.strip()
+                    if len(name) == 0:
+                        continue
+                    predecessor = labels.get(name)
+                    if predecessor is None:
+                        predecessor = labels[name] = sys.intern(name.lower())
+                    dependencies[(predecessor, vertex)] = None
+
+    # Prerequisites are only checked once the whole file is read, which resolves forward references
+    unknown = sorted(set(predecessor for predecessor, _ in dependencies if predecessor not in activities))
+    if len(unknown) > 0:
+        raise ValueError("Unknown prerequisites: " + ','.join(unknown))
+
     ddg.clear()
     duration.clear()
+    duration.update(activities)
+    with ddg.batch():
+        ddg.add_vertices_from(activities)
+        ddg.add_edges_from(list(dependencies))
+
+
+def _topo_sort(ddg, state):
+    # Predecessor counting over integer indices: yields the vertices in topological order
+    # and leaves in state the list of vertices and their remaining predecessor counts
+    vertices = list(ddg.parseX())
+    index = {vertex: i for i, vertex in enumerate(vertices)}
+    # The number of predecessors of every vertex that were not yet sorted
+    count = array('q', [ddg.getIndegree(vertex) for vertex in vertices])
+    state["vertices"] = vertices
+    state["count"] = count
+    # First enqueue only vertices with no predecessors in the given graph
+    queue = deque(i for i in range(len(vertices)) if count[i] == 0)
+    while len(queue) > 0:
+        # We take a vertex with no predecessors and 'eliminate' it from the graph by decrementing
+        # the number of predecessors of its outbound neighbours
+        x = queue.popleft()
+        yield vertices[x]
+        for y in ddg.parseDout(vertices[x]):
+            j = index[y]
+            count[j] -= 1
+            if count[j] == 0:
+                queue.append(j)
+
+
+def _witness_cycle(ddg, vertices, count):
+    # Every vertex that could not be sorted still has an unsorted predecessor,
+    # so walking back through unsorted predecessors must eventually repeat a vertex
+    remaining = set(vertices[i] for i in range(len(vertices)) if count[i] > 0)
+    if len(remaining) == 0:
+        return []
+    vertex = next(iter(remaining))
+    position = {}
+    walk = []
+    while vertex not in position:
+        position[vertex] = len(walk)
+        walk.append(vertex)
+        vertex = next(p for p in ddg.parseDin(vertex) if p in remaining)
+    # The walk follows the edges backwards, the cycle is returned in the direction of the edges
+    return walk[position[vertex]:][::-1]
+
+
+def topo_sort_with_cycle(ddg):
+    """
+    Performs a topological sorting of all the vertices of the graph
+    using the predecessor counting algorithm, in O(n + m) time
+    :param ddg: A directed graph
+    :return: The list of the vertices sorted topologically and an empty list if the graph is a DAG,
+    else the list of the vertices that could be sorted and a circular dependency
+    (the list of the vertices of a cycle, each one being a predecessor of the next and the last one of the first)
+    """
+    state = {}
+    sorted = list(_topo_sort(ddg, state))
+    if len(sorted) == ddg.vertexCount:
+        return sorted, []
+    return sorted, _witness_cycle(ddg, state["vertices"], state["count"])
 
-    f = open(file_name, 'rt')
-    lines = f.readlines()
-    f.close()
-
-    for j in range(len(lines)):
-        edge = lines[j].strip().split(' ', 3)
-        if len(edge) >= 2:
-            vertex = edge[0].strip().lower()
-            if not ddg.isVertex(vertex):
-                ddg.addVertex(vertex)
-                duration[vertex] = int(edge[1])
 
-    for i in range(len(lines)):
-        edge = lines[i].strip().split(' ', 3)
-        if len(edge) >= 3:
-            predecessors = edge[2].strip().split(',')
-            for predecessor in predecessors:
-                predecessor.strip().lower()
-                if not ddg.isEdge(predecessor, edge[0]):
-                    ddg.addEdge(predecessor, edge[0], 0)
+def iter_topo_sort(ddg):
+    """
+    Lazily yields the vertices of the graph in topological order: a vertex is yielded as soon as all
+    its predecessors were, so that processing may start before the sorting is over
+    :param ddg: A directed graph
+    :return: A generator that raises ValueError, naming a circular dependency,
+    after the last vertex that could be sorted if the graph is not a DAG
+    """
+    state = {}
+    produced = 0
+    for vertex in _topo_sort(ddg, state):
+        produced += 1
+        yield vertex
+    if produced < ddg.vertexCount:
+        cycle = _witness_cycle(ddg, state["vertices"], state["count"])
+        raise ValueError("Circular dependency: " + " -> ".join(str(vertex) for vertex in cycle + cycle[:1]))
 
 
 def topo_sort_predecessors(ddg):
@@ -47,144 +146,264 @@ def topo_sort_predecessors(ddg):
     :return: A list of all the vertices sorted topologically,
     else an empty list if the graph is not a DAG
     """
-
-    # The list to be filled with the vertices in topological order
-    sorted = []
-    # A queue that, at any point during the execution of the algorithm
-    # will contain only vertices with no predecessors
-    Queue = []
-    # A dictionary that maps each vertex to the number of its predecessors
-    count = {}
-    for vertex in ddg.parseX():
-        count[vertex] = ddg.getIndegree(vertex)
-        # First enqueue only vertices with no predecessors in the given graph
-        if count[vertex] == 0:
-            Queue.insert(0,vertex)
-
-    while len(Queue) > 0:
-        # We take a vertex with no predecessors, add it to the sorted list
-        # and 'eliminate' it from the graph by decrementing
-        # the number of predecessors of its outbound neighbours
-        # If the given graph is a DAG, naturally, every such outbound neighbour
-        # will end up on the sorted list
-        x = Queue.pop()
-        sorted.append(x)
-        for y in ddg.parseDout(x):
-            count[y] = count[y] - 1
-            if count[y] == 0:
-                Queue.insert(0,y)
-
-    # If the given graph is a DAG, we will run out of vertices with no predecessors quicker
-    # and we will exit the loop before all vertices were processed and added to the sorted list
-    if len(sorted) < ddg.vertexCount:
-        sorted = []
+    sorted, cycle = topo_sort_with_cycle(ddg)
+    if len(cycle) > 0:
+        return []
     return sorted
 
 
-def schedule_activities(duration, ddg):
+def schedule_activities(duration, ddg, display=False):
     """
     Computes earliest and latest starting and finishing time
     for every activity represented by a vertex in a given graph
     :param duration: A dictionary that maps each activity (vertex of our given graph) to its duration
-    in arbitrary time units
+    in arbitrary time units, it is not modified
     :param ddg: A directed acyclic graph
-    :return:
+    :param display: Whether the graph should also be drawn to fig.png, which requires networkx and matplotlib
+    :return: An ActivitySchedule
     """
 
     # Get the list of vertices sorted topologically
-    sorted = topo_sort_predecessors(ddg)
-    if len(sorted) == 0:
-        print("The provided graph is not a directed acyclic graph, topological sorting cannot be performed")
-        return
-
-    # Copy the graph so that it may be altered for convenience
-    result = ddg.deepcopy()
+    sorted, cycle = topo_sort_with_cycle(ddg)
+    if len(cycle) > 0:
+        raise ValueError("The provided graph is not a directed acyclic graph, topological sorting cannot be performed")
 
     # Initialize the two dictionaries that will map each activity to
     # its earliest time to start and finish respectively
     earliest_start_time = {}
     earliest_end_time = {}
 
-    # We add two 'fictional' nodes that will mark the beginning and the end
-    # of the project execution
-    result.addVertex("start")
-    result.addVertex("end")
-
-    # The 'start' node will precede each real node with no predecessors
-    # The 'end' node will succeed each real node with no successors
-    for vertex in sorted:
-        if result.getIndegree(vertex) == 0:
-            result.addEdge("start", vertex, 0)
-        if result.getOutdegree(vertex) == 0:
-            result.addEdge(vertex, "end", 0)
-
-    # Add the fictional nodes to the duration dictionary
-    duration["start"] = 0
-    duration["end"] = 0
-
-    # Insert the fictional nodes in the sorted list at the first and last position respectively
-    # so that the topological ordering is preserved
-    sorted.insert(0,"start")
-    sorted.append("end")
-
-    earliest_start_time["start"] = 0
-    earliest_end_time["start"] = 0
-
-    # Each activity may start as soon as the latest of its prerequisites finish
+    # Each activity may start as soon as the latest of its prerequisites finish, activities with
+    # no prerequisites start at 0 (as if they followed a fictional 'start' activity of duration 0)
     # Given that the activities are topologically sorted, we will always have the end time of each prerequisite
     # already computed and thus we may compare them
-    for vertex in sorted[1:]:
-        earliest_start_time[vertex] = max([earliest_end_time[predecessor] for predecessor in result.parseDin(vertex)])
+    for vertex in sorted:
+        earliest_start_time[vertex] = max([earliest_end_time[predecessor] for predecessor in ddg.parseDin(vertex)], default=0)
         earliest_end_time[vertex] = earliest_start_time[vertex] + duration[vertex]
 
+    # The total time needed to complete the project is the time the last activity finishes
+    end = max(earliest_end_time.values(), default=0)
+
     # Initialize the two dictionaries that will map each activity to
     # its latest possible time to start and finish respectively
     latest_start_time = {}
     latest_end_time = {}
 
-    # The total time needed to complete the project has to be the same, so we already know
-    # the values for the last activity to be done (represented by the fictional 'end' vertex)
-    end = earliest_end_time["end"]
-    latest_end_time["end"] = end
-    latest_start_time["end"] = latest_end_time["end"] - duration["end"]
-
-    # Each activity may end as late as the earliest activity that depends on it starts
+    # Each activity may end as late as the earliest activity that depends on it starts,
+    # activities with no successors may end as late as the project
     # In order to obtain the latest start times of said dependant activities and compare them
     # we will reverse the list of the vertices sorted topologically
-    for vertex in sorted[::-1][1:]:
-        latest_end_time[vertex] = min([latest_start_time[successor] for successor in result.parseDout(vertex)])
+    for vertex in sorted[::-1]:
+        latest_end_time[vertex] = min([latest_start_time[successor] for successor in ddg.parseDout(vertex)], default=end)
         latest_start_time[vertex] = latest_end_time[vertex] - duration[vertex]
 
-    printResult(earliest_start_time, latest_start_time, end)
-    displayGraph(result)
+    critical = [vertex for vertex in sorted if earliest_start_time[vertex] == latest_start_time[vertex]]
+    if display:
+        displayGraph(ddg)
+    return ActivitySchedule(earliest_start_time, earliest_end_time, latest_start_time, latest_end_time, critical, end)
 
 
 def printResult(earliest_start_time, latest_start_time, total):
     for activity in earliest_start_time:
         print("Activity " + str(activity) + " may start as early as " + str(earliest_start_time[activity]) + " or as late as " + str(latest_start_time[activity]) + "\n")
-    print("Critical activities: " + ','.join([x for x in earliest_start_time.keys() if earliest_start_time[x] == latest_start_time[x]]))
+    print("Critical activities: " + ','.join([str(x) for x in earliest_start_time.keys() if earliest_start_time[x] == latest_start_time[x]]))
     print("Minimal time for execution is " + str(total))
 
 
-def displayGraph(ddg):
+def displayGraph(ddg, file_name='fig.png'):
+    # networkx and matplotlib are only needed for drawing, they are imported on the first call
+    import networkx as nx
+    import matplotlib.pyplot as plt
     G = nx.DiGraph()
     for vertex in ddg.parseX():
         G.add_node(vertex)
     for edge in ddg.parseXY():
         G.add_edge(edge.origin, edge.destination)
+    plt.figure()
     nx.draw(G, with_labels=True)
-    plt.savefig('fig.png', bbox_inches='tight')
+    plt.savefig(file_name, bbox_inches='tight')
+    plt.close()
     # plt.show()
 
 
-
-
-
-
-
-
-
-
-
-
-
+class IncrementalScheduler:
+    """
+    Keeps the earliest and latest times of the activities of a DAG up to date while durations and dependencies change.
+    For every activity the scheduler stores its earliest start (the longest chain of durations before it)
+    and its tail (the longest chain of durations from its start to the end of the project).
+    An update only revisits the activities whose earliest start (forward cone) or tail (backward cone) changes,
+    in topological order, and the total duration is the largest tail of an activity with no predecessors,
+    kept in a heap
+    """
+    def __init__(self, ddg, duration):
+        # The scheduler works on the given graph and a copy of the given durations
+        # Precondition: the graph is a DAG and every activity has a duration
+        order = topo_sort_predecessors(ddg)
+        if len(order) < ddg.vertexCount:
+            raise ValueError("The provided graph is not a directed acyclic graph")
+        self._graph = ddg
+        self._duration = dict(duration)
+        # A topological numbering of the activities, maintained when dependencies are added
+        self._position = {vertex: i for i, vertex in enumerate(order)}
+        self._earliest = {}
+        self._tail = {}
+        for vertex in order:
+            self._earliest[vertex] = self._compute_earliest(vertex)
+        for vertex in order[::-1]:
+            self._tail[vertex] = self._compute_tail(vertex)
+        # Lazy max heap of the tails of the activities with no predecessors
+        # An entry is outdated once the activity gets a predecessor or its tail changes
+        self._tie = count()
+        self._sources = []
+        for vertex in order:
+            self._push_source(vertex)
+
+    def _compute_earliest(self, vertex):
+        return max([self._earliest[p] + self._duration[p] for p in self._graph.parseDin(vertex)], default=0)
+
+    def _compute_tail(self, vertex):
+        return self._duration[vertex] + max([self._tail[s] for s in self._graph.parseDout(vertex)], default=0)
+
+    def _push_source(self, vertex):
+        if self._graph.getIndegree(vertex) == 0:
+            heapq.heappush(self._sources, (-self._tail[vertex], next(self._tie), vertex))
+
+    def _check_activity(self, activity):
+        if activity not in self._position:
+            raise ValueError("Unknown activity " + str(activity))
+
+    def _propagate_forward(self, vertices):
+        # Recomputes the earliest start of the given activities and of every activity it changes downstream
+        heap = [(self._position[vertex], vertex) for vertex in set(vertices)]
+        heapq.heapify(heap)
+        queued = set(vertices)
+        while len(heap) > 0:
+            _, vertex = heapq.heappop(heap)
+            queued.discard(vertex)
+            earliest = self._compute_earliest(vertex)
+            if earliest != self._earliest[vertex]:
+                self._earliest[vertex] = earliest
+                for successor in self._graph.parseDout(vertex):
+                    if successor not in queued:
+                        queued.add(successor)
+                        heapq.heappush(heap, (self._position[successor], successor))
+
+    def _propagate_backward(self, vertices):
+        # Recomputes the tail of the given activities and of every activity it changes upstream
+        heap = [(-self._position[vertex], vertex) for vertex in set(vertices)]
+        heapq.heapify(heap)
+        queued = set(vertices)
+        while len(heap) > 0:
+            _, vertex = heapq.heappop(heap)
+            queued.discard(vertex)
+            tail = self._compute_tail(vertex)
+            if tail != self._tail[vertex]:
+                self._tail[vertex] = tail
+                self._push_source(vertex)
+                for predecessor in self._graph.parseDin(vertex):
+                    if predecessor not in queued:
+                        queued.add(predecessor)
+                        heapq.heappush(heap, (-self._position[predecessor], predecessor))
+
+    def _reorder(self, x, y):
+        # Restores the topological numbering before adding the dependency x -> y when x is numbered after y
+        # (Pearce-Kelly): only the activities numbered between y and x that are reachable from y
+        # or that reach x are renumbered
+        lower = self._position[y]
+        upper = self._position[x]
+        forward = self._reachable(y, self._graph.parseDout, lambda v: self._position[v] <= upper)
+        if x in forward:
+            raise ValueError("The dependency would create a circular dependency")
+        backward = self._reachable(x, self._graph.parseDin, lambda v: self._position[v] >= lower)
+        moved = sorted(backward, key=self._position.get) + sorted(forward, key=self._position.get)
+        positions = sorted(self._position[vertex] for vertex in moved)
+        for vertex, position in zip(moved, positions):
+            self._position[vertex] = position
+
+    def _reachable(self, start, neighbours, inside):
+        # Returns the vertices reachable from start through vertices satisfying the given condition
+        found = {start}
+        stack = [start]
+        while len(stack) > 0:
+            vertex = stack.pop()
+            for other in neighbours(vertex):
+                if other not in found and inside(other):
+                    found.add(other)
+                    stack.append(other)
+        return found
+
+    @property
+    def total_duration(self):
+        # Returns the minimal time for the execution of the project
+        # Complexity: O(log n) amortized
+        while len(self._sources) > 0:
+            tail, _, vertex = self._sources[0]
+            if (vertex in self._tail and -tail == self._tail[vertex]
+                    and self._graph.getIndegree(vertex) == 0):
+                return -tail
+            heapq.heappop(self._sources)
+        return 0
+
+    def earliest_start(self, activity):
+        self._check_activity(activity)
+        return self._earliest[activity]
+
+    def earliest_end(self, activity):
+        self._check_activity(activity)
+        return self._earliest[activity] + self._duration[activity]
+
+    def latest_start(self, activity):
+        self._check_activity(activity)
+        return self.total_duration - self._tail[activity]
+
+    def latest_end(self, activity):
+        return self.latest_start(activity) + self._duration[activity]
+
+    def slack(self, activity):
+        # Returns how much the activity may be delayed without delaying the project, 0 for critical activities
+        return self.latest_start(activity) - self.earliest_start(activity)
+
+    def critical_path(self):
+        # Returns a chain of critical activities going from the start to the end of the project
+        # Complexity: proportional to the activities on the path and their successors
+        if self.total_duration == 0 and len(self._sources) == 0:
+            return []
+        # After total_duration the top of the heap is an up to date activity with no predecessors and the largest tail
+        vertex = self._sources[0][2]
+        path = [vertex]
+        # The next critical activity is a successor whose tail accounts for the rest of the project
+        while self._tail[vertex] > self._duration[vertex]:
+            remaining = self._tail[vertex] - self._duration[vertex]
+            vertex = next(s for s in self._graph.parseDout(vertex) if self._tail[s] == remaining)
+            path.append(vertex)
+        return path
+
+    def set_duration(self, activity, duration):
+        # Changes the duration of an activity
+        self._check_activity(activity)
+        self._duration[activity] = duration
+        self._propagate_forward(list(self._graph.parseDout(activity)))
+        self._propagate_backward([activity])
+
+    def add_dependency(self, predecessor, successor):
+        # Makes an activity depend on another one
+        # Precondition: both activities exist, the dependency does not exist and does not close a cycle
+        self._check_activity(predecessor)
+        self._check_activity(successor)
+        if predecessor == successor:
+            raise ValueError("The dependency would create a circular dependency")
+        if self._graph.isEdge(predecessor, successor):
+            raise ValueError("Edge already exists!")
+        if self._position[predecessor] > self._position[successor]:
+            self._reorder(predecessor, successor)
+        self._graph.addEdge(predecessor, successor, 0)
+        self._propagate_forward([successor])
+        self._propagate_backward([predecessor])
+
+    def remove_dependency(self, predecessor, successor):
+        # Removes the dependency between two activities
+        # Precondition: the dependency exists
+        self._graph.removeEdge(predecessor, successor)
+        self._propagate_forward([successor])
+        self._propagate_backward([predecessor])
+        self._push_source(successor)
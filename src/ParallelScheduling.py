@@ -0,0 +1,160 @@
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import count
+import heapq
+from OrderingActivities import IncrementalScheduler, topo_sort_with_cycle
+
+
+# The result of list scheduling: the start and end time and the worker of every activity,
+# the topological levels, the length of the schedule, the share of the available worker time spent busy
+# and the busy time of every worker
+Schedule = namedtuple("Schedule", ["start", "end", "worker", "levels", "makespan", "utilisation", "busy"])
+
+
+def topological_levels(ddg):
+    """
+    Groups the activities of a DAG by topological level: the activities with no prerequisites
+    are on level 0 and every other activity is one level above its highest prerequisite,
+    so that the activities of the same level never depend on each other
+    :param ddg: A directed acyclic graph
+    :return: The list of levels, each one being the list of its activities in topological order
+    """
+    sorted, cycle = topo_sort_with_cycle(ddg)
+    if len(cycle) > 0:
+        raise ValueError("The provided graph is not a directed acyclic graph, circular dependency: " +
+                         " -> ".join(str(vertex) for vertex in cycle + cycle[:1]))
+    level = {}
+    levels = []
+    for vertex in sorted:
+        level[vertex] = max([level[predecessor] + 1 for predecessor in ddg.parseDin(vertex)], default=0)
+        if level[vertex] == len(levels):
+            levels.append([])
+        levels[level[vertex]].append(vertex)
+    return levels
+
+
+def _priorities(ddg, duration, levels):
+    # Orders the activities by latest start time, the ones that can be delayed the least come first,
+    # then by topological level
+    scheduler = IncrementalScheduler(ddg, duration) if duration is not None else None
+    priority = {}
+    for i, level in enumerate(levels):
+        for vertex in level:
+            priority[vertex] = (scheduler.latest_start(vertex) if scheduler is not None else i, i)
+    return priority
+
+
+def list_schedule(ddg, duration, workers):
+    """
+    Schedules the activities of a DAG on a fixed number of identical workers using list scheduling:
+    whenever a worker is free it takes the ready activity (all its prerequisites are finished)
+    with the earliest latest start time, which favours the critical activities
+    :param ddg: A directed acyclic graph
+    :param duration: A dictionary that maps each activity to its duration in arbitrary time units
+    :param workers: The number of workers
+    :return: A Schedule
+    """
+    if workers < 1:
+        raise ValueError("The number of workers must be at least 1")
+    levels = topological_levels(ddg)
+    priority = _priorities(ddg, duration, levels)
+    # The number of prerequisites of every activity that are not finished yet
+    remaining = {vertex: ddg.getIndegree(vertex) for vertex in priority}
+    # The counter breaks ties so that labels never have to be compared
+    tie = count()
+    ready = [(priority[vertex], next(tie), vertex) for vertex in levels[0]] if len(levels) > 0 else []
+    heapq.heapify(ready)
+    free = list(range(workers))
+    running = []
+    start = {}
+    end = {}
+    worker = {}
+    busy = [0] * workers
+    time = 0
+
+    while len(ready) > 0 or len(running) > 0:
+        # Every free worker takes the most urgent ready activity
+        while len(ready) > 0 and len(free) > 0:
+            _, _, vertex = heapq.heappop(ready)
+            w = heapq.heappop(free)
+            start[vertex] = time
+            end[vertex] = time + duration[vertex]
+            worker[vertex] = w
+            busy[w] += duration[vertex]
+            heapq.heappush(running, (end[vertex], next(tie), w, vertex))
+        # Then time advances to the next finishing activities, which release their workers and successors
+        time = running[0][0]
+        while len(running) > 0 and running[0][0] == time:
+            _, _, w, vertex = heapq.heappop(running)
+            heapq.heappush(free, w)
+            for successor in ddg.parseDout(vertex):
+                remaining[successor] -= 1
+                if remaining[successor] == 0:
+                    heapq.heappush(ready, (priority[successor], next(tie), successor))
+
+    makespan = max(end.values(), default=0)
+    utilisation = sum(busy) / (workers * makespan) if makespan > 0 else 0
+    return Schedule(start, end, worker, levels, makespan, utilisation, busy)
+
+
+def print_schedule(schedule):
+    for activity in sorted(schedule.start, key=lambda x: (schedule.start[x], schedule.worker[x])):
+        print("Activity " + str(activity) + " runs on worker " + str(schedule.worker[activity]) + " from " +
+              str(schedule.start[activity]) + " to " + str(schedule.end[activity]))
+    print("Makespan is " + str(schedule.makespan))
+    print("Utilisation is " + format(schedule.utilisation, ".1%"))
+
+
+def execute_activities(ddg, tasks, workers=None, duration=None, executor=None):
+    """
+    Runs a callable for every activity of a DAG through a concurrent.futures executor, an activity
+    being submitted only once all its prerequisites returned. When several activities are ready
+    the one with the earliest latest start time (or the lowest level when no durations are given) goes first
+    :param ddg: A directed acyclic graph
+    :param tasks: A dictionary that maps each activity to a callable taking no arguments
+    :param workers: The number of activities running at the same time, None for no limit other than the executor's
+    :param duration: An optional dictionary that maps each activity to its (estimated) duration
+    :param executor: An optional executor, a thread pool with the given number of workers is used by default.
+    Process pools require picklable callables
+    :return: A dictionary that maps each activity to the value returned by its callable.
+    If a callable raises an exception, the activities not started yet are cancelled and the exception is raised
+    """
+    levels = topological_levels(ddg)
+    for level in levels:
+        for vertex in level:
+            if vertex not in tasks:
+                raise ValueError("No task for activity " + str(vertex))
+    priority = _priorities(ddg, duration, levels)
+    remaining = {vertex: ddg.getIndegree(vertex) for vertex in priority}
+    tie = count()
+    ready = [(priority[vertex], next(tie), vertex) for vertex in levels[0]] if len(levels) > 0 else []
+    heapq.heapify(ready)
+    results = {}
+    running = {}
+    own = executor is None
+    if own:
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    try:
+        while len(ready) > 0 or len(running) > 0:
+            # Activities are only handed to the executor when a slot is available,
+            # so that the executor's queue never reorders them
+            while len(ready) > 0 and (workers is None or len(running) < workers):
+                _, _, vertex = heapq.heappop(ready)
+                running[executor.submit(tasks[vertex])] = vertex
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                vertex = running.pop(future)
+                results[vertex] = future.result()
+                for successor in ddg.parseDout(vertex):
+                    remaining[successor] -= 1
+                    if remaining[successor] == 0:
+                        heapq.heappush(ready, (priority[successor], next(tie), successor))
+    except BaseException:
+        for future in running:
+            future.cancel()
+        raise
+    finally:
+        if own:
+            executor.shutdown(wait=True)
+    return results
@@ -0,0 +1,160 @@
+import heapq
+import math
+from collections import deque
+from itertools import count
+
+
+def dijkstra(ddg, s, t=None):
+    """
+    Computes the minimum cost walks from a source vertex of a graph with non negative costs
+    using a binary heap
+    :param ddg: A directed graph
+    :param s: The source vertex
+    :param t: An optional target vertex; the search stops as soon as its cost is final
+    :return: A dictionary mapping the vertices reached to their cost from s and a dictionary
+    mapping them to their predecessor on the walk. When a target is given only the costs
+    of the vertices settled before it are guaranteed to be minimal
+    """
+    if not ddg.isVertex(s):
+        raise ValueError("The vertex specified is not valid")
+    dist = {s: 0}
+    prev = {}
+    settled = set()
+    # The counter breaks ties so that labels never have to be compared
+    tie = count()
+    heap = [(0, next(tie), s)]
+
+    while len(heap) > 0:
+        cost, _, x = heapq.heappop(heap)
+        if x in settled:
+            # Stale entry, x was already reached with a lower cost
+            continue
+        settled.add(x)
+        if x == t:
+            break
+        for _, y, c in ddg.outboundEdgeTuples(x):
+            if y not in dist or cost + c < dist[y]:
+                dist[y] = cost + c
+                prev[y] = x
+                heapq.heappush(heap, (dist[y], next(tie), y))
+
+    return dist, prev
+
+
+def _cycleFrom(prev, x, limit):
+    # Follows the predecessors from x and returns the cycle found on the way, [] if none was found
+    position = {}
+    walk = []
+    while x in prev and x not in position and len(walk) <= limit:
+        position[x] = len(walk)
+        walk.append(x)
+        x = prev[x]
+    if x not in position:
+        return []
+    # The walk goes backwards along the edges, the cycle is returned in the direction of the edges
+    return walk[position[x]:][::-1]
+
+
+def _bellmanFordRounds(ddg, dist, prev):
+    # Classic Bellman-Ford rounds over all the edges, starting from the current upper bounds
+    # Returns a negative cost cycle, or [] if the costs converge
+    n = ddg.vertexCount
+    for _ in range(n):
+        relaxed = None
+        for x, y, c in ddg.parseXYTuples():
+            if x in dist and (y not in dist or dist[x] + c < dist[y]):
+                dist[y] = dist[x] + c
+                prev[y] = x
+                relaxed = y
+        if relaxed is None:
+            return []
+    # An edge could still be relaxed after n rounds: walking back n steps lands on a negative cost cycle
+    x = relaxed
+    for _ in range(n):
+        x = prev[x]
+    return _cycleFrom(prev, x, n)
+
+
+def spfa(ddg, sources):
+    """
+    Queue based Bellman-Ford (SPFA) computing the minimum cost walks from a set of source vertices,
+    each of which starts with cost 0. Costs may be negative
+    :param ddg: A directed graph
+    :param sources: An iterable of source vertices
+    :return: The dictionary of costs, the dictionary of predecessors and a negative cost cycle
+    reachable from the sources, given as the list of its vertices in order, or [] if there is none
+    """
+    n = ddg.vertexCount
+    dist = {}
+    prev = {}
+    # The number of edges of the walk currently recorded for every vertex
+    # A walk with n edges repeats a vertex, so it can only be improved through a negative cost cycle
+    length = {}
+    queue = deque()
+    for s in sources:
+        if not ddg.isVertex(s):
+            raise ValueError("The vertex specified is not valid")
+        dist[s] = 0
+        length[s] = 0
+        queue.append(s)
+    queued = set(queue)
+
+    while len(queue) > 0:
+        x = queue.popleft()
+        queued.discard(x)
+        for _, y, c in ddg.outboundEdgeTuples(x):
+            if y not in dist or dist[x] + c < dist[y]:
+                dist[y] = dist[x] + c
+                prev[y] = x
+                length[y] = length[x] + 1
+                if length[y] >= n:
+                    cycle = _cycleFrom(prev, y, n)
+                    if len(cycle) == 0:
+                        # The predecessors do not close a cycle yet, settle it with full rounds
+                        cycle = _bellmanFordRounds(ddg, dist, prev)
+                    return dist, prev, cycle
+                if y not in queued:
+                    queue.append(y)
+                    queued.add(y)
+
+    return dist, prev, []
+
+
+def bellmanFord(ddg, s):
+    """
+    Computes the minimum cost walks from a source vertex of a graph whose costs may be negative
+    :param ddg: A directed graph
+    :param s: The source vertex
+    :return: A dictionary mapping the vertices reached to their cost from s and a dictionary
+    mapping them to their predecessor on the walk
+    """
+    dist, prev, cycle = spfa(ddg, [s])
+    if len(cycle) > 0:
+        raise ValueError("The graph has negative cost cycles")
+    return dist, prev
+
+
+def lowestCostPath(ddg, s, t):
+    """
+    Determines the minimum cost walk from a source vertex to a target vertex,
+    using Dijkstra's algorithm when no edge has a negative cost and Bellman-Ford otherwise
+    :param ddg: A directed graph
+    :param s: The source vertex
+    :param t: The target vertex
+    :return: The cost of the walk and the list of its vertices, in order
+    (infinity and an empty list if t cannot be reached from s)
+    """
+    if not ddg.isVertex(s) or not ddg.isVertex(t):
+        raise ValueError("The vertex specified is not valid")
+    if ddg.hasNegativeCost:
+        dist, prev = bellmanFord(ddg, s)
+    else:
+        dist, prev = dijkstra(ddg, s, t)
+
+    if t not in dist:
+        return math.inf, []
+    path = [t]
+    while path[-1] != s:
+        path.append(prev[path[-1]])
+    path.reverse()
+    return dist[t], path
@@ -0,0 +1,375 @@
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import heapq
+import os
+import time
+from VertexCoverProblem import vertex_cover_greedy
+
+
+# Algorithm 3: Exact Vertex Cover by Kernelization and Branch and Bound
+
+# The result of the exact solver: the smallest cover found, a proven lower bound on the size
+# of a minimum cover and the difference between the two, 0 when the cover is minimum
+ExactCover = namedtuple("ExactCover", ["cover", "lower_bound", "gap"])
+
+
+class _Instance:
+    # A reduced graph over integer vertices, together with the vertices already chosen for the cover
+    # and the degree 2 folds applied to it. Folding v (of neighbours u and w) replaces v, u and w by a new
+    # vertex z adjacent to the neighbours of u and w, and counts as one vertex of the cover: z in the cover
+    # of the folded graph stands for u and w, z outside of it for v
+    __slots__ = ("adj", "chosen", "folds", "next")
+
+    def __init__(self, adj, chosen, folds, next):
+        self.adj = adj
+        self.chosen = chosen
+        self.folds = folds
+        self.next = next
+
+    @property
+    def size(self):
+        # The number of vertices of the cover already decided
+        return len(self.chosen) + len(self.folds)
+
+    def copy(self):
+        return _Instance({x: set(ys) for x, ys in self.adj.items()}, list(self.chosen), list(self.folds), self.next)
+
+    def take(self, x, pending):
+        # Adds x to the cover and removes it with its edges, its neighbours are queued for the reduction rules
+        self.chosen.append(x)
+        for y in self.adj.pop(x):
+            self.adj[y].discard(x)
+            pending.append(y)
+
+    def fold(self, v, u, w, pending):
+        z = self.next
+        self.next += 1
+        neighbours = (self.adj[u] | self.adj[w]) - {v}
+        for x in (v, u, w):
+            for y in self.adj.pop(x):
+                if y in self.adj:
+                    self.adj[y].discard(x)
+        self.adj[z] = neighbours
+        for y in neighbours:
+            self.adj[y].add(z)
+            pending.append(y)
+        pending.append(z)
+        self.folds.append((v, u, w, z))
+
+    def reduce(self, pending, upper):
+        # Applies the reduction rules until none applies, upper being the size of the best cover known:
+        # - a vertex of degree 0 is removed
+        # - the neighbour of a vertex of degree 1 is in some minimum cover
+        # - both neighbours of a vertex of degree 2 in a triangle are in some minimum cover
+        # - a vertex of degree 2 with non adjacent neighbours is folded
+        # - a vertex of degree higher than the number of vertices left to beat upper is in every better cover (Buss)
+        adj = self.adj
+        while True:
+            while len(pending) > 0:
+                v = pending.pop()
+                if v not in adj:
+                    continue
+                degree = len(adj[v])
+                if degree == 0:
+                    del adj[v]
+                elif degree == 1:
+                    self.take(next(iter(adj[v])), pending)
+                elif degree == 2:
+                    u, w = adj[v]
+                    if w in adj[u]:
+                        self.take(u, pending)
+                        self.take(w, pending)
+                    else:
+                        self.fold(v, u, w, pending)
+            k = upper - 1 - self.size
+            if k < 0:
+                return
+            high = [x for x, ys in adj.items() if len(ys) > k]
+            if len(high) == 0:
+                return
+            # Taking one of them lowers k by one and the degree of the others by at most one, so all of them are taken
+            for x in high:
+                self.take(x, pending)
+
+    def unfold(self):
+        # Returns the cover of the graph the instance was built from
+        cover = set(self.chosen)
+        for v, u, w, z in reversed(self.folds):
+            if z in cover:
+                cover.discard(z)
+                cover.add(u)
+                cover.add(w)
+            else:
+                cover.add(v)
+        return cover
+
+
+def _lower_bound(adj):
+    # Every edge of a matching needs its own vertex in the cover, and a vertex covers at most
+    # the maximum degree edges: the larger of the two bounds is returned
+    matched = set()
+    matching = 0
+    edges = 0
+    highest = 0
+    for x, ys in adj.items():
+        edges += len(ys)
+        highest = max(highest, len(ys))
+        if x not in matched:
+            for y in ys:
+                if y not in matched:
+                    matched.add(x)
+                    matched.add(y)
+                    matching += 1
+                    break
+    if edges == 0:
+        return 0
+    return max(matching, -(-edges // 2 // highest))
+
+
+def _lp_halves(adj):
+    # Solves the LP relaxation of the vertex cover with a maximum matching (Hopcroft-Karp) of the bipartite double
+    # cover, where every vertex x has a left copy, a right copy, and an edge x y gives the edges xL yR and yL xR.
+    # By Konig's theorem a minimum cover of the double cover gives a half integral optimum:
+    # returns the value of every vertex counted in halves, 0, 1 or 2
+    left = {}
+    right = {}
+    while True:
+        # Breadth first search of the alternating paths starting at the free left vertices
+        layer = {x: 0 for x in adj if x not in left}
+        queue = deque(layer)
+        found = False
+        while len(queue) > 0:
+            x = queue.popleft()
+            for y in adj[x]:
+                z = right.get(y)
+                if z is None:
+                    found = True
+                elif z not in layer:
+                    layer[z] = layer[x] + 1
+                    queue.append(z)
+        if not found:
+            break
+        # Vertex disjoint augmenting paths along the layers, searched depth first
+        for start in [x for x in adj if x not in left]:
+            stack = [(start, iter(adj[start]))]
+            through = []
+            while len(stack) > 0:
+                x, neighbours = stack[-1]
+                advanced = False
+                for y in neighbours:
+                    z = right.get(y)
+                    if z is None:
+                        through.append(y)
+                        for (u, _), v in zip(stack, through):
+                            left[u] = v
+                            right[v] = u
+                        stack = []
+                        advanced = True
+                        break
+                    if layer.get(z) == layer[x] + 1:
+                        through.append(y)
+                        stack.append((z, iter(adj[z])))
+                        advanced = True
+                        break
+                if not advanced:
+                    # No augmenting path goes through x in this phase
+                    layer[x] = -1
+                    stack.pop()
+                    if len(through) > 0:
+                        through.pop()
+    # The left vertices reached by alternating paths are outside of the minimum cover, their neighbours are in it
+    reached = set()
+    for x in layer:
+        reached.update(adj[x])
+    return {x: (0 if x in layer else 1) + (1 if x in reached else 0) for x in adj}
+
+
+def _greedy(adj):
+    # Greedy cover of an integer adjacency: takes the vertex of highest remaining degree, using a lazy max heap
+    adj = {x: set(ys) for x, ys in adj.items()}
+    cover = set()
+    heap = [(-len(ys), x) for x, ys in adj.items()]
+    heapq.heapify(heap)
+    while len(heap) > 0:
+        degree, x = heapq.heappop(heap)
+        if len(adj[x]) == 0:
+            continue
+        if -degree != len(adj[x]):
+            heapq.heappush(heap, (-len(adj[x]), x))
+            continue
+        cover.add(x)
+        for y in adj[x]:
+            adj[y].discard(x)
+        adj[x] = set()
+    return cover
+
+
+def _step(entry, best_size):
+    # Explores one node of the search tree: the vertices of the entry are added to the cover of the parent
+    # instance and the result is reduced. Returns a better cover if the node is solved,
+    # and the entries of its children: the vertex of highest degree is either in the cover or all its neighbours are
+    parent, actions, _ = entry
+    node = parent.copy()
+    pending = []
+    for x in actions:
+        if x in node.adj:
+            node.take(x, pending)
+    if len(actions) == 0:
+        # The root of a search is reduced as a whole
+        pending = list(node.adj)
+    node.reduce(pending, best_size)
+    lower = node.size + _lower_bound(node.adj)
+    while len(node.adj) > 0 and lower < best_size:
+        # The LP relaxation gives a stronger bound than a matching, and its integral values reduce the instance further
+        halves = _lp_halves(node.adj)
+        ones = [x for x, value in halves.items() if value == 2]
+        lower = node.size + (sum(halves.values()) + 1) // 2
+        if len(ones) == 0:
+            break
+        for x in ones:
+            node.take(x, pending)
+        node.reduce(pending, best_size)
+        lower = node.size + _lower_bound(node.adj)
+    if len(node.adj) == 0:
+        return (node.unfold() if node.size < best_size else None), []
+    if lower >= best_size:
+        return None, []
+    v = max(node.adj, key=lambda x: len(node.adj[x]))
+    return None, [(node, list(node.adj[v]), lower), (node, [v], lower)]
+
+
+def _branch_and_bound(entries, best, deadline):
+    # Depth first search from the given entries, starting from a known cover of their graph
+    # Returns the best cover found and a lower bound on the size of a minimum cover of the subtrees
+    stack = list(entries)
+    abandoned = len(best)
+    while len(stack) > 0:
+        if deadline is not None and time.time() > deadline:
+            # The subtrees left were not explored: only their bounds are known
+            abandoned = min(entry[2] for entry in stack)
+            break
+        entry = stack.pop()
+        if entry[2] >= len(best):
+            continue
+        cover, children = _step(entry, len(best))
+        if cover is not None:
+            best = cover
+        stack.extend(children)
+    return best, min(len(best), abandoned)
+
+
+def _components(adj):
+    # Splits an integer adjacency in connected components
+    seen = set()
+    components = []
+    for start in adj:
+        if start in seen:
+            continue
+        seen.add(start)
+        component = {}
+        stack = [start]
+        while len(stack) > 0:
+            x = stack.pop()
+            component[x] = adj[x]
+            for y in adj[x]:
+                if y not in seen:
+                    seen.add(y)
+                    stack.append(y)
+        components.append(component)
+    return components
+
+
+def _split(entry, best, count):
+    # Expands the search tree breadth first until it has at least count open nodes
+    frontier = [entry]
+    while 0 < len(frontier) < count:
+        node = frontier.pop(0)
+        if node[2] >= len(best):
+            continue
+        cover, children = _step(node, len(best))
+        if cover is not None:
+            best = cover
+        frontier.extend(children)
+    return frontier, best
+
+
+def vertex_cover_exact(ud, time_limit=None, workers=1):
+    '''
+    Finds a minimum vertex cover. The graph is first reduced with the classic kernelization rules
+    (degree 0, 1 and 2 vertices, folding, high degree vertices, the LP relaxation) and split in connected components,
+    then every component is solved by branch and bound: the vertex of highest degree is either in the cover
+    or all its neighbours are, and a node is pruned when the size of its cover plus a matching lower bound
+    cannot beat the best cover known, which starts as the greedy one
+    :param ud: An undirected graph
+    :param time_limit: An optional limit in seconds on the search, after which the best cover found is returned
+    :param workers: The number of worker processes sharing the top level branches,
+    None for one per core, 1 to run in the current process
+    :return: An ExactCover: the cover, a lower bound on the size of a minimum cover and the gap between them,
+    which is 0 when the search completed
+    '''
+    deadline = time.time() + time_limit if time_limit is not None else None
+    labels = list(ud.parseX())
+    index = {label: i for i, label in enumerate(labels)}
+    adj = {i: set(index[y] for y in ud.parseAdjacent(label)) for i, label in enumerate(labels)}
+    greedy = vertex_cover_greedy(ud)
+
+    # A vertex with a loop is in every cover
+    root = _Instance(adj, [], [], len(labels))
+    pending = list(adj)
+    for x in [x for x in adj if x in adj[x]]:
+        adj[x].discard(x)
+        root.take(x, pending)
+    root.reduce(pending, len(greedy))
+    # The vertices of value 1 in the half integral optimum of the LP relaxation are in some minimum cover
+    # (Nemhauser-Trotter), the ones of value 0 are left isolated once they are taken
+    while True:
+        halves = _lp_halves(root.adj)
+        ones = [x for x, value in halves.items() if value == 2]
+        if len(ones) == 0:
+            break
+        for x in ones:
+            root.take(x, pending)
+        root.reduce(pending, len(greedy))
+
+    # The components are independent, each one starts from its own greedy cover
+    problems = []
+    for component in _components(root.adj):
+        entry = (_Instance(component, [], [], root.next), [], 0)
+        problems.append((entry, _greedy(component)))
+
+    results = []
+    if workers == 1:
+        for entry, best in problems:
+            results.append(_branch_and_bound([entry], best, deadline))
+    else:
+        tasks = []
+        splits = []
+        count = 4 * (workers or os.cpu_count() or 1)
+        for entry, best in problems:
+            frontier, best = _split(entry, best, count)
+            splits.append(best)
+            tasks.append(frontier)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [[executor.submit(_branch_and_bound, [node], best, deadline) for node in frontier]
+                       for frontier, best in zip(tasks, splits)]
+            for best, component in zip(splits, futures):
+                lower = len(best)
+                for future in component:
+                    cover, bound = future.result()
+                    if len(cover) < len(best):
+                        best = cover
+                    lower = min(lower, bound)
+                results.append((best, min(lower, len(best))))
+
+    cover = set()
+    lower = root.size
+    for ((instance, _, _), _), (best, bound) in zip(problems, results):
+        cover |= best
+        # Every vertex left has the value 1/2 in the LP relaxation, which bounds the size of the cover as well
+        lower += max(bound, min(len(best), (len(instance.adj) + 1) // 2))
+    root.chosen.extend(cover)
+    cover = set(labels[x] for x in root.unfold())
+    if len(greedy) < len(cover):
+        cover = greedy
+    lower = min(lower, len(cover))
+    return ExactCover(cover, lower, len(cover) - lower)
@@ -1,5 +1,6 @@
 from graph import UndirectedGraph, readingFunc1, readingFunc2
-import copy
+from concurrent.futures import ProcessPoolExecutor
+import os
 
 
 # A vertex cover of a graph G is a set of vertices which cover all the edges of the graph
@@ -49,6 +50,78 @@ def vertex_cover_approx(ud):
     return cover
 
 
+# Algorithm 1 on edge streams: the matched vertices of a maximal matching cover all the edges
+
+def vertex_cover_streaming(edges):
+    '''
+    Computes the same kind of cover as the approximation algorithm in a single pass over a stream of edges,
+    without the graph: an edge whose endpoints are both outside of the cover is added to the matching
+    and both endpoints join the cover. Only the cover is kept in memory
+    :param edges: An iterable of (u, v) pairs, for instance the edges of iterEdgeList;
+    longer tuples such as (u, v, cost) are accepted as well
+    :return: The set of the vertices of a maximal matching of the edges -> at most twice the optimal cover
+    '''
+    cover = set()
+    for edge in edges:
+        u = edge[0]
+        v = edge[1]
+        if u not in cover and v not in cover:
+            cover.add(u)
+            cover.add(v)
+    return cover
+
+
+def _local_matching(edges):
+    # Returns the edges of a maximal matching of the given edges
+    matched = set()
+    matching = []
+    for u, v in edges:
+        if u not in matched and v not in matched:
+            matched.add(u)
+            matched.add(v)
+            matching.append((u, v))
+    return matching
+
+
+def _uncovered(edges, cover):
+    # Returns the edges with no endpoint in the cover
+    return [(u, v) for u, v in edges if u not in cover and v not in cover]
+
+
+def vertex_cover_parallel(ud, workers=None):
+    '''
+    Parallel version of the approximation algorithm: the edges are split between worker processes,
+    each of which computes a maximal matching of its part. The local matchings are merged into a single
+    matching, a second parallel pass collects the edges it leaves uncovered and these are matched last,
+    so that the result is a maximal matching of the whole graph
+    :param ud: An undirected graph
+    :param workers: The number of worker processes, None for one per core, 1 to run in the current process
+    :return: The set of the matched vertices -> at most twice the optimal cover
+    '''
+    edges = [(u, v) for u, v, _ in ud.parseXYTuples()]
+    parts = workers or os.cpu_count() or 1
+    size = -(-len(edges) // parts) if len(edges) > 0 else 1
+    chunks = [edges[i:i + size] for i in range(0, len(edges), size)]
+    if workers == 1:
+        matchings = [_local_matching(chunk) for chunk in chunks]
+        # The local matchings may share vertices, keeping a maximal matching of their union resolves the conflicts
+        cover = vertex_cover_streaming(edge for matching in matchings for edge in matching)
+        uncovered = [_uncovered(chunk, cover) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            matchings = list(executor.map(_local_matching, chunks))
+            cover = vertex_cover_streaming(edge for matching in matchings for edge in matching)
+            uncovered = list(executor.map(_uncovered, chunks, [cover] * len(chunks)))
+
+    # The edges left uncovered have no matched endpoint, matching them completes the matching
+    for part in uncovered:
+        for u, v in part:
+            if u not in cover and v not in cover:
+                cover.add(u)
+                cover.add(v)
+    return cover
+
+
 # Algorithm 2: Clever Greedy Approach
 
 def vertex_cover_greedy(ud):
@@ -63,39 +136,74 @@ def vertex_cover_greedy(ud):
     :return: The subset S that covers all the edges -> The solution is not always optimal
     but it is an acceptable approximation
     '''
-    # This is the set where we will add vertices that are part of the solution
+    cover, _ = vertex_cover_greedy_with_certificate(ud)
+    return cover
+
+
+def vertex_cover_greedy_with_certificate(ud):
+    '''
+    Greedy vertex cover that repeatedly picks the vertex covering the most edges not covered yet.
+    The residual degrees (the number of uncovered edges of every vertex) are kept in a bucket queue:
+    bucket d holds the vertices of residual degree d, and since residual degrees only decrease
+    the highest non empty bucket is found by moving a single pointer down, which takes O(n + m) overall
+    :param ud: An undirected graph
+    :return: The cover and a certificate: a dictionary mapping every edge, given as the frozenset of its endpoints,
+    to the vertex of the cover that was chosen to cover it
+    '''
     cover = set()
-    # The candidates dictionary maps every vertex of the graph to its degree in order to simplify the selection process
+    certificate = {}
+    # The residual degree of every vertex that is not part of the solution
     # We ignore isolated vertices as they will not be included in the solution
-    candidates = {}
+    residual = {}
+    buckets = [{}]
     for vertex in ud.parseX():
-        if ud.degree(vertex) > 0:
-            candidates[vertex] = ud.degree(vertex)
-    # We make a copy of the candidate dictionary so we can modify it in order to signal that an edge was deleted
-    remaining_edges = copy.deepcopy(candidates)
-    # We keep a count of how many edges are left abd we initialize it with the total number of edges
-    remaining_edge_count = ud.edgeCount
-
-    while remaining_edge_count > 0:
-        # While we still have uncovered egdes
-        # Pick the vertex of highest degree
-        candidate = max(candidates, key=lambda vrtx: candidates[vrtx])
-        # Remove it from the candidate dictionary
-        candidates.pop(candidate)
-        # Add it to the solution
+        degree = ud.degree(vertex)
+        if degree > 0:
+            residual[vertex] = degree
+            while len(buckets) <= degree:
+                buckets.append({})
+            buckets[degree][vertex] = None
+    top = len(buckets) - 1
+
+    while top > 0:
+        if len(buckets[top]) == 0:
+            top -= 1
+            continue
+        # Pick a vertex of highest residual degree and add it to the solution
+        candidate, _ = buckets[top].popitem()
+        del residual[candidate]
         cover.add(candidate)
         for adj in ud.parseAdjacent(candidate):
-            # We 'delete' edges that are incident to our candidate
-            # By decrementing the degree of the other endpoint
-            # To keep an accurate number of remaining edges for each vertex
-            if remaining_edges[adj] > 0:
-                remaining_edges[adj] -= 1
-        # We subtract the number of edges incident to our candidate from the total number of edges
-        remaining_edge_count -= remaining_edges[candidate]
-        # Set the number of incident edges of the candidate to 0
-        remaining_edges[candidate] = 0
-    return cover
-
-
-
-
+            # Edges towards vertices already in the solution were covered by them
+            if adj in cover and adj != candidate:
+                continue
+            certificate[frozenset((candidate, adj))] = candidate
+            if adj != candidate:
+                # The other endpoint has one uncovered edge less and moves to the bucket below
+                degree = residual[adj]
+                del buckets[degree][adj]
+                if degree > 1:
+                    residual[adj] = degree - 1
+                    buckets[degree - 1][adj] = None
+                else:
+                    del residual[adj]
+    return cover, certificate
+
+
+def verify_vertex_cover(ud, cover, certificate=None):
+    '''
+    Checks that a set of vertices covers all the edges of a graph
+    :param ud: An undirected graph
+    :param cover: A set of vertices
+    :param certificate: An optional dictionary mapping every edge, given as the frozenset of its endpoints,
+    to an endpoint in the cover, which is checked as well
+    :return: True if every edge has an endpoint in the cover (the one given by the certificate, if any), False otherwise
+    '''
+    for x, y, _ in ud.parseXYTuples():
+        if certificate is not None:
+            vertex = certificate.get(frozenset((x, y)))
+            if vertex not in (x, y) or vertex not in cover:
+                return False
+        elif x not in cover and y not in cover:
+            return False
+    return True
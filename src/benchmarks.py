@@ -0,0 +1,101 @@
+from graph import DirectedGraph, UndirectedGraph, generate
+from FloydWarshall import floydWarshall, blockedFloydWarshall
+from BFS import _forwardSearch, _bidirectionalSearch
+import numpy as np
+import os
+import random
+import time
+
+
+def hub_graph(graph, degree):
+    """
+    Populates a graph with a hub vertex (labelled 0) linked to every other vertex
+    :param graph: A directed or an undirected graph
+    :param degree: The number of vertices adjacent to the hub
+    :return:
+    """
+    graph.clear()
+    for i in range(degree + 1):
+        graph.addVertex(i)
+    for i in range(1, degree + 1):
+        graph.addEdge(0, i, i)
+        if isinstance(graph, DirectedGraph):
+            graph.addEdge(i, 0, i)
+
+
+def benchmark_hub_removal(degrees=(1000, 2000, 4000, 8000, 16000)):
+    """
+    Times the removal of a high degree vertex; the time per incident edge
+    should stay roughly constant as the degree grows
+    :param degrees: The degrees of the hubs to be removed
+    :return:
+    """
+    for graph in (DirectedGraph(), UndirectedGraph()):
+        print(type(graph).__name__)
+        for degree in degrees:
+            hub_graph(graph, degree)
+            start = time.perf_counter()
+            graph.removeVertex(0)
+            elapsed = time.perf_counter() - start
+            print("degree " + str(degree) + ": " + "%.4f" % elapsed + " s, " +
+                  "%.3f" % (elapsed / degree * 1e6) + " us per edge")
+
+
+def benchmark_blocked_floyd_warshall(vertices=1500, edges=15000, tileSize=256, workers=None):
+    """
+    Times the blocked Floyd-Warshall algorithm against the number of worker processes
+    and checks that every run matches the vectorized reference costs
+    :param vertices: The number of vertices of the generated graph
+    :param edges: The number of edges of the generated graph
+    :param tileSize: The number of rows and columns of a tile
+    :param workers: The worker counts to be measured, by default 1, 2, 4, ... up to the number of cores
+    :return:
+    """
+    if workers is None:
+        workers = [1]
+        while workers[-1] * 2 <= (os.cpu_count() or 1):
+            workers.append(workers[-1] * 2)
+    ddg = DirectedGraph()
+    generate(ddg, vertices, edges)
+
+    start = time.perf_counter()
+    reference, _ = floydWarshall(ddg)
+    print("reference: " + "%.3f" % (time.perf_counter() - start) + " s")
+
+    for count in workers:
+        start = time.perf_counter()
+        costMatrix, _ = blockedFloydWarshall(ddg, tileSize, count)
+        elapsed = time.perf_counter() - start
+        if not np.array_equal(reference, costMatrix):
+            raise AssertionError("The blocked result differs from the reference")
+        print(str(count) + " worker(s): " + "%.3f" % elapsed + " s")
+
+
+def benchmark_bidirectional_bfs(sizes=(10000, 50000, 200000), averageDegree=4, queries=20):
+    """
+    Compares the forward and the bidirectional breadth first search on random graphs,
+    reporting the time and the number of vertices discovered per query
+    :param sizes: The vertex counts of the generated graphs
+    :param averageDegree: The average outdegree of the generated graphs
+    :param queries: The number of random (source, target) pairs per graph
+    :return:
+    """
+    for size in sizes:
+        ddg = DirectedGraph()
+        generate(ddg, size, size * averageDegree)
+        pairs = [(random.randrange(size), random.randrange(size)) for _ in range(queries)]
+        print("graph with " + str(size) + " vertices")
+        for name, search in (("forward", _forwardSearch), ("bidirectional", _bidirectionalSearch)):
+            explored = 0
+            start = time.perf_counter()
+            for s, t in pairs:
+                explored += search(ddg, s, t)[1]
+            elapsed = time.perf_counter() - start
+            print(name + ": " + "%.4f" % (elapsed / queries) + " s, " +
+                  str(explored // queries) + " vertices discovered per query")
+
+
+if __name__ == "__main__":
+    benchmark_hub_removal()
+    benchmark_blocked_floyd_warshall()
+    benchmark_bidirectional_bfs()
@@ -1,6 +1,7 @@
-from graph import DirectedGraph, readingFunc1,readingFunc2, generate, writeToFile, UndirectedGraph
+from graph import DirectedGraph, readingFunc1,readingFunc2, writeToFile, UndirectedGraph
+from generator import generateRandom
 from BFS import lowestLengthPath
-from FloydWarshall import lowestCostWalk
+from ShortestPath import lowestCostPath
 
 
 class UI:
@@ -42,7 +43,7 @@ class UI:
         print("21.Exit")
         print("22.Isolated vertices")
         print("23.Minimum length path")
-        print("23.Minimum cost path")
+        print("24.Minimum cost path")
         print("\n")
 
     def console(self):
@@ -163,7 +164,7 @@ class UI:
         ddg = DirectedGraph()
         vertices = input("Enter the vertex count:")
         edges = input("Enter the edge count")
-        generate(ddg,int(vertices), int(edges))
+        generateRandom(ddg,int(vertices), int(edges))
         self._ddg = ddg
 
     def write_to_file_ui(self):
@@ -194,7 +195,12 @@ class UI:
         if self._ddg.isVertex(int(source)) is False or self._ddg.isVertex(int(dest)) is False:
             print("The provided vertices are not in the graph")
             return
-        lowestCostWalk(self._ddg, int(source), int(dest))
+        cost, path = lowestCostPath(self._ddg, int(source), int(dest))
+        if len(path) == 0:
+            print("There is no minimum cost walk between " + source + " and " + dest)
+        else:
+            print("The minimum cost walk between " + source + " and " + dest + " has the cost " + str(cost))
+            print("And it has the path " + str(path))
 
 if __name__ == "__main__":
     c = UI()
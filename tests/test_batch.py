@@ -0,0 +1,90 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path[:0] = [os.path.join(os.path.dirname(__file__), '..', 'src'),
+                os.path.join(os.path.dirname(__file__), '..', 'src', 'Graph')]
+
+from batch import BULK_THRESHOLD
+from csr import CSRDirectedGraph, CSRUndirectedGraph
+from graph import DirectedGraph, UndirectedGraph
+
+
+def _floatEdges(count):
+    # A path of count edges whose costs alternate between positive and negative floats
+    return [(i, i + 1, (i % 7 - 3) + 0.5) for i in range(count)]
+
+
+def test_bulk_insert_float_costs():
+    edges = _floatEdges(BULK_THRESHOLD + 904)
+    for graph in (DirectedGraph(), UndirectedGraph()):
+        graph.add_vertices_from(range(len(edges) + 1))
+        graph.add_edges_from(edges)
+        assert graph.edgeCount == len(edges)
+        assert sorted(graph.parseXYTuples()) == edges
+
+
+def test_bulk_insert_float_costs_in_batch():
+    edges = _floatEdges(BULK_THRESHOLD + 904)
+    graph = DirectedGraph()
+    with graph.batch():
+        graph.add_edges_from(edges)
+    assert graph._negativeCosts == sum(1 for _, _, c in edges if c < 0)
+    assert graph.hasNegativeCost
+    assert graph.costEdge(3, 4) == 0.5
+
+
+def test_array_float_costs_keep_integer_labels():
+    graph = DirectedGraph()
+    with graph.batch():
+        graph.add_edges_from(np.array([[0, 1, 2.5], [1, 2, 3.0]]))
+    assert list(graph.parseX()) == [0, 1, 2]
+    assert all(type(x) is int for x in graph.parseX())
+    assert list(graph.parseXYTuples()) == [(0, 1, 2.5), (1, 2, 3.0)]
+
+
+def test_empty_array():
+    graph = UndirectedGraph()
+    graph.add_edges_from(np.empty((0, 3)))
+    assert graph.edgeCount == 0
+
+
+def test_bulk_insert_keeps_neighbour_order():
+    # A path, then edges to a hub in both orientations and a few loops
+    count = BULK_THRESHOLD + 100
+    edges = [(i, i + 1, i) for i in range(count)]
+    edges += [(0, i, 1) if i % 2 else (i, 0, 1) for i in range(2, count, 3)]
+    edges += [(i, i, 2) for i in range(0, count, 50)]
+    bulk = UndirectedGraph()
+    bulk.add_vertices_from(range(count + 1))
+    bulk.add_edges_from(edges)
+    single = UndirectedGraph()
+    for i in range(count + 1):
+        single.addVertex(i)
+    for x, y, c in edges:
+        if not single.isEdge(x, y):
+            single.addEdge(x, y, c)
+    assert list(bulk.parseXYTuples()) == list(single.parseXYTuples())
+    for x in single.parseX():
+        assert list(bulk.parseAdjacent(x)) == list(single.parseAdjacent(x))
+
+
+def test_csr_bulk_insert_matches_single_inserts():
+    # Float costs, repeated edges in both orientations and loops, on top of edges already stored and buffered
+    count = BULK_THRESHOLD + 100
+    edges = [(i % 997, (7 * i) % 1009, (i % 5 - 2) + (0.5 if i % 3 else 0)) for i in range(count)]
+    edges += [(y, x, 1) for x, y, _ in edges[:50]] + [(i, i, 2) for i in range(0, 997, 50)]
+    for graphClass in (CSRDirectedGraph, CSRUndirectedGraph):
+        bulk = graphClass()
+        single = graphClass()
+        for graph in (bulk, single):
+            graph.add_vertices_from(range(1009))
+            graph.add_edges_from([(0, 1, 5), (2, 3, -1)])
+        bulk.add_edges_from(edges)
+        for x, y, c in edges:
+            if not single.isEdge(x, y):
+                single.addEdge(x, y, c)
+        assert bulk.edgeCount == single.edgeCount
+        assert sorted(bulk.parseXYTuples()) == sorted(single.parseXYTuples())
+        assert bulk.costEdge(0, 1) == 5
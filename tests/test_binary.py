@@ -0,0 +1,69 @@
+import os
+import sys
+
+sys.path[:0] = [os.path.join(os.path.dirname(__file__), '..', 'src'),
+                os.path.join(os.path.dirname(__file__), '..', 'src', 'Graph')]
+
+from graph import DirectedGraph, readBinary, writeBinary
+
+
+def _graph(labels, costs):
+    # A cycle over the labels with a chord, the edges taking the given costs in turn
+    graph = DirectedGraph()
+    for x in labels:
+        graph.addVertex(x)
+    pairs = [(labels[k], labels[(k + 1) % len(labels)]) for k in range(len(labels))] + [(labels[0], labels[2])]
+    for (x, y), c in zip(pairs, costs * len(pairs)):
+        graph.addEdge(x, y, c)
+    return graph
+
+
+def _assertSameGraph(loaded, graph):
+    assert list(loaded.parseX()) == list(graph.parseX())
+    assert sorted(loaded.parseXYTuples()) == sorted(graph.parseXYTuples())
+    assert loaded.hasNegativeCost == graph.hasNegativeCost
+    for x in graph.parseX():
+        assert sorted(loaded.parseDout(x)) == sorted(graph.parseDout(x))
+        assert sorted(loaded.parseDin(x)) == sorted(graph.parseDin(x))
+
+
+def test_round_trip_integer_costs(tmp_path):
+    file_name = str(tmp_path / 'graph.bin')
+    for labels in ([0, 5, 3, 9], ['a', 'bb', 'ccc', 'd']):
+        graph = _graph(labels, [4, -2, 7])
+        writeBinary(graph, file_name)
+        loaded = readBinary(file_name)
+        _assertSameGraph(loaded, graph)
+        assert all(type(c) is int for _, _, c in loaded.parseXYTuples())
+
+
+def test_round_trip_float_costs(tmp_path):
+    file_name = str(tmp_path / 'graph.bin')
+    graph = _graph([1, 2, 3, 4, 5], [0.5, -1.25, 3.0])
+    writeBinary(graph, file_name)
+    loaded = readBinary(file_name)
+    _assertSameGraph(loaded, graph)
+    assert loaded.costEdge(2, 3) == -1.25
+
+
+def test_mutations_leave_the_file_untouched(tmp_path):
+    file_name = str(tmp_path / 'graph.bin')
+    graph = _graph([0, 1, 2, 3], [4, -2, 7])
+    writeBinary(graph, file_name)
+    with open(file_name, 'rb') as f:
+        written = f.read()
+
+    loaded = readBinary(file_name)
+    loaded.setCostEdge(0, 1, 2.5)
+    loaded.removeEdge(1, 2)
+    loaded.addVertex(4)
+    loaded.addEdge(3, 4, 1)
+    assert loaded.costEdge(0, 1) == 2.5
+    assert not loaded.isEdge(1, 2)
+    assert loaded.edgeCount == graph.edgeCount
+    loaded.removeVertex(0)
+    assert list(loaded.parseX()) == [1, 2, 3, 4]
+
+    with open(file_name, 'rb') as f:
+        assert f.read() == written
+    _assertSameGraph(readBinary(file_name), graph)
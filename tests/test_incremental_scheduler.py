@@ -0,0 +1,78 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path[:0] = [os.path.join(os.path.dirname(__file__), '..', 'src'),
+                os.path.join(os.path.dirname(__file__), '..', 'src', 'Graph')]
+
+from csr import CSRDirectedGraph
+from graph import DirectedGraph
+from OrderingActivities import IncrementalScheduler, schedule_activities
+
+
+def _randomProject(graphClass, seed, n=20):
+    # A random DAG whose edges go from lower to higher labels, with random durations
+    rng = random.Random(seed)
+    graph = graphClass()
+    for x in range(n):
+        graph.addVertex(x)
+    for _ in range(2 * n):
+        x, y = sorted(rng.sample(range(n), 2))
+        if not graph.isEdge(x, y):
+            graph.addEdge(x, y, 0)
+    return graph, {x: rng.randint(0, 9) for x in range(n)}
+
+
+def _assertMatchesFullRecompute(scheduler, graph, duration):
+    schedule = schedule_activities(duration, graph)
+    assert scheduler.total_duration == schedule.total
+    for x in graph.parseX():
+        assert scheduler.earliest_start(x) == schedule.earliest_start[x]
+        assert scheduler.latest_start(x) == schedule.latest_start[x]
+    path = scheduler.critical_path()
+    assert sum(duration[x] for x in path) == schedule.total
+    assert all(graph.isEdge(path[k], path[k + 1]) for k in range(len(path) - 1))
+
+
+@pytest.mark.parametrize("graphClass", [DirectedGraph, CSRDirectedGraph])
+def test_updates_match_full_recompute(graphClass):
+    for seed in range(10):
+        graph, duration = _randomProject(graphClass, seed)
+        scheduler = IncrementalScheduler(graph, duration)
+        rng = random.Random(seed)
+        for _ in range(60):
+            x, y = rng.sample(range(20), 2)
+            if rng.random() < 0.3:
+                duration[x] = rng.randint(0, 9)
+                scheduler.set_duration(x, duration[x])
+            elif graph.isEdge(x, y):
+                scheduler.remove_dependency(x, y)
+            else:
+                try:
+                    scheduler.add_dependency(x, y)
+                except ValueError:
+                    # The dependency would close a cycle
+                    pass
+            _assertMatchesFullRecompute(scheduler, graph, duration)
+
+
+@pytest.mark.parametrize("graphClass", [DirectedGraph, CSRDirectedGraph])
+def test_cycle_is_rejected(graphClass):
+    graph = graphClass()
+    for x in range(4):
+        graph.addVertex(x)
+    for x, y in ((0, 1), (1, 2), (2, 3)):
+        graph.addEdge(x, y, 0)
+    duration = {0: 1, 1: 2, 2: 3, 3: 4}
+    scheduler = IncrementalScheduler(graph, duration)
+    for x, y in ((3, 0), (2, 1), (1, 1)):
+        with pytest.raises(ValueError):
+            scheduler.add_dependency(x, y)
+    assert not graph.isEdge(3, 0) and not graph.isEdge(2, 1)
+    _assertMatchesFullRecompute(scheduler, graph, duration)
+    # Once the chain is cut, the dependency that closed the cycle is accepted
+    scheduler.remove_dependency(1, 2)
+    scheduler.add_dependency(3, 0)
+    _assertMatchesFullRecompute(scheduler, graph, duration)
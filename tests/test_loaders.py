@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+sys.path[:0] = [os.path.join(os.path.dirname(__file__), '..', 'src'),
+                os.path.join(os.path.dirname(__file__), '..', 'src', 'Graph')]
+
+from graph import DirectedGraph, parallelCountedEdgeList, streamCountedEdgeList
+
+
+def _countedFile(tmp_path, text):
+    path = tmp_path / 'counted.txt'
+    path.write_text(text)
+    return str(path)
+
+
+def test_counted_file_stops_after_the_declared_edges(tmp_path):
+    file_name = _countedFile(tmp_path, "3 2\n0 1 5\n1 2 4\n7 8 1\n9\n")
+    for load in (streamCountedEdgeList, parallelCountedEdgeList):
+        graph = DirectedGraph()
+        load(file_name, graph)
+        assert list(graph.parseX()) == [0, 1, 2]
+        assert list(graph.parseXYTuples()) == [(0, 1, 5), (1, 2, 4)]
+
+
+def test_counted_file_rejects_invalid_edges(tmp_path):
+    for text in ("3 2\n0 1 5\n0 1 4\n", "3 2\n0 1 5\n1 7 4\n"):
+        file_name = _countedFile(tmp_path, text)
+        for load in (streamCountedEdgeList, parallelCountedEdgeList):
+            with pytest.raises(ValueError):
+                load(file_name, DirectedGraph())
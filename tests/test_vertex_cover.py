@@ -0,0 +1,65 @@
+import os
+import random
+import sys
+from itertools import combinations
+
+sys.path[:0] = [os.path.join(os.path.dirname(__file__), '..', 'src'),
+                os.path.join(os.path.dirname(__file__), '..', 'src', 'Graph')]
+
+from graph import UndirectedGraph
+from VertexCoverExact import vertex_cover_exact
+
+
+def _randomGraph(seed, dense=False):
+    # A small random graph with a loop now and then; dense graphs have about three times as many edges as vertices,
+    # so that the kernelization leaves vertices to the branch and bound
+    rng = random.Random(seed)
+    n = rng.randint(12, 14) if dense else rng.randint(1, 11)
+    graph = UndirectedGraph()
+    for x in range(n):
+        graph.addVertex(x)
+    for _ in range(4 * n if dense else rng.randint(0, 2 * n)):
+        x, y = rng.randrange(n), rng.randrange(n)
+        if not graph.isEdge(x, y) and (x != y or not dense):
+            graph.addEdge(x, y, 1)
+    return graph
+
+
+def _isCover(graph, cover):
+    return all(x in cover or y in cover for x, y, _ in graph.parseXYTuples())
+
+
+def _minimumSize(graph):
+    vertices = list(graph.parseX())
+    for size in range(len(vertices) + 1):
+        for cover in combinations(vertices, size):
+            if _isCover(graph, set(cover)):
+                return size
+
+
+def test_exact_cover_matches_brute_force():
+    for seed in range(60):
+        graph = _randomGraph(seed, dense=seed % 4 == 0)
+        result = vertex_cover_exact(graph)
+        assert _isCover(graph, result.cover)
+        assert len(result.cover) == _minimumSize(graph)
+        assert result.lower_bound == len(result.cover)
+        assert result.gap == 0
+
+
+def test_exact_cover_with_workers():
+    for seed in range(5):
+        graph = _randomGraph(seed, dense=True)
+        result = vertex_cover_exact(graph, workers=2)
+        assert _isCover(graph, result.cover)
+        assert len(result.cover) == _minimumSize(graph)
+        assert result.gap == 0
+
+
+def test_exact_cover_time_limit_keeps_a_valid_bound():
+    for seed in range(20):
+        graph = _randomGraph(seed, dense=seed % 2 == 0)
+        result = vertex_cover_exact(graph, time_limit=0)
+        assert _isCover(graph, result.cover)
+        assert result.lower_bound <= _minimumSize(graph) <= len(result.cover)
+        assert result.gap == len(result.cover) - result.lower_bound